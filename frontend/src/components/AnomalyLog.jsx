@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { subscribe } from '../eventStream'
 
 function AnomalyLog() {
   const [anomalies, setAnomalies] = useState([])
@@ -9,6 +10,16 @@ function AnomalyLog() {
   // API endpoint - adjust to match your backend
   const API_BASE = 'http://localhost:5000'
 
+  // Transform backend data to match frontend expectations
+  const transformEvent = (event) => ({
+    id: event.id,
+    timestamp: event.timestamp,
+    description: event.description,
+    severity: event.severity, // info/warning/critical from backend
+    imageUrl: event.image_url,
+    previewUrl: event.image_variants?.medium || event.image_url
+  })
+
   // Fetch anomalies from the database
   useEffect(() => {
     const fetchAnomalies = async () => {
@@ -17,16 +28,7 @@ function AnomalyLog() {
         if (!response.ok) throw new Error('Failed to fetch events')
         const data = await response.json()
 
-        // Transform backend data to match frontend expectations
-        const transformedData = data.map(event => ({
-          id: event.id,
-          timestamp: event.timestamp,
-          description: event.description,
-          severity: event.severity, // info/warning/critical from backend
-          imageUrl: event.image_url
-        }))
-
-        setAnomalies(transformedData)
+        setAnomalies(data.map(transformEvent))
         setLoading(false)
       } catch (error) {
         console.error('Error fetching anomalies:', error)
@@ -37,9 +39,15 @@ function AnomalyLog() {
 
     fetchAnomalies()
 
-    // Poll for new anomalies every 5 seconds
-    const interval = setInterval(fetchAnomalies, 5000)
-    return () => clearInterval(interval)
+    // New events and deletions are pushed; refetch after a reconnect or when we fell behind
+    const unsubscribers = [
+      subscribe('event', (event) => setAnomalies(prev =>
+        prev.some(a => a.id === event.id) ? prev : [transformEvent(event), ...prev].slice(0, 50))),
+      subscribe('delete', ({ id }) => setAnomalies(prev => prev.filter(a => a.id !== id))),
+      subscribe('resync', fetchAnomalies),
+      subscribe('open', fetchAnomalies),
+    ]
+    return () => unsubscribers.forEach(unsubscribe => unsubscribe())
   }, [])
 
   const formatTimestamp = (timestamp) => {
@@ -159,7 +167,8 @@ function AnomalyLog() {
               {anomaly.imageUrl && (
                 <div className="rounded-lg overflow-hidden bg-black/60 border border-cyan-500/10">
                   <img
-                    src={anomaly.imageUrl}
+                    src={anomaly.previewUrl}
+                    onError={(e) => { if (e.currentTarget.src !== anomaly.imageUrl) e.currentTarget.src = anomaly.imageUrl }}
                     alt="Anomaly capture"
                     className="w-full h-32 object-cover"
                   />
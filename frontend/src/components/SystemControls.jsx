@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { subscribe } from '../eventStream'
 
 function SystemControls() {
   const [systemStatus, setSystemStatus] = useState({
@@ -10,22 +11,24 @@ function SystemControls() {
 
   const API_URL = 'http://localhost:5000'
 
-  // Fetch system status on mount and periodically
+  // Fetch system status on mount, then follow the pushed updates
   useEffect(() => {
     fetchStatus()
-    const interval = setInterval(fetchStatus, 2000) // Update every 2 seconds
-    return () => clearInterval(interval)
+    return subscribe('status', applyStatus)
   }, [])
 
+  const applyStatus = (data) => {
+    setSystemStatus({
+      sentry_running: data.sentry_running,
+      sentry_available: data.sentry_available,
+      loading: false
+    })
+  }
+
   const fetchStatus = async () => {
     try {
       const response = await fetch(`${API_URL}/system/status`)
-      const data = await response.json()
-      setSystemStatus({
-        sentry_running: data.sentry_running,
-        sentry_available: data.sentry_available,
-        loading: false
-      })
+      applyStatus(await response.json())
     } catch (error) {
       console.error('Failed to fetch system status:', error)
       setSystemStatus(prev => ({ ...prev, loading: false }))
@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react'
+import { subscribe } from '../eventStream'
 
 function VideoFeed() {
   const [isConnected, setIsConnected] = useState(false)
@@ -23,21 +24,23 @@ function VideoFeed() {
 
     checkConnection()
     
-    // Fetch system status
+    // Fetch system status once, then follow the pushed updates
     fetchStatus()
-    const interval = setInterval(fetchStatus, 2000) // Update every 2 seconds
-    return () => clearInterval(interval)
+    return subscribe('status', applyStatus)
   }, [])
 
+  const applyStatus = (data) => {
+    setSystemStatus({
+      sentry_running: data.sentry_running,
+      sentry_available: data.sentry_available,
+    })
+    setStats(data.stats)
+  }
+
   const fetchStatus = async () => {
     try {
       const response = await fetch(`${API_URL}/system/status`)
-      const data = await response.json()
-      setSystemStatus({
-        sentry_running: data.sentry_running,
-        sentry_available: data.sentry_available,
-      })
-      setStats(data.stats)
+      applyStatus(await response.json())
     } catch (error) {
       console.error('Failed to fetch system status:', error)
     }
@@ -0,0 +1,37 @@
+// One shared Server-Sent Events connection to the backend's /stream endpoint.
+// Components subscribe to a message kind ('event', 'delete', 'status', 'job', 'resync',
+// or 'open' after every (re)connect) instead of polling.
+
+const STREAM_URL = 'http://localhost:5000/stream'
+
+const listeners = new Map()
+let source = null
+
+function dispatch(kind, data) {
+  for (const handler of listeners.get(kind) || []) {
+    handler(data)
+  }
+}
+
+function connect() {
+  source = new EventSource(STREAM_URL)
+  source.onopen = () => dispatch('open', null)
+  for (const kind of ['event', 'delete', 'status', 'job', 'resync']) {
+    source.addEventListener(kind, (message) => dispatch(kind, JSON.parse(message.data)))
+  }
+}
+
+export function subscribe(kind, handler) {
+  if (!listeners.has(kind)) listeners.set(kind, new Set())
+  listeners.get(kind).add(handler)
+  if (!source) connect()
+
+  return () => {
+    listeners.get(kind).delete(handler)
+    const remaining = [...listeners.values()].reduce((count, set) => count + set.size, 0)
+    if (remaining === 0 && source) {
+      source.close()
+      source = null
+    }
+  }
+}
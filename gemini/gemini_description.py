@@ -26,20 +26,36 @@ def list_available_models():
 # Initialize the model (using Gemini 2.0 Flash)
 model = genai.GenerativeModel('gemini-2.0-flash')
 
-def analyze_security_image(image_path):
-    try:
-        # Load the image
-        img = Image.open(image_path)
-        
-        # Create a security-focused prompt
-        prompt = """Analyze this security camera image and respond in this exact format:
+# Create a security-focused prompt
+SECURITY_PROMPT = """Analyze this security camera image and respond in this exact format:
+DESCRIPTION: [One sentence describing what you see]
+SEVERITY: [info/warning/critical]
+
+Use 'info' for normal activities, 'warning' for suspicious activities, and 'critical' for immediate threats or emergencies."""
+
+# Several images in one request - one block per image, in order
+BATCH_PROMPT = """You will receive {count} security camera images, each preceded by its label (IMAGE 1 to IMAGE {count}).
+Analyze each image separately and respond with exactly one block per image, in order, in this exact format:
+IMAGE <number>
 DESCRIPTION: [One sentence describing what you see]
 SEVERITY: [info/warning/critical]
 
 Use 'info' for normal activities, 'warning' for suspicious activities, and 'critical' for immediate threats or emergencies."""
 
+
+def _image_part(image, mime_type):
+    """Request part for encoded bytes (sent as-is, no decode) or a BGR numpy array."""
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return {"mime_type": mime_type, "data": bytes(image)}
+    # OpenCV frames are BGR
+    return Image.fromarray(image[..., ::-1] if image.ndim == 3 else image)
+
+
+def _analyze(image_part, image_name, gemini_model=None):
+    """Run the security prompt on an image part (PIL image or inline blob) and parse the result."""
+    try:
         # Generate content
-        response = model.generate_content([prompt, img])
+        response = (gemini_model or model).generate_content([SECURITY_PROMPT, image_part])
 
         # Parse the response to extract description and severity
         response_text = response.text.strip()
@@ -58,7 +74,7 @@ Use 'info' for normal activities, 'warning' for suspicious activities, and 'crit
         
         # Prepare result
         result = {
-            "image": os.path.basename(image_path),
+            "image": image_name,
             "timestamp": datetime.utcnow().isoformat() + 'Z',  # UTC timestamp with Z suffix
             "analysis": description if description else response.text,
             "severity": severity,
@@ -69,13 +85,133 @@ Use 'info' for normal activities, 'warning' for suspicious activities, and 'crit
         
     except Exception as e:
         return {
-            "image": os.path.basename(image_path),
+            "image": image_name,
             "timestamp": datetime.utcnow().isoformat() + 'Z',  # UTC timestamp with Z suffix
             "analysis": None,
             "status": "error",
             "error": str(e)
         }
 
+
+def analyze_security_image(image_path):
+    try:
+        # Load the image
+        img = Image.open(image_path)
+    except Exception as e:
+        return {
+            "image": os.path.basename(image_path),
+            "timestamp": datetime.utcnow().isoformat() + 'Z',
+            "analysis": None,
+            "status": "error",
+            "error": str(e)
+        }
+    return _analyze(img, os.path.basename(image_path))
+
+
+def analyze_security_image_data(image, mime_type="image/jpeg", image_name="memory", gemini_model=None):
+    """
+    Analyze an image held in memory (no temp file).
+
+    Args:
+        image: Encoded image bytes (sent as-is, no decode) or a BGR numpy array (OpenCV frame)
+        mime_type: MIME type of the encoded bytes
+        image_name: Name reported in the result
+        gemini_model: Model to use instead of the module default
+    """
+    return _analyze(_image_part(image, mime_type), image_name, gemini_model)
+
+
+def parse_batch_response(response_text, count):
+    """
+    Parse a BATCH_PROMPT response.
+
+    Returns:
+        list of (description, severity) in image order, or None if any image is missing
+    """
+    parsed = {}
+    current = None
+    for line in response_text.split('\n'):
+        line = line.strip().strip('*').strip()
+        upper = line.upper()
+        if upper.startswith('IMAGE'):
+            number = ''.join(ch for ch in line[5:].split(':')[0] if ch.isdigit())
+            current = int(number) if number else None
+            if current is not None:
+                parsed[current] = {'description': '', 'severity': 'info'}
+        elif current is not None and upper.startswith('DESCRIPTION:'):
+            parsed[current]['description'] = line[len('DESCRIPTION:'):].strip()
+        elif current is not None and upper.startswith('SEVERITY:'):
+            severity_value = line[len('SEVERITY:'):].strip().lower()
+            if severity_value in ['info', 'warning', 'critical']:
+                parsed[current]['severity'] = severity_value
+
+    results = []
+    for number in range(1, count + 1):
+        entry = parsed.get(number)
+        if not entry or not entry['description']:
+            return None
+        results.append((entry['description'], entry['severity']))
+    return results
+
+
+def analyze_security_images_data(images, image_names=None, mime_type="image/jpeg", gemini_model=None,
+                                 before_request=None):
+    """
+    Analyze several in-memory images with a single Gemini request.
+
+    Falls back to one request per image if the batched call fails or its
+    response can't be mapped back to every image.
+
+    Args:
+        before_request: Optional callable() run before each fallback request
+            (rate limiting, request counting); if it returns False that image
+            is not sent and gets an error result
+
+    Returns:
+        list of result dicts (same format as analyze_security_image), in input order
+    """
+    image_names = image_names or [f"memory_{i + 1}" for i in range(len(images))]
+    if len(images) == 1:
+        return [analyze_security_image_data(images[0], mime_type, image_names[0], gemini_model)]
+
+    try:
+        contents = [BATCH_PROMPT.format(count=len(images))]
+        for number, image in enumerate(images, start=1):
+            contents.append(f"IMAGE {number}")
+            contents.append(_image_part(image, mime_type))
+        response = (gemini_model or model).generate_content(contents)
+        parsed = parse_batch_response(response.text.strip(), len(images))
+        if parsed is None:
+            print("[GEMINI] Batched response did not cover every image - falling back to single requests")
+    except Exception as e:
+        print(f"[GEMINI] Batched request failed ({e}) - falling back to single requests")
+        parsed = None
+
+    if parsed is None:
+        results = []
+        for image, name in zip(images, image_names):
+            if before_request is not None and not before_request():
+                results.append({
+                    "image": name,
+                    "timestamp": datetime.utcnow().isoformat() + 'Z',
+                    "analysis": None,
+                    "status": "error",
+                    "error": "Fallback request not sent"
+                })
+            else:
+                results.append(analyze_security_image_data(image, mime_type, name, gemini_model))
+        return results
+
+    timestamp = datetime.utcnow().isoformat() + 'Z'  # UTC timestamp with Z suffix
+    return [{
+        "image": name,
+        "timestamp": timestamp,
+        "analysis": description,
+        "severity": severity,
+        "status": "success",
+        "batch_size": len(images)
+    } for name, (description, severity) in zip(image_names, parsed)]
+
 def process_test_images():
     test_folder = Path("tests")
     
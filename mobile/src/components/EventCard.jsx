@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useState } from 'react';
 import {
   View,
   Text,
@@ -15,6 +15,9 @@ const { width } = Dimensions.get('window');
  * Displays an individual event/activity log item
  */
 const EventCard = ({ event, onPress }) => {
+  // Medium variant for the card; the full image if the variant isn't there (older events)
+  const [previewUri, setPreviewUri] = useState(event.previewUrl || event.imageUrl);
+
   /**
    * Format timestamp to readable format
    */
@@ -133,7 +136,8 @@ const EventCard = ({ event, onPress }) => {
       {event.imageUrl && (
         <View style={styles.thumbnailContainer}>
           <Image
-            source={{ uri: event.imageUrl }}
+            source={{ uri: previewUri }}
+            onError={() => setPreviewUri(event.imageUrl)}
             style={styles.thumbnail}
             resizeMode="cover"
           />
@@ -68,6 +68,7 @@ export const ApiService = {
         description: event.description,
         severity: event.severity,
         imageUrl: event.image_url,
+        previewUrl: event.image_variants?.medium || event.image_url,
       }));
     } catch (error) {
       console.error('Failed to fetch events:', error);
@@ -93,6 +94,7 @@ export const ApiService = {
         description: event.description,
         severity: event.severity,
         imageUrl: event.image_url,
+        previewUrl: event.image_variants?.medium || event.image_url,
       }));
     } catch (error) {
       console.error('Failed to fetch anomalies:', error);
@@ -125,6 +127,7 @@ export const ApiService = {
         description: response.data.description,
         severity: response.data.severity,
         imageUrl: response.data.image_url,
+        previewUrl: response.data.image_variants?.medium || response.data.image_url,
       };
     } catch (error) {
       console.error('Failed to create event:', error);
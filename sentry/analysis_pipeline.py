@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Building blocks for the snapshot analysis pipeline.
+
+Snapshots go through two stages run by separate thread pools: Gemini analysis
+(rate limited with a token bucket matched to the API quota) and publishing
+(Storage upload, event insert, Discord alert), so the upload of one snapshot
+overlaps the analysis of the next. Analysis workers collect small batches
+(collect_batch) so several snapshots share one Gemini request. LatencyTracker keeps rolling per-stage
+timings for the stats API.
+"""
+
+import threading
+import time
+from collections import deque
+from queue import Empty
+
+import numpy as np
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Args:
+        rate_per_minute: Sustained request rate
+        burst: Bucket capacity (requests allowed back to back)
+    """
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.total_wait = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, reserve=0):
+        """Take a token without blocking, only if `reserve` tokens would still be left."""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1 + reserve:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout=None, stop_event=None):
+        """
+        Block until a token is available.
+
+        Returns:
+            float: Seconds waited, or None on timeout / stop
+        """
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    waited = now - start
+                    self.total_wait += waited
+                    return waited
+                wait = (1 - self.tokens) / self.rate if self.rate > 0 else 1.0
+            if timeout is not None and now - start + wait > timeout:
+                return None
+            if stop_event is not None:
+                if stop_event.wait(min(wait, 0.5)):
+                    return None
+            else:
+                time.sleep(min(wait, 0.5))
+
+
+class LatencyTracker:
+    """Rolling window of durations (seconds), summarized in milliseconds."""
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def summary(self):
+        with self.lock:
+            if not self.samples:
+                return {'count': self.count}
+            values = np.array(self.samples) * 1000
+        return {
+            'count': self.count,
+            'avg_ms': round(float(values.mean()), 1),
+            'p50_ms': round(float(np.percentile(values, 50)), 1),
+            'p95_ms': round(float(np.percentile(values, 95)), 1),
+            'max_ms': round(float(values.max()), 1)
+        }
+
+
+def collect_batch(source, max_size, max_wait, stop_event=None, poll=1.0):
+    """
+    Pull up to max_size items from a Queue, waiting at most max_wait seconds
+    after the first item for the batch to fill.
+
+    Returns:
+        list: The batch (empty if nothing arrived within `poll` seconds or on stop)
+    """
+    try:
+        batch = [source.get(timeout=poll)]
+    except Empty:
+        return []
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_size:
+        if stop_event is not None and stop_event.is_set():
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(source.get(timeout=remaining))
+        except Empty:
+            break
+    return batch
+
+
+def join_queue(source, timeout):
+    """
+    Queue.join() with a timeout.
+
+    Returns:
+        bool: True if every task was marked done, False if the timeout expired first
+    """
+    deadline = time.monotonic() + timeout
+    with source.all_tasks_done:
+        while source.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            source.all_tasks_done.wait(remaining)
+    return True
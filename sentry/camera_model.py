@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Pixel-to-angle camera model for the pan/tilt head.
+
+A pinhole model (from FOV or intrinsics) gives the camera rotation needed to
+bring a pixel to the principal point; the measured servo response (camera
+degrees per commanded servo degree) turns that into a servo angle offset. With
+a calibrated model the controller can move straight to the target angle
+instead of creeping towards it with a hand-tuned gain.
+
+Calibration nudges the servos around a static target, measures how far it moves
+in the image and fits the servo response per axis. It runs on the simulated rig
+or the real one:
+
+    python sentry/camera_model.py --sim            # Virtual rig (see tracking_sim.py)
+    python sentry/camera_model.py --rig            # Real camera + servos, person standing still
+"""
+
+import argparse
+import json
+import math
+import time
+from pathlib import Path
+
+
+class CameraModel:
+    """
+    Maps pixel positions to pan/tilt servo offsets.
+
+    Args:
+        width, height: Image size (pixels)
+        hfov, vfov: Field of view (degrees), used when fx/fy are not given
+        fx, fy, cx, cy: Pinhole intrinsics (pixels); cx/cy default to the image center
+        pan_gain, tilt_gain: Camera degrees per commanded servo degree (negative = inverted)
+        pan_invert, tilt_invert: Servo direction (matches PAN_INVERT/TILT_INVERT)
+    """
+
+    def __init__(self, width, height, hfov=60.0, vfov=45.0, fx=None, fy=None, cx=None, cy=None,
+                 pan_gain=1.0, tilt_gain=1.0, pan_invert=-1, tilt_invert=-1):
+        self.width = width
+        self.height = height
+        self.fx = fx if fx else (width / 2) / math.tan(math.radians(hfov) / 2)
+        self.fy = fy if fy else (height / 2) / math.tan(math.radians(vfov) / 2)
+        self.cx = cx if cx is not None else width / 2
+        self.cy = cy if cy is not None else height / 2
+        self.pan_gain = pan_gain
+        self.tilt_gain = tilt_gain
+        self.pan_invert = pan_invert
+        self.tilt_invert = tilt_invert
+
+    def camera_angles(self, x, y):
+        """Camera rotation (degrees, +x right / +y down) that centers pixel (x, y)."""
+        return (math.degrees(math.atan((x - self.cx) / self.fx)),
+                math.degrees(math.atan((y - self.cy) / self.fy)))
+
+    def pixel_to_angle(self, x, y):
+        """
+        Servo offsets that bring pixel (x, y) to the principal point.
+
+        Returns:
+            tuple: (pan_offset, tilt_offset) in servo degrees
+        """
+        angle_x, angle_y = self.camera_angles(x, y)
+        return (angle_x / self.pan_gain * self.pan_invert,
+                -angle_y / self.tilt_gain * self.tilt_invert)
+
+    def angle_to_pixel(self, pan_offset, tilt_offset):
+        """Inverse of pixel_to_angle: where a point at the given servo offset appears."""
+        angle_x = pan_offset * self.pan_gain * self.pan_invert
+        angle_y = -tilt_offset * self.tilt_gain * self.tilt_invert
+        return (self.cx + self.fx * math.tan(math.radians(angle_x)),
+                self.cy + self.fy * math.tan(math.radians(angle_y)))
+
+    def to_dict(self):
+        return {
+            'width': self.width, 'height': self.height,
+            'fx': self.fx, 'fy': self.fy, 'cx': self.cx, 'cy': self.cy,
+            'pan_gain': self.pan_gain, 'tilt_gain': self.tilt_gain,
+            'pan_invert': self.pan_invert, 'tilt_invert': self.tilt_invert
+        }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path, **defaults):
+        """Load a calibration file; falls back to a model built from `defaults` if missing/invalid."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            params = dict(defaults)
+            params.update(data)
+            model = cls(**params)
+            print(f"[CAMERA] Loaded calibration from {path}")
+            return model
+        except FileNotFoundError:
+            return cls(**defaults)
+        except Exception as e:
+            print(f"[CAMERA] Invalid calibration file {path}: {e} - using FOV defaults")
+            return cls(**defaults)
+
+
+def _fit_gain(offsets, angles):
+    """Least-squares slope through the origin: angles ~ -gain * offsets."""
+    numerator = sum(d * a for d, a in zip(offsets, angles))
+    denominator = sum(d * d for d in offsets)
+    return -numerator / denominator
+
+
+def calibrate(model, move_to, measure_target, base, offsets=(-8, -4, 4, 8), settle_time=0.5):
+    """
+    Fit the servo response by nudging the head around a static target.
+
+    Args:
+        model: CameraModel with the intrinsics/FOV to use
+        move_to: Callable(pan, tilt) commanding the servos
+        measure_target: Callable() -> (x, y) pixel position of the target, or None
+        base: (pan, tilt) starting angles with the target in view
+        offsets: Servo offsets (degrees) to test on each axis
+        settle_time: Seconds to wait after each move before measuring
+
+    Returns:
+        tuple: (calibrated CameraModel, report dict)
+    """
+    def measure_at(pan, tilt):
+        move_to(pan, tilt)
+        time.sleep(settle_time)
+        position = measure_target()
+        if position is None:
+            raise RuntimeError(f"Target not visible at pan={pan:.1f} tilt={tilt:.1f}")
+        return model.camera_angles(*position)
+
+    ref_x, ref_y = measure_at(*base)
+
+    # Apparent target offset (in servo direction) as each axis is nudged
+    pan_angles, tilt_angles = [], []
+    for offset in offsets:
+        angle_x, _ = measure_at(base[0] + offset, base[1])
+        pan_angles.append((angle_x - ref_x) * model.pan_invert)
+    for offset in offsets:
+        _, angle_y = measure_at(base[0], base[1] + offset)
+        tilt_angles.append(-(angle_y - ref_y) * model.tilt_invert)
+    move_to(*base)
+
+    pan_gain = _fit_gain(offsets, pan_angles)
+    tilt_gain = _fit_gain(offsets, tilt_angles)
+
+    params = model.to_dict()
+    params.update(pan_gain=pan_gain, tilt_gain=tilt_gain)
+    calibrated = CameraModel(**params)
+
+    residual = max(abs(a + pan_gain * d) for d, a in zip(offsets, pan_angles))
+    residual = max([residual] + [abs(a + tilt_gain * d) for d, a in zip(offsets, tilt_angles)])
+    report = {
+        'pan_gain': round(pan_gain, 4),
+        'tilt_gain': round(tilt_gain, 4),
+        'max_residual_deg': round(residual, 3),
+        'samples': 2 * len(offsets) + 1
+    }
+    if pan_gain < 0 or tilt_gain < 0:
+        print("[CAMERA] Warning: negative gain - check PAN_INVERT/TILT_INVERT")
+    return calibrated, report
+
+
+def calibrate_simulated(servo_gain=(0.9, 1.1), settle_time=0.3):
+    """Calibrate against the virtual rig with a known servo response."""
+    from tracking_sim import SimulatedRig, SimulatedCamera, VirtualPerson
+    from sentry_service import (ServoController, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_HFOV, CAMERA_VFOV,
+                                PAN_DEFAULT, TILT_DEFAULT, PAN_INVERT, TILT_INVERT)
+
+    rig = SimulatedRig(servo_gain=servo_gain)
+    camera = SimulatedCamera(rig, [VirtualPerson(1, azimuth=PAN_DEFAULT + 3, elevation=TILT_DEFAULT - 2)],
+                             capture_latency=0.0)
+    servo = ServoController(bus=rig)
+
+    def measure_target():
+        camera.read()
+        for person_id, (x1, y1, x2, y2) in camera.last_ground_truth:
+            return (x1 + x2) / 2, (y1 + y2) / 2
+        return None
+
+    model = CameraModel(CAMERA_WIDTH, CAMERA_HEIGHT, hfov=CAMERA_HFOV, vfov=CAMERA_VFOV,
+                        pan_invert=PAN_INVERT, tilt_invert=TILT_INVERT)
+    return calibrate(model, lambda pan, tilt: servo.set_angles(pan, tilt, force=True),
+                     measure_target, base=(PAN_DEFAULT, TILT_DEFAULT), settle_time=settle_time)
+
+
+def calibrate_rig(settle_time=1.0):
+    """Calibrate on the real rig. Needs one person standing still in view."""
+    from sentry_service import SentryService, PAN_DEFAULT, TILT_DEFAULT
+
+    sentry = SentryService(analysis_enabled=False, patrol_file=None)
+    sentry.auto_tracking_enabled = False  # Keep the vision loop from moving the head
+    sentry.start()
+
+    def measure_target():
+        seen_at = sentry.last_tracks_time
+        deadline = time.monotonic() + 2.0
+        while sentry.last_tracks_time == seen_at and time.monotonic() < deadline:
+            time.sleep(0.02)
+        if not sentry.last_tracks:
+            return None
+        largest = max(sentry.last_tracks,
+                      key=lambda t: (t['bbox'][2] - t['bbox'][0]) * (t['bbox'][3] - t['bbox'][1]))
+        x1, y1, x2, y2 = largest['bbox']
+        return (x1 + x2) / 2, (y1 + y2) / 2
+
+    try:
+        return calibrate(sentry.camera_model, lambda pan, tilt: sentry.servo.set_target(pan, tilt),
+                         measure_target, base=(PAN_DEFAULT, TILT_DEFAULT), settle_time=settle_time)
+    finally:
+        sentry.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the pixel-to-angle camera model")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--sim', action='store_true', help="Calibrate against the virtual rig")
+    mode.add_argument('--rig', action='store_true', help="Calibrate the real camera + servos")
+    parser.add_argument('--output', default=None, help="Where to save the calibration JSON")
+    args = parser.parse_args()
+
+    from sentry_service import CAMERA_CALIBRATION_FILE
+
+    print("=" * 60)
+    print("  CAMERA MODEL CALIBRATION")
+    print("=" * 60)
+    model, report = calibrate_simulated() if args.sim else calibrate_rig()
+    for key, value in report.items():
+        print(f"  {key:18s} {value}")
+
+    # Simulated calibration is only saved when explicitly asked to
+    output = args.output or (CAMERA_CALIBRATION_FILE if args.rig else None)
+    if output:
+        model.save(output)
+        print(f"[OK] Calibration saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
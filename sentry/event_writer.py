@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Write-behind event inserts for the analysis pipeline.
+
+Every published snapshot used to do its own events-table insert. EventWriter
+buffers events and inserts them as one multi-row request when max_batch
+events are waiting or max_delay has passed since the first one. submit()
+returns at once with a Future (the async acknowledgement) that resolves to
+the stored row - with its real ID - once the batch is written, or to the
+exception if the insert still fails after the retries (exponential backoff
+with jitter). A batch that still fails is then split in halves so a single
+row the store rejects doesn't take the rest of the batch down with it.
+close() flushes what is buffered.
+"""
+
+import random
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from queue import Queue
+
+from analysis_pipeline import collect_batch, join_queue
+
+
+class EventWriter:
+    """
+    Args:
+        insert_rows: Callable(list of event dicts) -> list of stored rows (same order)
+        max_batch: Events per insert request
+        max_delay: Max seconds an event waits for its batch to fill
+        max_retries: Retries of a failed batch before its futures fail
+        backoff: First retry delay (seconds), doubled per retry
+        max_backoff: Retry delay cap (seconds)
+        max_pending: Buffered events before submit() fails fast
+    """
+
+    def __init__(self, insert_rows, max_batch=50, max_delay=0.5, max_retries=5, backoff=0.5, max_backoff=10.0,
+                 max_pending=5000):
+        self.insert_rows = insert_rows
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_pending = max_pending
+
+        self.queue = Queue()
+        self.stop_event = threading.Event()
+        self.stats = Counter()
+        self.thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, event):
+        """
+        Buffer an event for insertion.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the stored row (or the insert error)
+        """
+        future = Future()
+        if self.queue.qsize() >= self.max_pending:
+            self.stats['rejected'] += 1
+            future.set_exception(RuntimeError("Event writer backlog full"))
+            return future
+        self.stats['submitted'] += 1
+        self.queue.put((event, future))
+        return future
+
+    def _run(self):
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            batch = collect_batch(self.queue, self.max_batch, self.max_delay, poll=0.5)
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write(self, batch):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            error = self._insert(batch)
+            if error is None:
+                return
+            if attempt == self.max_retries:
+                break
+            self.stats['retries'] += 1
+            wait = min(self.max_backoff, delay) * random.uniform(0.5, 1.0)
+            print(f"[EVENTS] Insert failed ({error}) - retrying in {wait:.1f}s")
+            self.stop_event.wait(wait)  # Returns at once while shutting down
+            delay *= 2
+
+        print(f"[EVENTS] Insert of {len(batch)} event(s) failed after {self.max_retries + 1} attempts: {error}")
+        self._isolate(batch, error)
+
+    def _isolate(self, batch, error):
+        """
+        Bisect a batch that still fails after its retries, so a row the store
+        rejects only fails itself. Stops splitting when both halves fail - the
+        store is down, not a bad row - and fails what is left.
+        """
+        if len(batch) == 1:
+            self._fail(batch, error)
+            return
+        middle = len(batch) // 2
+        halves = [batch[:middle], batch[middle:]]
+        self.stats['splits'] += 1
+        errors = [self._insert(half) for half in halves]
+        if all(errors):
+            for half, half_error in zip(halves, errors):
+                self._fail(half, half_error)
+            return
+        for half, half_error in zip(halves, errors):
+            if half_error is not None:
+                self._isolate(half, half_error)
+
+    def _insert(self, batch):
+        """One insert request. Resolves the futures on success, returns the error otherwise."""
+        try:
+            stored = self.insert_rows([event for event, _ in batch]) or []
+        except Exception as e:
+            return e
+        self.stats['batches'] += 1
+        self.stats['written'] += len(batch)
+        for i, (event, future) in enumerate(batch):
+            future.set_result(stored[i] if i < len(stored) else dict(event))
+        return None
+
+    def _fail(self, batch, error):
+        self.stats['failed'] += len(batch)
+        for _, future in batch:
+            future.set_exception(error)
+
+    def flush(self, timeout=10.0):
+        """Wait until every buffered event has been written (or failed). Returns False on timeout."""
+        return join_queue(self.queue, timeout)
+
+    def close(self, timeout=10.0):
+        """Flush buffered events and stop the writer thread."""
+        flushed = self.flush(timeout)
+        self.stop_event.set()
+        if not flushed:
+            print(f"[EVENTS] {self.queue.qsize()} event(s) not written before shutdown")
+        return flushed
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        batches = stats.get('batches', 0)
+        stats['pending'] = self.queue.qsize()
+        stats['avg_batch_size'] = round(stats.get('written', 0) / batches, 1) if batches else 0.0
+        return stats
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Best-frame selection for sentry snapshots.
+
+The first frame a track shows up in is often motion-blurred or cut off at the
+frame edge. Instead of sending it, a short candidate window is opened per track
+and each detection frame is scored on:
+
+- sharpness (variance of the Laplacian, on a size-normalized crop)
+- bbox size (bigger = more detail)
+- face presence (optional detector callback)
+- truncation (bbox touching the frame edge)
+
+The best K candidates are kept (crop + optional context thumbnail, copied
+because the frame is drawn on afterwards); when the window closes only the
+winner is encoded and sent.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+
+import cv2
+
+from snapshot_encoder import limit_dimension, padded_region
+
+SCORE_WEIGHTS = {'sharpness': 0.45, 'size': 0.25, 'face': 0.2, 'truncation': 0.3}
+SHARPNESS_REFERENCE = 300.0  # Laplacian variance scored as fully sharp
+SHARPNESS_HEIGHT = 128  # Crops are resized to this height before measuring sharpness
+SIZE_REFERENCE = 0.2  # Fraction of the frame area scored as full size
+EDGE_MARGIN = 4  # Pixels from the frame edge that count as truncated
+
+
+def sharpness(image):
+    """Variance of the Laplacian on a grayscale copy resized to SHARPNESS_HEIGHT."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    if gray.shape[0] > SHARPNESS_HEIGHT:
+        scale = SHARPNESS_HEIGHT / gray.shape[0]
+        gray = cv2.resize(gray, (max(1, int(gray.shape[1] * scale)), SHARPNESS_HEIGHT),
+                          interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def truncated_edges(bbox, width, height, margin=EDGE_MARGIN):
+    """Number of frame edges (0-4) the bbox touches."""
+    x1, y1, x2, y2 = bbox
+    return sum((x1 <= margin, y1 <= margin, x2 >= width - margin, y2 >= height - margin))
+
+
+def score_frame(frame, bbox, has_face=False):
+    """
+    Score a person crop for snapshot quality.
+
+    Returns:
+        tuple: (score, components dict)
+    """
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = bbox
+    crop = frame[max(0, int(y1)):min(height, int(y2)), max(0, int(x1)):min(width, int(x2))]
+    if crop.size == 0:
+        return 0.0, {}
+
+    components = {
+        'sharpness': min(1.0, math.log1p(sharpness(crop)) / math.log1p(SHARPNESS_REFERENCE)),
+        'size': min(1.0, (x2 - x1) * (y2 - y1) / (width * height) / SIZE_REFERENCE),
+        'face': 1.0 if has_face else 0.0,
+        'truncation': truncated_edges(bbox, width, height) / 2.0
+    }
+    score = (SCORE_WEIGHTS['sharpness'] * components['sharpness'] +
+             SCORE_WEIGHTS['size'] * components['size'] +
+             SCORE_WEIGHTS['face'] * components['face'] -
+             SCORE_WEIGHTS['truncation'] * components['truncation'])
+    return score, components
+
+
+class _Window:
+    """Open candidate window for one track."""
+
+    def __init__(self, reason, opened_at):
+        self.reason = reason
+        self.opened_at = opened_at
+        self.last_seen = opened_at
+        self.candidates = []  # min-heap of (score, seq, candidate)
+        self.frames_scored = 0
+        self.first_score = None
+
+
+class BestFrameSelector:
+    """
+    Keeps the best K snapshot candidates per track over a short window.
+
+    Args:
+        window: Seconds a candidate window stays open
+        top_k: Candidates kept per track
+        crop_padding: Context padding kept around the bbox (fraction of its size)
+        context_dimension: If set, also keep a full-frame thumbnail of this size per candidate
+        face_detector: Optional callable(frame, bbox) -> bool, only run on candidates that
+            could make the top K
+    """
+
+    def __init__(self, window=1.0, top_k=3, crop_padding=0.25, context_dimension=None, face_detector=None):
+        self.window = window
+        self.top_k = top_k
+        self.crop_padding = crop_padding
+        self.context_dimension = context_dimension
+        self.face_detector = face_detector
+
+        self.lock = threading.Lock()
+        self.windows = {}  # {track_id: _Window}
+        self.sequence = itertools.count()
+
+        self.selections = 0
+        self.frames_scored = 0
+        self.total_winner_score = 0.0
+        self.total_first_score = 0.0
+
+    def is_open(self, track_id):
+        return track_id in self.windows
+
+    def open(self, track_id, reason, now):
+        """Start collecting candidates for a track (no-op if a window is already open)."""
+        with self.lock:
+            if track_id not in self.windows:
+                self.windows[track_id] = _Window(reason, now)
+
+    def add(self, track_id, frame, bbox, now, timestamp=None, angles=None):
+        """
+        Score a detection frame for an open window and keep it if it is in the top K.
+        `timestamp` and `angles` (servo pan/tilt at capture) are passed through to the candidate.
+
+        Returns:
+            float: The candidate's score (None if no window is open for the track)
+        """
+        window = self.windows.get(track_id)
+        if window is None:
+            return None
+
+        base_score, components = score_frame(frame, bbox)
+        lowest = window.candidates[0][0] if len(window.candidates) >= self.top_k else None
+        has_face = False
+        # Face detection is the expensive part - skip it if the frame can't make the cut anyway
+        if self.face_detector and (lowest is None or base_score + SCORE_WEIGHTS['face'] > lowest):
+            has_face = bool(self.face_detector(frame, bbox))
+        score = base_score + (SCORE_WEIGHTS['face'] if has_face else 0.0)
+
+        with self.lock:
+            window.last_seen = now
+            window.frames_scored += 1
+            self.frames_scored += 1
+            if window.first_score is None:
+                window.first_score = score
+            if lowest is not None and score <= lowest:
+                return score
+
+            left, top, right, bottom = padded_region(frame.shape, bbox, self.crop_padding)
+            candidate = {
+                'crop': frame[top:bottom, left:right].copy(),
+                'bbox': [bbox[0] - left, bbox[1] - top, bbox[2] - left, bbox[3] - top],  # Relative to crop
+                'frame_bbox': list(bbox),
+                'context': (limit_dimension(frame, self.context_dimension).copy()
+                            if self.context_dimension else None),
+                'score': round(score, 3),
+                'components': {k: round(v, 3) for k, v in components.items()},
+                'has_face': has_face,
+                'timestamp': timestamp,
+                'angles': angles
+            }
+            candidates = window.candidates
+            entry = (score, next(self.sequence), candidate)
+            if len(candidates) < self.top_k:
+                heapq.heappush(candidates, entry)
+            else:
+                heapq.heapreplace(candidates, entry)
+        return score
+
+    def pop_ready(self, now, lost_timeout=None):
+        """
+        Close windows that have run their course (or whose track vanished).
+
+        Returns:
+            list of (track_id, reason, winning candidate dict)
+        """
+        lost_timeout = lost_timeout if lost_timeout is not None else self.window
+        ready = []
+        with self.lock:
+            for track_id, window in list(self.windows.items()):
+                if now - window.opened_at < self.window and now - window.last_seen < lost_timeout:
+                    continue
+                del self.windows[track_id]
+                if not window.candidates:
+                    continue
+                winner = max(window.candidates, key=lambda entry: entry[0])[2]
+                winner['frames_scored'] = window.frames_scored
+                self.selections += 1
+                self.total_winner_score += winner['score']
+                self.total_first_score += window.first_score
+                ready.append((track_id, window.reason, winner))
+        return ready
+
+    def get_stats(self):
+        with self.lock:
+            stats = {
+                'window_seconds': self.window,
+                'top_k': self.top_k,
+                'open_windows': len(self.windows),
+                'selections': self.selections,
+                'frames_scored': self.frames_scored
+            }
+            if self.selections:
+                stats['avg_winner_score'] = round(self.total_winner_score / self.selections, 3)
+                stats['avg_first_frame_score'] = round(self.total_first_score / self.selections, 3)
+            return stats
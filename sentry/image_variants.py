@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Thumbnail / medium / full variants of uploaded snapshots.
+
+Event lists used to load the full image even at thumbnail size. Every uploaded
+image now gets smaller JPEG variants stored next to it under a fixed path
+scheme (variants/<name>/<path>), so the URL of each variant follows from the
+event's image_url and no extra column is needed:
+
+    .../security-frames/frame_x.jpg                      full
+    .../security-frames/variants/thumbnail/frame_x.jpg   longest side 160 px
+    .../security-frames/variants/medium/frame_x.jpg      longest side 640 px
+
+Variants are generated and uploaded off the publish / request path by
+VariantWorker (a small thread pool; OpenCV releases the GIL while resizing and
+encoding). Events older than this scheme have no variants, so clients fall
+back to the full image when a variant fails to load.
+"""
+
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from snapshot_encoder import limit_dimension
+
+# name -> (max longest side, JPEG quality)
+IMAGE_VARIANTS = {
+    'thumbnail': (160, 70),
+    'medium': (640, 80),
+}
+
+
+def variant_path(path, variant):
+    """Storage path of a variant of the image stored at `path`."""
+    return f"variants/{variant}/{path}"
+
+
+def variant_urls(image_url):
+    """{'thumbnail', 'medium', 'full'} URLs for an image URL (None if there is no image)."""
+    if not image_url:
+        return None
+    base, _, name = image_url.rpartition('/')
+    urls = {variant: f"{base}/{variant_path(name, variant)}" for variant in IMAGE_VARIANTS}
+    urls['full'] = image_url
+    return urls
+
+
+def make_variants(image_data):
+    """
+    Encode the variants of a JPEG/PNG image.
+
+    Returns:
+        dict: variant name -> JPEG bytes (empty if the image can't be decoded)
+    """
+    image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return {}
+    variants = {}
+    for variant, (max_dimension, quality) in IMAGE_VARIANTS.items():
+        ok, buffer = cv2.imencode('.jpg', limit_dimension(image, max_dimension),
+                                  [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            variants[variant] = buffer.tobytes()
+    return variants
+
+
+class VariantWorker:
+    """
+    Generates and uploads image variants on a thread pool.
+
+    Args:
+        upload: Callable(path, data, content_type) that stores a file
+        workers: Threads
+        max_pending: Images waiting or in progress before submit() drops new ones
+    """
+
+    def __init__(self, upload, workers=2, max_pending=200):
+        self.upload = upload
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-variants")
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.stats = Counter()
+
+    def submit(self, path, image_data):
+        """Queue variant generation for the image stored at `path`. Returns False if it was dropped."""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.stats['dropped'] += 1
+                return False
+            self.pending += 1
+        self.executor.submit(self._run, path, image_data)
+        return True
+
+    def _run(self, path, image_data):
+        try:
+            for variant, data in make_variants(image_data).items():
+                self.upload(variant_path(path, variant), data, "image/jpeg")
+                self.stats['uploaded'] += 1
+            self.stats['images'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"[VARIANTS] Failed for {path}: {e}")
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def get_stats(self):
+        return dict(self.stats, pending=self.pending)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Activity-weighted patrol planner for the pan/tilt sentry.
+
+Keeps a compact, exponentially decaying histogram of where people show up
+(pan/tilt cells, in servo angles) and turns it into a stop-and-stare patrol:
+a boustrophedon sweep over dwell points one field of view apart, where each
+point's dwell time is proportional to the square root of its share of recent
+activity (the classic allocation that minimizes expected time-to-detect for
+repeated search). Every point keeps a minimum dwell so quiet areas are still
+checked, and the decay lets the plan follow changes in site traffic.
+
+The histogram is persisted to JSON so the learned layout survives restarts.
+"""
+
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+
+class PatrolPlanner:
+    """
+    Plans dwell points and dwell times from a detection histogram.
+
+    Args:
+        pan_range, tilt_range: (min, max) servo angles the patrol may use
+        hfov, vfov: Camera field of view (degrees) - sets dwell point spacing
+        cell_size: Histogram cell size (degrees)
+        half_life: Histogram decay half-life (seconds)
+        cycle_time: Target duration of one patrol sweep (seconds)
+        min_dwell, max_dwell: Dwell time bounds per point (seconds)
+        prior: Pseudo-count per cell so unseen areas keep some weight
+        default_tilt: Tilt used for columns without activity
+        overlap: Fraction of the FOV adjacent dwell points overlap
+        arrive_tolerance: Degrees from a dwell point that count as arrived
+    """
+
+    def __init__(self, pan_range, tilt_range, hfov=60.0, vfov=45.0, cell_size=5.0,
+                 half_life=7 * 24 * 3600, cycle_time=12.0, min_dwell=0.5, max_dwell=4.0,
+                 prior=0.05, default_tilt=90.0, overlap=0.2, arrive_tolerance=1.5):
+        self.pan_range = pan_range
+        self.tilt_range = tilt_range
+        self.hfov = hfov
+        self.vfov = vfov
+        self.cell_size = cell_size
+        self.half_life = half_life
+        self.cycle_time = cycle_time
+        self.min_dwell = min_dwell
+        self.max_dwell = max_dwell
+        self.prior = prior
+        self.default_tilt = default_tilt
+        self.overlap = overlap
+        self.arrive_tolerance = arrive_tolerance
+
+        self.pan_cells = max(1, int(math.ceil((pan_range[1] - pan_range[0]) / cell_size)))
+        self.tilt_cells = max(1, int(math.ceil((tilt_range[1] - tilt_range[0]) / cell_size)))
+        self.histogram = np.zeros((self.tilt_cells, self.pan_cells), dtype=np.float32)
+        self.last_decay = time.time()
+        self.total_recorded = 0
+
+        # Patrol execution state
+        self.plan = []  # [{'pan', 'tilt', 'dwell', 'probability'}]
+        self.index = 0
+        self.direction = 1
+        self.arrived_at = None
+        self.replan()
+
+    # ----------------------------------------
+    # Histogram
+    # ----------------------------------------
+
+    def _cell(self, pan, tilt):
+        col = int((pan - self.pan_range[0]) // self.cell_size)
+        row = int((tilt - self.tilt_range[0]) // self.cell_size)
+        return min(max(row, 0), self.tilt_cells - 1), min(max(col, 0), self.pan_cells - 1)
+
+    def _decay(self, now):
+        elapsed = now - self.last_decay
+        if elapsed > 0:
+            self.histogram *= 0.5 ** (elapsed / self.half_life)
+            self.last_decay = now
+
+    def record_detection(self, pan, tilt, weight=1.0, now=None):
+        """Record a person seen at absolute servo angles (pan, tilt)."""
+        self._decay(now if now is not None else time.time())
+        row, col = self._cell(pan, tilt)
+        self.histogram[row, col] += weight
+        self.total_recorded += 1
+
+    def cell_center(self, row, col):
+        return (self.pan_range[0] + (col + 0.5) * self.cell_size,
+                self.tilt_range[0] + (row + 0.5) * self.cell_size)
+
+    # ----------------------------------------
+    # Planning
+    # ----------------------------------------
+
+    def dwell_pans(self):
+        """Pan angles of the dwell points, one (overlapping) FOV apart."""
+        low, high = self.pan_range
+        spacing = self.hfov * (1 - self.overlap)
+        inner_low, inner_high = low + self.hfov / 2, high - self.hfov / 2
+        if inner_high <= inner_low:
+            return [(low + high) / 2]
+        count = int(math.ceil((inner_high - inner_low) / spacing)) + 1
+        return list(np.linspace(inner_low, inner_high, count))
+
+    def replan(self, now=None):
+        """Recompute dwell points and dwell times from the (decayed) histogram."""
+        self._decay(now if now is not None else time.time())
+        weights = self.histogram + self.prior
+        cell_pans = self.pan_range[0] + (np.arange(self.pan_cells) + 0.5) * self.cell_size
+        cell_tilts = self.tilt_range[0] + (np.arange(self.tilt_cells) + 0.5) * self.cell_size
+
+        plan = []
+        for pan in self.dwell_pans():
+            in_view = np.abs(cell_pans - pan) <= self.hfov / 2
+            column = weights[:, in_view]
+            mass = float(column.sum())
+
+            # Aim at the activity-weighted tilt of this column (prior alone -> default tilt)
+            activity = self.histogram[:, in_view].sum(axis=1)
+            if activity.sum() > 0:
+                tilt = float((activity * cell_tilts).sum() / activity.sum())
+            else:
+                tilt = self.default_tilt
+            tilt = min(max(tilt, self.tilt_range[0]), self.tilt_range[1])
+            plan.append({'pan': float(pan), 'tilt': tilt, 'mass': mass})
+
+        total_mass = sum(p['mass'] for p in plan) or 1.0
+        sqrt_total = sum(math.sqrt(p['mass'] / total_mass) for p in plan) or 1.0
+        for point in plan:
+            probability = point.pop('mass') / total_mass
+            dwell = self.cycle_time * math.sqrt(probability) / sqrt_total
+            point['probability'] = round(probability, 4)
+            point['dwell'] = round(min(max(dwell, self.min_dwell), self.max_dwell), 2)
+
+        self.plan = plan
+        self.index = min(self.index, len(plan) - 1)
+        return plan
+
+    def expected_time_to_detect(self, plan=None, slew_time=0.2):
+        """
+        Expected wait before a person appearing at a random time is in view.
+        Someone appearing at point i while the camera is elsewhere waits, on
+        average, half of the time until the next visit.
+        """
+        plan = plan if plan is not None else self.plan
+        if len(plan) <= 1:
+            return 0.0
+        cycle = sum(p['dwell'] + slew_time for p in plan)
+        return sum(p['probability'] * (cycle - p['dwell']) ** 2 / (2 * cycle) for p in plan)
+
+    # ----------------------------------------
+    # Execution
+    # ----------------------------------------
+
+    def reset(self, current_pan=None):
+        """Restart the patrol (e.g. after losing a target) from the dwell point nearest current_pan."""
+        self.arrived_at = None
+        if current_pan is not None and self.plan:
+            self.index = min(range(len(self.plan)), key=lambda i: abs(self.plan[i]['pan'] - current_pan))
+
+    def next_setpoint(self, current_pan, current_tilt, now=None):
+        """
+        Get the servo setpoint for the patrol.
+
+        Args:
+            current_pan, current_tilt: Current servo angles
+            now: Current time (time.monotonic())
+
+        Returns:
+            tuple: (pan, tilt) to hold
+        """
+        now = now if now is not None else time.monotonic()
+        point = self.plan[self.index]
+
+        if self.arrived_at is None:
+            if (abs(current_pan - point['pan']) <= self.arrive_tolerance and
+                    abs(current_tilt - point['tilt']) <= self.arrive_tolerance):
+                self.arrived_at = now
+        elif now - self.arrived_at >= point['dwell']:
+            self._advance()
+            point = self.plan[self.index]
+
+        return point['pan'], point['tilt']
+
+    def _advance(self):
+        self.arrived_at = None
+        if len(self.plan) == 1:
+            return
+        next_index = self.index + self.direction
+        if not 0 <= next_index < len(self.plan):
+            # End of a sweep - reverse and pick up any new activity
+            self.direction = -self.direction
+            self.replan()
+            next_index = self.index + self.direction
+        self.index = next_index
+
+    # ----------------------------------------
+    # Persistence / stats
+    # ----------------------------------------
+
+    def save(self, path):
+        """Persist the histogram (compact JSON, rounded counts)."""
+        data = {
+            'pan_range': list(self.pan_range),
+            'tilt_range': list(self.tilt_range),
+            'cell_size': self.cell_size,
+            'saved_at': self.last_decay,
+            'total_recorded': self.total_recorded,
+            'histogram': np.round(self.histogram, 3).tolist()
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Load a saved histogram. Returns False if missing or the grid changed."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            histogram = np.array(data.get('histogram', []), dtype=np.float32)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"[PATROL] Failed to load histogram {path}: {e}")
+            return False
+
+        if (tuple(data.get('pan_range', ())) != tuple(self.pan_range) or
+                tuple(data.get('tilt_range', ())) != tuple(self.tilt_range) or
+                data.get('cell_size') != self.cell_size or
+                histogram.shape != self.histogram.shape):
+            print("[PATROL] Saved histogram grid does not match - starting fresh")
+            return False
+
+        self.histogram = histogram
+        self.last_decay = data.get('saved_at', time.time())
+        self.total_recorded = data.get('total_recorded', 0)
+        self.replan()
+        print(f"[PATROL] Loaded activity histogram ({self.total_recorded} detections)")
+        return True
+
+    def get_stats(self):
+        """Planner state for the stats API (JSON serializable)."""
+        hot = np.argsort(self.histogram, axis=None)[::-1][:5]
+        hotspots = []
+        for flat in hot:
+            row, col = np.unravel_index(flat, self.histogram.shape)
+            if self.histogram[row, col] <= 0:
+                break
+            pan, tilt = self.cell_center(row, col)
+            hotspots.append({'pan': pan, 'tilt': tilt, 'weight': round(float(self.histogram[row, col]), 3)})
+
+        return {
+            'cells': int(self.histogram.size),
+            'total_recorded': self.total_recorded,
+            'activity_weight': round(float(self.histogram.sum()), 3),
+            'half_life_hours': round(self.half_life / 3600, 1),
+            'dwell_points': self.plan,
+            'current_point': self.index,
+            'cycle_time': round(sum(p['dwell'] for p in self.plan), 2),
+            'expected_time_to_detect': round(self.expected_time_to_detect(), 2),
+            'hotspots': hotspots
+        }
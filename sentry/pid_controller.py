@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+PID tracking controller with latency compensation for the pan/tilt sentry.
+
+Detections are several frames old by the time they reach the servos, and the
+camera has kept moving in the meantime. Instead of applying a proportional gain
+to a stale pixel error, the controller:
+
+1. Converts the target's pixel position to a servo offset with the camera
+   model (camera_model.py) and adds it to the servo angle *at capture time*,
+   giving the target's absolute angle when the frame was taken.
+2. Predicts where the target is now from its estimated angular velocity
+   (feed-forward over the capture -> command latency).
+3. Runs a PID with anti-windup on the remaining error against the current
+   servo angle. The integral is held both when the output is clamped and when
+   the correction is more than the servo can cover before the next measurement
+   at its speed limit (otherwise it winds up during a long slew and
+   overshoots). The first measurement of a new target skips the PID and moves
+   straight to the computed angle (one-step acquisition).
+
+Cached detections (same capture timestamp) are ignored so a single measurement
+is never applied more than once.
+"""
+
+from collections import deque
+
+
+class AngleHistory:
+    """Ring buffer of (timestamp, pan, tilt) servo positions, recorded per control tick."""
+
+    def __init__(self, maxlen=200):
+        self.samples = deque(maxlen=maxlen)
+
+    def record(self, timestamp, pan, tilt):
+        self.samples.append((timestamp, float(pan), float(tilt)))
+
+    def angle_at(self, timestamp):
+        """
+        Get the servo angles at a past timestamp (linearly interpolated).
+
+        Returns:
+            tuple: (pan, tilt), or None if no samples were recorded yet
+        """
+        samples = list(self.samples)  # Snapshot - the control thread keeps appending
+        if not samples:
+            return None
+
+        newer = None
+        for t, pan, tilt in reversed(samples):
+            if t <= timestamp:
+                if newer is None:
+                    return pan, tilt
+                t1, pan1, tilt1 = newer
+                alpha = (timestamp - t) / (t1 - t) if t1 > t else 0.0
+                return pan + (pan1 - pan) * alpha, tilt + (tilt1 - tilt) * alpha
+            newer = (t, pan, tilt)
+
+        # Older than the history - best guess is the oldest sample
+        return newer[1], newer[2]
+
+
+class PIDController:
+    """Single-axis PID with integral clamping and conditional integration (anti-windup)."""
+
+    def __init__(self, kp, ki=0.0, kd=0.0, integral_limit=None, output_limit=None):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.integral_limit = integral_limit
+        self.output_limit = output_limit
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.prev_error = None
+
+    def update(self, error, dt, max_step=None):
+        """
+        Compute the controller output for a new error sample.
+
+        Args:
+            error: Current error (degrees)
+            dt: Seconds since the previous sample
+            max_step: Most the actuator can move before the next sample (degrees); a
+                larger output is rate-limited downstream, so the integral is held
+
+        Returns:
+            float: Correction to apply (degrees)
+        """
+        derivative = 0.0
+        if self.prev_error is not None and dt > 0:
+            derivative = (error - self.prev_error) / dt
+        self.prev_error = error
+
+        integral = self.integral + error * max(dt, 0.0)
+        if self.integral_limit is not None:
+            integral = max(-self.integral_limit, min(self.integral_limit, integral))
+
+        output = self.kp * error + self.ki * integral + self.kd * derivative
+
+        saturated = max_step is not None and abs(output) > max_step
+        if self.output_limit is not None and abs(output) > self.output_limit:
+            output = max(-self.output_limit, min(self.output_limit, output))
+            saturated = True
+        # Saturated: only accept the integral if it pulls the output back in
+        if saturated and (integral > self.integral) == (output > 0):
+            return output
+
+        self.integral = integral
+        return output
+
+
+class _Axis:
+    """Per-axis state: PID plus target angle / velocity estimate."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.target_angle = None
+        self.velocity = 0.0
+
+    def reset(self):
+        self.pid.reset()
+        self.target_angle = None
+        self.velocity = 0.0
+
+
+class PanTiltController:
+    """
+    Latency-compensated PID controller for both servo axes.
+
+    Args:
+        camera_model: CameraModel mapping pixel positions to servo offsets
+        kp, ki, kd: PID gains on the angular error (degrees)
+        acquire_gain: Fraction of the error corrected on the first measurement of a new target
+        feedforward: Fraction of the estimated target velocity used for prediction
+        velocity_smoothing: EMA factor for the velocity estimate (0..1, higher = more responsive)
+        max_latency: Cap on the latency that is compensated (seconds)
+        integral_limit: Anti-windup clamp on the integral term (degree-seconds)
+        output_limit: Max correction per measurement (degrees)
+        max_speed: Servo speed limit (degrees/s) for anti-windup (None = unlimited)
+        deadband_x, deadband_y: Pixel distance from the principal point treated as centered
+    """
+
+    def __init__(self, camera_model, kp=0.6, ki=0.3, kd=0.02, acquire_gain=1.0,
+                 feedforward=1.0, velocity_smoothing=0.5, max_latency=0.5,
+                 integral_limit=5.0, output_limit=30.0, max_speed=None, deadband_x=0, deadband_y=0):
+        self.camera_model = camera_model
+        self.max_speed = max_speed
+        self.acquire_gain = acquire_gain
+        self.feedforward = feedforward
+        self.velocity_smoothing = velocity_smoothing
+        self.max_latency = max_latency
+        self.deadband_x = deadband_x
+        self.deadband_y = deadband_y
+
+        self.pan = _Axis(PIDController(kp, ki, kd, integral_limit, output_limit))
+        self.tilt = _Axis(PIDController(kp, ki, kd, integral_limit, output_limit))
+        self.last_capture_time = None
+        self.last_latency = 0.0
+
+    def reset(self):
+        """Forget the current target (call on lock/unlock)."""
+        self.pan.reset()
+        self.tilt.reset()
+        self.last_capture_time = None
+
+    def update(self, target_x, target_y, capture_time, angles_at_capture, current_angles, now):
+        """
+        Compute new pan/tilt setpoints from a target measurement.
+
+        Args:
+            target_x, target_y: Target position (pixels) in the captured frame
+            capture_time: When the frame was captured (time.monotonic())
+            angles_at_capture: (pan, tilt) servo angles when the frame was captured
+            current_angles: (pan, tilt) servo angles now
+            now: Current time (time.monotonic())
+
+        Returns:
+            tuple: (target_pan, target_tilt), or None if this measurement was already used
+        """
+        if self.last_capture_time is not None and capture_time <= self.last_capture_time:
+            return None
+        dt = capture_time - self.last_capture_time if self.last_capture_time is not None else 0.0
+        self.last_capture_time = capture_time
+
+        latency = min(max(now - capture_time, 0.0), self.max_latency)
+        self.last_latency = latency
+
+        pan_offset, tilt_offset = self.camera_model.pixel_to_angle(target_x, target_y)
+        if abs(target_x - self.camera_model.cx) < self.deadband_x:
+            pan_offset = 0.0
+        if abs(target_y - self.camera_model.cy) < self.deadband_y:
+            tilt_offset = 0.0
+
+        target_pan = self._update_axis(self.pan, angles_at_capture[0] + pan_offset,
+                                       current_angles[0], dt, latency)
+        target_tilt = self._update_axis(self.tilt, angles_at_capture[1] + tilt_offset,
+                                        current_angles[1], dt, latency)
+        return target_pan, target_tilt
+
+    def _update_axis(self, axis, measured_angle, current_angle, dt, latency):
+        if axis.target_angle is None:
+            # New target - jump straight to it, the PID takes over from the next measurement
+            axis.target_angle = measured_angle
+            return current_angle + self.acquire_gain * (measured_angle - current_angle)
+
+        # Estimate target angular velocity from successive absolute measurements
+        if dt > 0:
+            raw_velocity = (measured_angle - axis.target_angle) / dt
+            axis.velocity += self.velocity_smoothing * (raw_velocity - axis.velocity)
+        axis.target_angle = measured_angle
+
+        predicted = measured_angle + self.feedforward * axis.velocity * latency
+        # The next measurement is about dt away - the servo covers max_speed * dt until then
+        max_step = self.max_speed * dt if self.max_speed is not None and dt > 0 else None
+        correction = axis.pid.update(predicted - current_angle, dt, max_step)
+        return current_angle + correction
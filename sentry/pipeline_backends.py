@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Pluggable backends for the snapshot analysis pipeline.
+
+The pipeline talks to three services through small duck-typed interfaces:
+
+- analyzer: analyze(images, image_names, before_request) -> list of result
+  dicts ({'status', 'analysis', 'severity', 'timestamp', ...}, one per image,
+  same shape as gemini_description.analyze_security_images_data);
+  before_request() is called before every extra request the analyzer makes
+  beyond the first (fallbacks) and returns False to skip it
+- event store: upload_image(path, data, content_type) -> public URL and
+  insert_events(list of event dicts) -> stored rows (with IDs), one request
+  per call (the pipeline batches through event_writer.EventWriter)
+- alert sink: send(event_type, description, severity, image_url)
+
+The production backends wrap Gemini, Supabase and Discord (create_backends()).
+The local ones have the same interface and need no network, so the pipeline
+can be load tested (see pipeline_loadtest.py):
+
+- MockAnalyzer: configurable latency distribution (lognormal) and error /
+  timeout rates
+- LocalEventStore: SQLite events table + image files on disk
+- WebhookAlertSink: POSTs alerts as JSON to any HTTP endpoint
+"""
+
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+SEVERITIES = ('info', 'warning', 'critical')
+
+
+class PipelineBackends:
+    """
+    The analyzer, event store and alert sink used by the pipeline.
+
+    Args:
+        analyzer: Object with analyze(images, image_names, before_request)
+        store: Object with upload_image(path, data, content_type) and insert_events(events)
+        alerts: Object with send(event_type, description, severity, image_url) (None = no alerts)
+    """
+
+    def __init__(self, analyzer, store, alerts=None):
+        self.analyzer = analyzer
+        self.store = store
+        self.alerts = alerts
+
+
+# ========================================
+# Production backends
+# ========================================
+
+class GeminiAnalyzer:
+    """Multi-image Gemini requests (gemini/gemini_description.py)."""
+
+    def __init__(self):
+        sys.path.insert(0, str(Path(__file__).parent.parent / 'gemini'))
+        from gemini_description import analyze_security_images_data
+        self._analyze = analyze_security_images_data
+
+    def analyze(self, images, image_names=None, before_request=None):
+        return self._analyze(images, image_names=image_names, before_request=before_request)
+
+
+class SupabaseEventStore:
+    """Supabase Storage bucket for the JPEGs and the events table."""
+
+    def __init__(self, client, bucket="security-frames"):
+        self.client = client
+        self.bucket = bucket
+
+    def upload_image(self, path, data, content_type="image/jpeg"):
+        storage = self.client.storage.from_(self.bucket)
+        storage.upload(path=path, file=data,
+                       file_options={"content-type": content_type, "upsert": "true"})  # Idempotent on replay
+        return storage.get_public_url(path)
+
+    def insert_events(self, events):
+        return self.client.table("events").insert(events).execute().data or []
+
+    def insert_event(self, event):
+        rows = self.insert_events([event])
+        return rows[0].get('id') if rows else None
+
+
+class DiscordAlertSink:
+    """Discord webhook embeds (web/alerts.py)."""
+
+    def __init__(self):
+        sys.path.insert(0, str(Path(__file__).parent.parent / 'web'))
+        from alerts import send_discord_alert
+        self._send = send_discord_alert
+
+    def send(self, event_type, description, severity, image_url=None):
+        self._send(event_type=event_type, description=description, severity=severity, image_url=image_url)
+
+
+def create_backends():
+    """
+    Gemini + Supabase + Discord, configured from the environment (.env).
+
+    Raises:
+        RuntimeError: If Supabase is not configured
+    """
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+    if not (url and key):
+        raise RuntimeError("Supabase not configured (SUPABASE_URL / SUPABASE_KEY)")
+    return PipelineBackends(GeminiAnalyzer(), SupabaseEventStore(create_client(url, key)), DiscordAlertSink())
+
+
+# ========================================
+# Local backends (load testing)
+# ========================================
+
+class MockAnalyzer:
+    """
+    Stand-in for Gemini with a lognormal request latency and random failures.
+
+    Args:
+        latency: Median seconds per request
+        latency_sigma: Lognormal shape (0 = fixed latency; ~0.5 gives a realistic long tail)
+        per_image_latency: Extra seconds per image in a batch request
+        error_rate: Probability a request fails (every image in it gets an error result)
+        timeout_rate: Probability a request hangs for `timeout` seconds and then fails
+        timeout: Seconds a timed-out request takes
+        severity_weights: Relative frequency of info / warning / critical results
+        seed: RNG seed (None = random)
+    """
+
+    def __init__(self, latency=1.5, latency_sigma=0.5, per_image_latency=0.2, error_rate=0.02,
+                 timeout_rate=0.0, timeout=30.0, severity_weights=(0.85, 0.12, 0.03), seed=None):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.per_image_latency = per_image_latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout = timeout
+        self.severity_weights = severity_weights
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.images = 0
+        self.errors = 0
+
+    def analyze(self, images, image_names=None, before_request=None):
+        with self.lock:
+            self.requests += 1
+            self.images += len(images)
+            roll = self.random.random()
+            delay = (self.latency * math.exp(self.random.gauss(0, self.latency_sigma)) +
+                     self.per_image_latency * (len(images) - 1))
+            severities = self.random.choices(SEVERITIES, weights=self.severity_weights, k=len(images))
+
+        if roll < self.timeout_rate:
+            time.sleep(self.timeout)
+            error = "Request timed out"
+        elif roll < self.timeout_rate + self.error_rate:
+            time.sleep(delay)
+            error = "Mock analyzer error"
+        else:
+            time.sleep(delay)
+            error = None
+
+        timestamp = datetime.utcnow().isoformat() + 'Z'
+        if error:
+            with self.lock:
+                self.errors += 1
+            return [{"status": "error", "error": error, "timestamp": timestamp} for _ in images]
+        return [{
+            "status": "success",
+            "analysis": f"Synthetic description of {name}",
+            "severity": severity,
+            "timestamp": timestamp,
+            "batch_size": len(images)
+        } for name, severity in zip(image_names or [f"image_{i}" for i in range(len(images))], severities)]
+
+    def get_stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'images': self.images, 'errors': self.errors}
+
+
+class LocalEventStore:
+    """
+    Events in a SQLite database, images as files next to it.
+
+    Args:
+        directory: Where events.db and the images/ folder go
+        failure_rate: Probability an upload or insert raises (simulates an uplink outage)
+        seed: RNG seed (None = random)
+    """
+
+    def __init__(self, directory, failure_rate=0.0, seed=None):
+        self.directory = Path(directory)
+        self.image_dir = self.directory / 'images'
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.directory / 'events.db'), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_type TEXT NOT NULL,
+                description TEXT,
+                severity TEXT,
+                timestamp TEXT,
+                image_url TEXT
+            )
+        """)
+        self.db.commit()
+        self.uploads = 0
+        self.inserts = 0  # Insert requests (batches)
+        self.failures = 0
+
+    def _maybe_fail(self):
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            self.failures += 1
+            raise ConnectionError("Simulated event store outage")
+
+    def upload_image(self, path, data, content_type="image/jpeg"):
+        with self.lock:
+            self._maybe_fail()
+            self.uploads += 1
+        target = self.image_dir / path
+        target.parent.mkdir(parents=True, exist_ok=True)  # variants/<name>/...
+        target.write_bytes(data)  # Overwrites, like an upsert
+        return target.resolve().as_uri()
+
+    def insert_events(self, events):
+        with self.lock:
+            self._maybe_fail()
+            self.inserts += 1
+            rows = []
+            with self.db:  # One transaction per batch
+                for event in events:
+                    cursor = self.db.execute(
+                        "INSERT INTO events (event_type, description, severity, timestamp, image_url) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (event.get('event_type'), event.get('description'), event.get('severity'),
+                         event.get('timestamp'), event.get('image_url')))
+                    rows.append(dict(event, id=cursor.lastrowid))
+            return rows
+
+    def insert_event(self, event):
+        return self.insert_events([event])[0]['id']
+
+    def count_events(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def get_stats(self):
+        return {'events': self.count_events(), 'uploads': self.uploads, 'insert_requests': self.inserts,
+                'failures': self.failures}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class WebhookAlertSink:
+    """
+    POSTs alerts as JSON to a webhook URL (anything that accepts a JSON body).
+
+    Args:
+        url: Webhook endpoint
+        timeout: Request timeout (seconds)
+    """
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()  # Keep-alive across alerts
+        self.sent = 0
+        self.errors = 0
+
+    def send(self, event_type, description, severity, image_url=None):
+        payload = {
+            "event_type": event_type,
+            "description": description,
+            "severity": severity,
+            "image_url": image_url,
+            "timestamp": datetime.utcnow().isoformat() + 'Z'
+        }
+        try:
+            response = self.session.post(self.url, data=json.dumps(payload),
+                                         headers={"Content-Type": "application/json"}, timeout=self.timeout)
+            response.raise_for_status()
+            self.sent += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"[WEBHOOK] Failed to send alert: {e}")
+
+    def get_stats(self):
+        return {'sent': self.sent, 'errors': self.errors}
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Load generator for the snapshot analysis pipeline.
+
+Pushes synthetic snapshots through SentryService's real pipeline (encoding,
+spool, bounded queue, result cache, rate-limited analysis workers, publish
+workers) with local backends in place of Gemini / Supabase / Discord:
+MockAnalyzer, a LocalEventStore (SQLite + image files) and a WebhookAlertSink
+posting to an in-process HTTP receiver.
+
+Reports throughput, drops by reason, queue depth over time, per-stage latency
+and the capture-loop cost of handing a snapshot to the pipeline, so worker
+counts, quotas and queue sizes can be sized before a deployment.
+
+Usage:
+    python sentry/pipeline_loadtest.py --count 2000 --rate 50 --rpm 600 --latency 1.5
+    python sentry/pipeline_loadtest.py --count 5000 --rate 0 --budget 0 --error-rate 0.05 --json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import sentry_service
+from analysis_pipeline import LatencyTracker, join_queue
+from pipeline_backends import LocalEventStore, MockAnalyzer, PipelineBackends, WebhookAlertSink
+from servo_output import FakePCA9685
+
+
+class StubCapture:
+    """Camera stand-in - the load test never starts the capture loop."""
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        return False, None
+
+    def set(self, *args):
+        return True
+
+    def release(self):
+        pass
+
+
+class WebhookReceiver:
+    """In-process HTTP endpoint that counts alert POSTs."""
+
+    def __init__(self):
+        receiver = self
+        self.received = 0
+        self.lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with receiver.lock:
+                    receiver.received += 1
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/alert"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+class SyntheticSnapshots:
+    """
+    Person-crop candidates shaped like BestFrameSelector winners.
+
+    Args:
+        tracks: Number of distinct track IDs
+        new_person_rate: Fraction of snapshots that are new people (the rest are periodic)
+        duplicate_rate: Fraction that repeat an earlier image and pose (result cache hits)
+        seed: RNG seed
+    """
+
+    def __init__(self, tracks=50, new_person_rate=0.3, duplicate_rate=0.2, seed=0):
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+        self.tracks = tracks
+        self.new_person_rate = new_person_rate
+        self.duplicate_rate = duplicate_rate
+        self.recent = []
+        self.count = 0
+
+    def _image(self):
+        # Blocky noise: compresses like a real crop, distinct dHash per image
+        blocks = self.rng.integers(0, 256, size=(24, 12, 3), dtype=np.uint8)
+        image = np.kron(blocks, np.ones((8, 8, 1), dtype=np.uint8))
+        return image + self.rng.integers(0, 16, size=image.shape, dtype=np.uint8)
+
+    def next(self):
+        self.count += 1
+        if self.recent and self.random.random() < self.duplicate_rate:
+            crop, angles = self.random.choice(self.recent)
+        else:
+            crop = self._image()
+            angles = (self.random.uniform(30, 150), self.random.uniform(40, 120))
+            self.recent = (self.recent + [(crop, angles)])[-20:]
+        height, width = crop.shape[:2]
+        reason = 'new_person' if self.random.random() < self.new_person_rate else 'periodic'
+        return self.random.randrange(self.tracks), reason, {
+            'crop': crop,
+            'bbox': [0, 0, width, height],
+            'frame_bbox': [100, 50, 100 + width, 50 + height],
+            'context': None,
+            'score': 0.5,
+            'frames_scored': 1,
+            'timestamp': f"load_{self.count:06d}",
+            'angles': angles
+        }
+
+
+def run_loadtest(count=2000, rate=50.0, tracks=50, new_person_rate=0.3, duplicate_rate=0.2,
+                 analyzer=None, store_failure_rate=0.0, output_dir=None, use_spool=True,
+                 drain_timeout=60.0, sample_interval=0.1, overrides=None, verbose=False, seed=0):
+    """
+    Push `count` synthetic snapshots through the pipeline at `rate` per second (0 = as fast as possible).
+
+    Args:
+        overrides: sentry_service constants to change for the run, e.g.
+            {'GEMINI_WORKERS': 4, 'GEMINI_REQUESTS_PER_MINUTE': 600, 'SNAPSHOT_BUDGET_PER_MINUTE': None}
+
+    Returns:
+        dict: Throughput, drops, queue depth and latency report
+    """
+    saved = {name: getattr(sentry_service, name) for name in (overrides or {})}
+    for name, value in (overrides or {}).items():
+        setattr(sentry_service, name, value)
+
+    with contextlib.ExitStack() as stack:
+        directory = output_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, 'w')))
+
+        receiver = WebhookReceiver()
+        analyzer = analyzer or MockAnalyzer(seed=seed)
+        store = LocalEventStore(os.path.join(directory, 'store'), failure_rate=store_failure_rate, seed=seed)
+        backends = PipelineBackends(analyzer, store, WebhookAlertSink(receiver.url))
+
+        sentry = sentry_service.SentryService(
+            capture=StubCapture(), detector=lambda frame: [], servo_bus=FakePCA9685(),
+            analysis_enabled=True, patrol_file=None,
+            spool_dir=os.path.join(directory, 'spool') if use_spool else None,
+            backends=backends
+        )
+        expected_workers = sentry_service.GEMINI_WORKERS + sentry_service.PUBLISH_WORKERS + (1 if use_spool else 0)
+        deadline = time.monotonic() + 5.0
+        while len(sentry.analysis_workers) < expected_workers and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Queue depth sampler
+        depth = {'snapshot_queue': [], 'publish_queue': [], 'event_writer': []}
+        sampling = threading.Event()
+
+        def sample():
+            while not sampling.wait(sample_interval):
+                depth['snapshot_queue'].append(sentry.snapshot_queue.qsize())
+                depth['publish_queue'].append(sentry.publish_queue.qsize())
+                depth['event_writer'].append(sentry.event_writer.queue.qsize() if sentry.event_writer else 0)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+
+        snapshots = SyntheticSnapshots(tracks, new_person_rate, duplicate_rate, seed)
+        handoff = LatencyTracker(window=count)
+        start = time.monotonic()
+        for i in range(count):
+            if rate > 0:
+                delay = start + i / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            track_id, reason, candidate = snapshots.next()
+            call_start = time.monotonic()
+            sentry._queue_snapshot(track_id, reason, candidate)  # What the capture loop does
+            handoff.record(time.monotonic() - call_start)
+        offered_seconds = time.monotonic() - start
+
+        drain_deadline = time.monotonic() + drain_timeout
+        drained = (sentry.snapshot_queue.join(timeout=drain_timeout) and
+                   join_queue(sentry.publish_queue, max(0.0, drain_deadline - time.monotonic())) and
+                   sentry.event_writer.flush(max(0.0, drain_deadline - time.monotonic())))
+        total_seconds = time.monotonic() - start
+        sampling.set()
+        sampler.join()
+
+        stats = sentry.get_snapshot_stats()
+        sentry.cleanup()
+        receiver.close()
+        report = {
+            'offered': count,
+            'offered_per_second': round(count / offered_seconds, 1) if offered_seconds else None,
+            'admitted': stats['queue']['admitted'],
+            'dropped': stats['queue']['dropped'],
+            'published': stats['pipeline']['published'],
+            'failed': stats['pipeline']['failed'],
+            'drained': drained,
+            'seconds': round(total_seconds, 2),
+            'throughput_per_second': round(stats['pipeline']['published'] / total_seconds, 2),
+            'handoff_latency': handoff.summary(),
+            'queue_depth': {
+                name: {'max': max(samples), 'avg': round(float(np.mean(samples)), 1)} if samples else {}
+                for name, samples in depth.items()
+            },
+            'stage_latency': stats['pipeline']['latency'],
+            'gemini_requests': stats['pipeline']['gemini_requests'],
+            'event_writer': stats['pipeline']['event_writer'],
+            'result_cache': stats['result_cache'],
+            'analyzer': analyzer.get_stats() if hasattr(analyzer, 'get_stats') else None,
+            'store': store.get_stats(),
+            'alerts': {'sent': backends.alerts.get_stats()['sent'], 'received': receiver.received},
+            'spool': stats['spool']
+        }
+        store.close()
+
+    for name, value in saved.items():
+        setattr(sentry_service, name, value)
+    return report
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print("PIPELINE LOAD TEST")
+    print("=" * 60)
+    print(f"Offered:      {report['offered']} snapshots ({report['offered_per_second']}/s)")
+    print(f"Admitted:     {report['admitted']}")
+    dropped = ', '.join(f"{reason}={n}" for reason, n in report['dropped'].items()) or 'none'
+    print(f"Dropped:      {dropped}")
+    print(f"Published:    {report['published']} ({report['throughput_per_second']}/s), "
+          f"failed {report['failed']}, {'drained' if report['drained'] else 'NOT drained'} "
+          f"after {report['seconds']}s")
+    print(f"Requests:     {report['gemini_requests']} analyzer requests, "
+          f"cache hit rate {report['result_cache']['hit_rate']:.0%}")
+    for name, depth in report['queue_depth'].items():
+        if depth:
+            print(f"{name + ':':<14}max {depth['max']}, avg {depth['avg']}")
+    handoff = report['handoff_latency']
+    if 'p50_ms' in handoff:
+        print(f"Capture-loop handoff: p50 {handoff['p50_ms']}ms, p95 {handoff['p95_ms']}ms, max {handoff['max_ms']}ms")
+    for stage, summary in report['stage_latency'].items():
+        if 'p50_ms' in summary:
+            print(f"  {stage:<16} p50 {summary['p50_ms']:>9}ms  p95 {summary['p95_ms']:>9}ms  "
+                  f"max {summary['max_ms']:>9}ms")
+    print(f"Event writer: {report['event_writer']}")
+    print(f"Store:        {report['store']}")
+    print(f"Alerts:       {report['alerts']}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot analysis pipeline load generator")
+    parser.add_argument('--count', type=int, default=2000, help="Synthetic snapshots to offer")
+    parser.add_argument('--rate', type=float, default=50.0, help="Snapshots per second (0 = as fast as possible)")
+    parser.add_argument('--tracks', type=int, default=50, help="Distinct track IDs")
+    parser.add_argument('--new-person-rate', type=float, default=0.3)
+    parser.add_argument('--duplicate-rate', type=float, default=0.2, help="Near-duplicate snapshots (cache hits)")
+    parser.add_argument('--latency', type=float, default=1.5, help="Median analyzer request latency (s)")
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help="Lognormal latency spread")
+    parser.add_argument('--per-image-latency', type=float, default=0.2, help="Extra latency per batched image (s)")
+    parser.add_argument('--error-rate', type=float, default=0.02, help="Analyzer request failure rate")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="Analyzer request timeout rate")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Seconds a timed-out request takes")
+    parser.add_argument('--store-failure-rate', type=float, default=0.0, help="Event store upload/insert failure rate")
+    parser.add_argument('--analysis-workers', type=int, default=sentry_service.GEMINI_WORKERS)
+    parser.add_argument('--publish-workers', type=int, default=sentry_service.PUBLISH_WORKERS)
+    parser.add_argument('--rpm', type=float, default=sentry_service.GEMINI_REQUESTS_PER_MINUTE,
+                        help="Analyzer requests per minute")
+    parser.add_argument('--batch-size', type=int, default=sentry_service.GEMINI_BATCH_SIZE)
+    parser.add_argument('--budget', type=float, default=sentry_service.SNAPSHOT_BUDGET_PER_MINUTE,
+                        help="Snapshots admitted per minute (0 = unlimited)")
+    parser.add_argument('--queue-items', type=int, default=sentry_service.SNAPSHOT_QUEUE_MAX_ITEMS)
+    parser.add_argument('--no-spool', action='store_true', help="Disable the durable spool")
+    parser.add_argument('--output', help="Keep the event store / spool in this directory")
+    parser.add_argument('--drain-timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's own log output")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    analyzer = MockAnalyzer(latency=args.latency, latency_sigma=args.latency_sigma,
+                            per_image_latency=args.per_image_latency, error_rate=args.error_rate,
+                            timeout_rate=args.timeout_rate, timeout=args.timeout, seed=args.seed)
+    report = run_loadtest(
+        count=args.count, rate=args.rate, tracks=args.tracks,
+        new_person_rate=args.new_person_rate, duplicate_rate=args.duplicate_rate,
+        analyzer=analyzer, store_failure_rate=args.store_failure_rate,
+        output_dir=args.output, use_spool=not args.no_spool, drain_timeout=args.drain_timeout,
+        overrides={
+            'GEMINI_WORKERS': args.analysis_workers,
+            'PUBLISH_WORKERS': args.publish_workers,
+            'GEMINI_REQUESTS_PER_MINUTE': args.rpm,
+            'GEMINI_BATCH_SIZE': args.batch_size,
+            'SNAPSHOT_BUDGET_PER_MINUTE': args.budget or None,
+            'SNAPSHOT_QUEUE_MAX_ITEMS': args.queue_items
+        },
+        verbose=args.verbose, seed=args.seed
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Perceptual-hash cache of Gemini results.
+
+A person standing still gets re-snapshotted every SNAPSHOT_INTERVAL seconds and
+track-ID churn produces "new_person" snapshots of the same scene. Each snapshot
+crop gets a 64-bit difference hash (dHash); a snapshot whose hash is within a
+small Hamming distance of a recent entry taken from roughly the same camera
+pose reuses that entry's description and severity instead of calling Gemini.
+
+Entries expire after a TTL and the least recently used ones are evicted when
+the cache is full.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash of a BGR or grayscale image."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    resized = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (resized[:, 1:] > resized[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class ResultCache:
+    """
+    TTL + LRU cache of analysis results with near-duplicate lookup.
+
+    Args:
+        max_distance: Max Hamming distance (of 64 bits) that counts as the same image
+        max_angle: Max pan/tilt difference (degrees) between the camera poses of two snapshots
+        ttl: Seconds an entry may be reused
+        max_entries: LRU capacity
+    """
+
+    def __init__(self, max_distance=6, max_angle=5.0, ttl=120.0, max_entries=256):
+        self.max_distance = max_distance
+        self.max_angle = max_angle
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.entries = OrderedDict()  # {key: entry}, least recently used first
+        self.next_key = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now):
+        for key in [k for k, entry in self.entries.items() if now - entry['created'] > self.ttl]:
+            del self.entries[key]
+            self.expirations += 1
+
+    def lookup(self, image_hash, angles=None, now=None):
+        """
+        Find a cached result for a near-duplicate snapshot.
+
+        Args:
+            image_hash: dhash() of the snapshot crop
+            angles: (pan, tilt) the snapshot was taken at (None = ignore pose)
+            now: Current time (time.monotonic())
+
+        Returns:
+            dict: The cached result, or None
+        """
+        now = now if now is not None else time.monotonic()
+        with self.lock:
+            self._expire(now)
+            best_key, best_distance = None, None
+            for key, entry in self.entries.items():
+                if angles is not None and entry['angles'] is not None:
+                    if (abs(angles[0] - entry['angles'][0]) > self.max_angle or
+                            abs(angles[1] - entry['angles'][1]) > self.max_angle):
+                        continue
+                distance = hamming(image_hash, entry['hash'])
+                if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                    best_key, best_distance = key, distance
+
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(best_key)
+            entry = self.entries[best_key]
+            entry['hits'] += 1
+            self.hits += 1
+            return entry['result']
+
+    def store(self, image_hash, result, angles=None, now=None):
+        """Add an analysis result (only successful results should be cached)."""
+        now = now if now is not None else time.monotonic()
+        with self.lock:
+            self.entries[self.next_key] = {'hash': image_hash, 'angles': angles, 'result': result,
+                                           'created': now, 'hits': 0}
+            self.next_key += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'lookups': lookups,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'ttl_seconds': self.ttl
+            }
@@ -8,10 +8,11 @@ import cv2
 import numpy as np
 import time
 import threading
-from queue import Queue
-from typing import Optional, Dict, Any
-from ultralytics import YOLO
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from queue import Queue, Empty
+from typing import Optional, Dict, Any, Callable, List
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 import json
 
@@ -20,13 +21,38 @@ import sys
 import os
 sys.path.append(os.path.dirname(__file__))
 
-# Try to import servo controller (will fail on non-Jetson systems)
+from pid_controller import AngleHistory, PanTiltController
+from camera_model import CameraModel
+from patrol_planner import PatrolPlanner
+from servo_output import PCA9685Bus, ServoOutput
+from snapshot_encoder import SnapshotEncoder
+from frame_selector import BestFrameSelector
+from analysis_pipeline import LatencyTracker, TokenBucket, collect_batch, join_queue
+from snapshot_queue import SnapshotQueue
+from snapshot_spool import SnapshotSpool
+from pipeline_backends import create_backends
+from event_writer import EventWriter
+from image_variants import VariantWorker
+from result_cache import ResultCache, dhash
+from track_store import TrackStateStore
+
+# Try to import the PCA9685 driver (will fail on non-Jetson systems)
 try:
-    from adafruit_servokit import ServoKit
+    import board
+    import busio
+    from adafruit_pca9685 import PCA9685
     SERVOS_AVAILABLE = True
 except ImportError:
     SERVOS_AVAILABLE = False
-    print("[WARN] ServoKit not available - running in simulation mode")
+    print("[WARN] PCA9685 driver not available - running in simulation mode")
+
+# YOLO is optional when a detector is injected (e.g. tracking_sim.py)
+try:
+    from ultralytics import YOLO
+    YOLO_AVAILABLE = True
+except ImportError:
+    YOLO_AVAILABLE = False
+    print("[WARN] Ultralytics not available - an external detector is required")
 
 
 # ========================================
@@ -38,6 +64,10 @@ CAMERA_INDEX = 0
 CAMERA_WIDTH = 640
 CAMERA_HEIGHT = 480
 TARGET_FPS = 30
+CAMERA_HFOV = 60.0  # Horizontal field of view (degrees)
+CAMERA_VFOV = 45.0  # Vertical field of view (degrees)
+CAMERA_CAPTURE_LATENCY = 0.03  # Age of a frame when cap.read() returns it (seconds)
+CAMERA_CALIBRATION_FILE = Path(__file__).parent / 'camera_calibration.json'  # From camera_model.py --rig
 
 # Servo settings
 PAN_MIN = 10
@@ -47,23 +77,47 @@ TILT_MIN = 20
 TILT_MAX = 150
 TILT_DEFAULT = 90
 
-# Control parameters
-KP = 0.035
-MAX_SERVO_STEP = 3.0
+# Control parameters (PID on angular error, see pid_controller.py)
+PID_KP = 0.6  # Fraction of the (latency-compensated) error corrected per detection
+PID_KI = 0.3
+PID_ACQUIRE_GAIN = 1.0  # First detection of a new target moves straight to the computed angle
+PID_KD = 0.02
+PID_FEEDFORWARD = 1.0  # Target velocity prediction over the capture -> command delay
+PID_INTEGRAL_LIMIT = 5.0  # Anti-windup clamp (degree-seconds)
+SERVO_RESPONSE_LAG = 0.05  # Time for the physical servo to reach a commanded angle (seconds)
+SERVO_CONTROL_HZ = 100  # Fixed servo update rate, independent of camera/inference FPS
+MAX_SERVO_SPEED = 90.0  # Max servo speed (degrees/s) - the former 3 degrees per frame at 30 FPS
+MAX_SERVO_STEP = MAX_SERVO_SPEED / SERVO_CONTROL_HZ  # Max degrees the servo moves per control tick
 DEADBAND_X = 25
 DEADBAND_Y = 25
 PAN_INVERT = -1
 TILT_INVERT = -1
 
+# Servo I/O (PCA9685)
+PAN_CHANNEL = 2
+TILT_CHANNEL = 3
+SERVO_PWM_FREQUENCY = 50
+SERVO_MIN_PULSE_US = 750  # ServoKit defaults
+SERVO_MAX_PULSE_US = 2250
+SERVO_BUS_MAX_HZ = 50  # Max I2C updates/sec - servos only see one pulse per PWM period anyway
+
 # Tracking parameters
 TARGET_LOST_TIMEOUT = 2.0
 PERSON_CLASS_ID = 0
 
 # Auto-scan parameters (when no target)
 AUTO_SCAN_ENABLED = True  # Enable automatic scanning when no target
-SCAN_SPEED = 0.8  # Degrees per frame (lower = smoother)
 SCAN_RANGE = 60  # Degrees to scan left/right from center
-SCAN_CENTER_PAUSE = 1.0  # Seconds to pause at center before scanning
+SCAN_CENTER_PAUSE = 1.0  # Seconds to hold position after losing a target before patrolling
+
+# Patrol planner (see patrol_planner.py)
+PATROL_CELL_SIZE = 5.0  # Activity histogram cell size (degrees)
+PATROL_HALF_LIFE = 7 * 24 * 3600  # Activity decay half-life (seconds) - adapts to changing traffic
+PATROL_CYCLE_TIME = 12.0  # Target seconds per sweep
+PATROL_MIN_DWELL = 0.5  # Every dwell point gets at least this long (seconds)
+PATROL_MAX_DWELL = 4.0
+PATROL_HISTOGRAM_FILE = Path(__file__).parent / 'patrol_histogram.json'
+PATROL_SAVE_INTERVAL = 300  # Seconds between histogram saves
 
 # Performance optimization
 DETECTION_SKIP_FRAMES = 3  # Run YOLO every N frames (1=every frame, 2=every other, 3=every third)
@@ -80,6 +134,45 @@ FACE_DETECTION_SKIP_FRAMES = 5  # Run face detection every N frames when target
 # Snapshot parameters
 SNAPSHOT_INTERVAL = 15  # Seconds between snapshots for same person
 ENABLE_GEMINI_ANALYSIS = True  # Enable Gemini AI analysis of snapshots (uploads to Supabase)
+SNAPSHOT_PROFILE = 'person'  # Encoding profile (see snapshot_encoder.SNAPSHOT_PROFILES); 'person_context' adds a full-frame thumbnail
+SNAPSHOT_SELECT_WINDOW = 1.0  # Seconds of candidate frames scored per snapshot (best one is sent)
+SNAPSHOT_SELECT_TOP_K = 3  # Best candidates kept per track while the window is open
+TRACK_STATE_CAPACITY = 4096  # Tracks remembered (fixed memory; least recently seen evicted when full)
+TRACK_STATE_TTL = 600.0  # Seconds a track unseen for is forgotten
+
+# Analysis pipeline
+GEMINI_WORKERS = 2  # Concurrent Gemini requests
+PUBLISH_WORKERS = 2  # Concurrent Supabase upload/insert + Discord alert workers
+GEMINI_REQUESTS_PER_MINUTE = 15  # Match the Gemini API quota for the key in use
+GEMINI_RATE_BURST = 3  # Requests allowed back to back before the rate limit applies
+GEMINI_BATCH_SIZE = 4  # Snapshots sent in one multi-image request
+GEMINI_BATCH_WAIT = 1.0  # Max seconds to wait for a batch to fill after its first snapshot
+EVENT_BATCH_SIZE = 50  # Events per multi-row insert (write-behind)
+EVENT_BATCH_DELAY = 0.5  # Max seconds an event waits for its insert batch to fill
+EVENT_INSERT_RETRIES = 5  # Retries (exponential backoff) before an insert batch fails
+IMAGE_VARIANT_WORKERS = 2  # Threads generating/uploading thumbnail and medium variants of snapshots
+
+# Snapshot queue (bounded; new people are analyzed before periodic re-snapshots)
+SNAPSHOT_QUEUE_MAX_ITEMS = 64
+SNAPSHOT_QUEUE_MAX_BYTES = 16 * 1024 * 1024
+SNAPSHOT_BUDGET_PER_MINUTE = 60  # Snapshots admitted for analysis per minute (all tracks)
+SNAPSHOT_BUDGET_RESERVE = 2  # Budget kept back from periodic re-snapshots for new people
+SNAPSHOT_DRAIN_DEADLINE = 10.0  # Max seconds cleanup() waits for pending analyses/uploads
+
+# Durable spool - pending snapshots/results survive restarts and uplink outages
+SPOOL_DIR = Path(__file__).parent / 'spool'
+SPOOL_SEGMENT_BYTES = 4 * 1024 * 1024
+SPOOL_MAX_BYTES = 256 * 1024 * 1024  # Oldest pending snapshots are dropped beyond this
+SPOOL_FSYNC = 'interval'  # 'always', 'interval' or 'never'
+SPOOL_FSYNC_INTERVAL = 1.0  # Seconds of writes that can be lost on power failure
+SPOOL_REPLAY_INTERVAL = 30.0  # Seconds between retries of failed / recovered snapshots
+SPOOL_REPLAY_BATCH = 50  # Snapshots re-queued per retry
+
+# Result cache (near-duplicate snapshots reuse the previous Gemini result)
+RESULT_CACHE_MAX_DISTANCE = 6  # Max dHash Hamming distance (of 64 bits) treated as the same image
+RESULT_CACHE_MAX_ANGLE = 5.0  # Max pan/tilt difference (degrees) between the two snapshots
+RESULT_CACHE_TTL = 120.0  # Seconds a cached result may be reused
+RESULT_CACHE_SIZE = 256
 
 
 # ========================================
@@ -87,43 +180,110 @@ ENABLE_GEMINI_ANALYSIS = True  # Enable Gemini AI analysis of snapshots (uploads
 # ========================================
 
 class ServoController:
-    """Manages servo control with simulation fallback."""
+    """
+    Manages servo control with simulation fallback.
 
-    def __init__(self):
+    The vision loop only updates the setpoint (target_pan/target_tilt) via
+    set_target(); the fixed-rate control thread calls step() to move the
+    servos towards it by at most MAX_SERVO_STEP per tick (MAX_SERVO_SPEED
+    whatever the tick rate). Hardware writes go
+    through ServoOutput, which coalesces, quantizes and rate-limits them.
+
+    Args:
+        bus: Optional PCA9685 bus (e.g. servo_output.FakePCA9685). Defaults to
+             the real I2C bus when available, else simulation mode.
+    """
+
+    def __init__(self, bus=None):
         self.pan_angle = PAN_DEFAULT
         self.tilt_angle = TILT_DEFAULT
 
-        if SERVOS_AVAILABLE:
+        # Setpoint written by the vision loop / manual commands
+        self.target_pan = PAN_DEFAULT
+        self.target_tilt = TILT_DEFAULT
+        self.lock = threading.Lock()
+
+        # Angle per control tick, used to look up where the camera pointed at capture time
+        self.history = AngleHistory(maxlen=SERVO_CONTROL_HZ * 2)
+
+        if bus is None and SERVOS_AVAILABLE:
             print("[SERVO] Initializing PCA9685...")
-            self.kit = ServoKit(channels=16, address=0x40)
-            self.set_pan(PAN_DEFAULT)
-            self.set_tilt(TILT_DEFAULT)
+            pca = PCA9685(busio.I2C(board.SCL, board.SDA), address=0x40)
+            pca.frequency = SERVO_PWM_FREQUENCY
+            bus = PCA9685Bus(pca.i2c_device)
+
+        if bus is not None:
+            self.output = ServoOutput(
+                bus,
+                pan_channel=PAN_CHANNEL,
+                tilt_channel=TILT_CHANNEL,
+                frequency=SERVO_PWM_FREQUENCY,
+                min_pulse_us=SERVO_MIN_PULSE_US,
+                max_pulse_us=SERVO_MAX_PULSE_US,
+                max_rate_hz=SERVO_BUS_MAX_HZ
+            )
+            self._write(force=True)
         else:
             print("[SERVO] Running in simulation mode")
-            self.kit = None
+            self.output = None
+
+    def _write(self, force=False):
+        """Push current angles to the hardware (single batched transaction)."""
+        if self.output:
+            self.output.write(self.pan_angle, self.tilt_angle, force=force)
 
     def set_pan(self, angle):
-        angle = np.clip(angle, PAN_MIN, PAN_MAX)
-        self.pan_angle = angle
-        if self.kit:
-            self.kit.servo[2].angle = angle
+        self.pan_angle = float(np.clip(angle, PAN_MIN, PAN_MAX))
+        self._write()
 
     def set_tilt(self, angle):
-        angle = np.clip(angle, TILT_MIN, TILT_MAX)
-        self.tilt_angle = angle
-        if self.kit:
-            self.kit.servo[3].angle = angle
+        self.tilt_angle = float(np.clip(angle, TILT_MIN, TILT_MAX))
+        self._write()
+
+    def set_angles(self, pan, tilt, force=False):
+        """Set both axes with a single bus write."""
+        self.pan_angle = float(np.clip(pan, PAN_MIN, PAN_MAX))
+        self.tilt_angle = float(np.clip(tilt, TILT_MIN, TILT_MAX))
+        self._write(force=force)
 
     def move_smooth(self, target_pan, target_tilt):
         delta_pan = np.clip(target_pan - self.pan_angle, -MAX_SERVO_STEP, MAX_SERVO_STEP)
         delta_tilt = np.clip(target_tilt - self.tilt_angle, -MAX_SERVO_STEP, MAX_SERVO_STEP)
 
-        self.set_pan(self.pan_angle + delta_pan)
-        self.set_tilt(self.tilt_angle + delta_tilt)
+        self.set_angles(self.pan_angle + delta_pan, self.tilt_angle + delta_tilt)
+
+    def set_target(self, pan=None, tilt=None):
+        """Update the setpoint (thread-safe). None leaves that axis unchanged."""
+        with self.lock:
+            if pan is not None:
+                self.target_pan = float(np.clip(pan, PAN_MIN, PAN_MAX))
+            if tilt is not None:
+                self.target_tilt = float(np.clip(tilt, TILT_MIN, TILT_MAX))
+
+    def step(self):
+        """Advance one control tick towards the current setpoint."""
+        with self.lock:
+            target_pan, target_tilt = self.target_pan, self.target_tilt
+        if target_pan != self.pan_angle or target_tilt != self.tilt_angle:
+            self.move_smooth(target_pan, target_tilt)
+        elif self.output:
+            self.output.flush()  # Send a write held back by the bus rate limit
+        self.history.record(time.monotonic(), self.pan_angle, self.tilt_angle)
+
+    def angles_at(self, timestamp):
+        """Servo (pan, tilt) at a past time.monotonic() timestamp."""
+        angles = self.history.angle_at(timestamp)
+        return angles if angles is not None else (self.pan_angle, self.tilt_angle)
 
     def reset(self):
-        self.set_pan(PAN_DEFAULT)
-        self.set_tilt(TILT_DEFAULT)
+        self.set_target(PAN_DEFAULT, TILT_DEFAULT)
+        self.set_angles(PAN_DEFAULT, TILT_DEFAULT, force=True)
+
+    def get_io_stats(self) -> Dict[str, Any]:
+        """Get servo bus statistics."""
+        if not self.output:
+            return {'mode': 'simulation'}
+        return self.output.get_stats()
 
 
 # ========================================
@@ -186,26 +346,49 @@ class SentryService:
     """
     Background service that runs person tracking and generates annotated frames.
     Designed to be integrated into FastAPI.
+
+    Args:
+        capture: Optional VideoCapture-like source (read/isOpened/release). Defaults to the camera.
+        detector: Optional callable(frame) -> [{'id': int, 'bbox': [x1, y1, x2, y2]}]
+                  used instead of YOLO + ByteTrack.
+        servo_bus: Optional PCA9685 bus for ServoController (see servo_output.py).
+        analysis_enabled: Queue snapshots for Gemini analysis.
+        patrol_file: Where the patrol activity histogram is persisted (None = in memory only).
+        spool_dir: Directory of the durable snapshot spool (None = in memory only).
+        backends: Analyzer / event store / alert sink for the pipeline (pipeline_backends.PipelineBackends;
+            None = Gemini + Supabase + Discord from the environment).
     """
 
-    def __init__(self):
+    def __init__(self, capture=None, detector: Optional[Callable[[np.ndarray], List[Dict[str, Any]]]] = None,
+                 servo_bus=None, analysis_enabled: bool = ENABLE_GEMINI_ANALYSIS,
+                 patrol_file: Optional[Path] = PATROL_HISTOGRAM_FILE, spool_dir: Optional[Path] = SPOOL_DIR,
+                 backends=None):
         print("\n[SENTRY] Initializing service...")
 
         # Camera
-        self.cap = cv2.VideoCapture(CAMERA_INDEX)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
-        self.cap.set(cv2.CAP_PROP_FPS, TARGET_FPS)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer lag
-        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))  # Use MJPEG for faster decoding
+        if capture is None:
+            capture = cv2.VideoCapture(CAMERA_INDEX)
+            capture.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+            capture.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+            capture.set(cv2.CAP_PROP_FPS, TARGET_FPS)
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer lag
+            capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))  # Use MJPEG for faster decoding
+        self.cap = capture
 
         if not self.cap.isOpened():
             raise RuntimeError("Failed to open camera")
 
         # YOLO
-        print("[SENTRY] Loading YOLO model...")
-        # Initialize YOLO model
-        self.model = YOLO('models/yolo11n_160_fp16.engine')  # Load TensorRT engine for faster inference
+        self.detector = detector
+        self.model = None
+        if detector is None:
+            if not YOLO_AVAILABLE:
+                raise RuntimeError("Ultralytics not installed and no detector provided")
+            print("[SENTRY] Loading YOLO model...")
+            # Initialize YOLO model
+            self.model = YOLO('models/yolo11n_160_fp16.engine')  # Load TensorRT engine for faster inference
+        else:
+            print("[SENTRY] Using external detector")
 
         # Face detection
         print("[FACE] Loading face detector...")
@@ -222,11 +405,31 @@ class SentryService:
         self.use_bytetrack = True
 
         # Servo
-        self.servo = ServoController()
+        self.servo = ServoController(bus=servo_bus)
 
         # Target tracker
         self.target = TargetTracker()
 
+        # Pixel -> servo angle model (calibrated if camera_calibration.json exists)
+        self.camera_model = CameraModel.load(
+            CAMERA_CALIBRATION_FILE,
+            width=CAMERA_WIDTH, height=CAMERA_HEIGHT,
+            hfov=CAMERA_HFOV, vfov=CAMERA_VFOV,
+            pan_invert=PAN_INVERT, tilt_invert=TILT_INVERT
+        )
+
+        # Latency-compensated PID controller
+        self.controller = PanTiltController(
+            self.camera_model,
+            kp=PID_KP, ki=PID_KI, kd=PID_KD,
+            acquire_gain=PID_ACQUIRE_GAIN,
+            feedforward=PID_FEEDFORWARD,
+            integral_limit=PID_INTEGRAL_LIMIT,
+            max_speed=MAX_SERVO_SPEED,
+            deadband_x=DEADBAND_X, deadband_y=DEADBAND_Y
+        )
+        self.controlled_id = None  # Track ID the controller state belongs to
+
         # Frame management
         self.latest_frame = None
         self.frame_lock = threading.Lock()
@@ -237,6 +440,7 @@ class SentryService:
         # State
         self.running = False
         self.thread = None
+        self.servo_thread = None  # Fixed-rate servo control thread
         self.frame_center_x = CAMERA_WIDTH // 2
         self.frame_center_y = CAMERA_HEIGHT // 2
 
@@ -248,13 +452,42 @@ class SentryService:
         # Performance optimization
         self.frame_counter = 0
         self.last_tracks = []  # Cache last tracking results (ByteTrack is built-in)
+        self.last_tracks_time = 0.0  # Capture time (monotonic) of the frame last_tracks came from
         self.last_face_center = None  # Cache last face detection
+        self.last_face_time = 0.0  # Capture time of the frame last_face_center came from
         self.face_frame_counter = 0
         
         # Snapshot tracking (in-memory only, no local storage)
-        self.track_snapshots = {}  # {track_id: last_snapshot_time}
-        self.seen_track_ids = set()  # Set of all track IDs seen
-        self.snapshot_queue = Queue()  # Queue for Gemini analysis
+        self.track_state = TrackStateStore(capacity=TRACK_STATE_CAPACITY, ttl=TRACK_STATE_TTL)
+        self.snapshot_queue = SnapshotQueue(  # Queue for Gemini analysis
+            max_items=SNAPSHOT_QUEUE_MAX_ITEMS,
+            max_bytes=SNAPSHOT_QUEUE_MAX_BYTES,
+            budget_per_minute=SNAPSHOT_BUDGET_PER_MINUTE,
+            budget_reserve=SNAPSHOT_BUDGET_RESERVE,
+            on_drop=self._on_snapshot_dropped
+        )
+        self.publish_queue = Queue()  # Analyzed snapshots waiting for upload/insert/alert
+        self.event_writer = None  # Write-behind event inserts (created with the backends)
+        self.variant_worker = None  # Thumbnail / medium image variants (created with the backends)
+        self.alert_executor = None  # Alerts of acknowledged events (created with the backends)
+        self.analysis_workers = []
+        self.analysis_stop = threading.Event()
+        self.gemini_rate_limiter = TokenBucket(GEMINI_REQUESTS_PER_MINUTE, burst=GEMINI_RATE_BURST)
+        self.pipeline_latency = {stage: LatencyTracker()
+                                 for stage in ('queue_wait', 'rate_limit_wait', 'analysis', 'publish', 'end_to_end')}
+        # Updated from the analysis, publish and event writer threads - always under the lock
+        self.pipeline_counts = {'requests': 0, 'published': 0, 'failed': 0}
+        self.pipeline_counts_lock = threading.Lock()
+        self.result_cache = ResultCache(max_distance=RESULT_CACHE_MAX_DISTANCE, max_angle=RESULT_CACHE_MAX_ANGLE,
+                                        ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_SIZE)
+        self.snapshot_encoder = SnapshotEncoder(SNAPSHOT_PROFILE)
+        self.frame_selector = BestFrameSelector(
+            window=SNAPSHOT_SELECT_WINDOW,
+            top_k=SNAPSHOT_SELECT_TOP_K,
+            crop_padding=self.snapshot_encoder.profile.get('crop_padding', 0.0),
+            context_dimension=self.snapshot_encoder.profile.get('thumbnail_dimension'),
+            face_detector=lambda frame, bbox: self.detect_faces(frame, bbox) is not None
+        )
         
         # Performance profiling
         self.profiling_enabled = True
@@ -267,9 +500,25 @@ class SentryService:
         }
 
         # Auto-scan state (when no target locked)
-        self.scan_direction = 1  # 1 = scanning right, -1 = scanning left
-        self.scan_center_time = None  # Time when we last centered
+        self.scan_center_time = None  # Time the target was lost (monotonic)
         self.is_scanning = False  # Currently in scan mode
+
+        # Activity-weighted patrol planner (histogram persists across restarts)
+        self.patrol = PatrolPlanner(
+            pan_range=(max(PAN_MIN, PAN_DEFAULT - SCAN_RANGE), min(PAN_MAX, PAN_DEFAULT + SCAN_RANGE)),
+            tilt_range=(TILT_MIN, TILT_MAX),
+            hfov=CAMERA_HFOV, vfov=CAMERA_VFOV,
+            cell_size=PATROL_CELL_SIZE,
+            half_life=PATROL_HALF_LIFE,
+            cycle_time=PATROL_CYCLE_TIME,
+            min_dwell=PATROL_MIN_DWELL,
+            max_dwell=PATROL_MAX_DWELL,
+            default_tilt=TILT_DEFAULT
+        )
+        self.patrol_file = patrol_file
+        if self.patrol_file:
+            self.patrol.load(self.patrol_file)
+        self.patrol_saved_at = time.time()
         
         # Manual control override
         self.manual_control_active = False  # Manual control has priority
@@ -291,7 +540,14 @@ class SentryService:
         print("[SENTRY] Service initialized")
         
         # Start Gemini analysis worker thread if enabled
-        if ENABLE_GEMINI_ANALYSIS:
+        self.analysis_enabled = analysis_enabled
+        self.backends = backends
+        self.spool = None
+        if self.analysis_enabled and spool_dir:
+            self.spool = SnapshotSpool(spool_dir, segment_bytes=SPOOL_SEGMENT_BYTES, max_bytes=SPOOL_MAX_BYTES,
+                                       fsync=SPOOL_FSYNC, fsync_interval=SPOOL_FSYNC_INTERVAL)
+            self.spool.recover()
+        if self.analysis_enabled:
             self.gemini_worker = threading.Thread(target=self._gemini_analysis_worker, daemon=True)
             self.gemini_worker.start()
             print("[GEMINI] Analysis worker started")
@@ -302,6 +558,8 @@ class SentryService:
             self.running = True
             self.thread = threading.Thread(target=self._run_loop, daemon=True)
             self.thread.start()
+            self.servo_thread = threading.Thread(target=self._servo_control_loop, daemon=True)
+            self.servo_thread.start()
             print("[SENTRY] Background thread started")
 
     def stop(self):
@@ -309,6 +567,8 @@ class SentryService:
         self.running = False
         if self.thread:
             self.thread.join(timeout=2.0)
+        if self.servo_thread:
+            self.servo_thread.join(timeout=1.0)
         self.cleanup()
 
     def send_command(self, command: str):
@@ -322,12 +582,20 @@ class SentryService:
     
     def get_snapshot_stats(self) -> Dict[str, Any]:
         """Get snapshot and analysis statistics."""
+        track_stats = self.track_state.get_stats()
         return {
-            'total_people_seen': len(self.seen_track_ids),
-            'active_snapshots': len(self.track_snapshots),
+            'total_people_seen': self.track_state.total_seen,
+            'active_snapshots': track_stats['with_snapshot'],
+            'tracks': track_stats,
             'pending_analyses': self.snapshot_queue.qsize(),
-            'storage_mode': 'supabase_only',
-            'gemini_enabled': ENABLE_GEMINI_ANALYSIS
+            'queue': self.snapshot_queue.get_stats(),
+            'storage_mode': type(self.backends.store).__name__ if self.backends else 'supabase_only',
+            'gemini_enabled': self.analysis_enabled,
+            'pipeline': self.get_pipeline_stats(),
+            'result_cache': self.result_cache.get_stats(),
+            'spool': self.spool.get_stats() if self.spool else None,
+            'encoding': self.snapshot_encoder.get_stats(),
+            'selection': self.frame_selector.get_stats()
         }
 
     def detect_faces(self, frame, person_bbox):
@@ -391,11 +659,12 @@ class SentryService:
             'tracking_status': str(stats.get('tracking_status', 'UNKNOWN')),
             'pan_angle': float(stats.get('pan_angle', 90)),
             'tilt_angle': float(stats.get('tilt_angle', 90)),
-            'people_count': int(stats.get('people_count', 0))
+            'people_count': int(stats.get('people_count', 0)),
+            'servo_io': self.servo.get_io_stats()
         }
 
     def _process_commands(self):
-        """Process commands from the queue."""
+        """Process commands from the queue (called from the servo control thread)."""
         while not self.command_queue.empty():
             cmd = self.command_queue.get()
 
@@ -408,40 +677,52 @@ class SentryService:
                     self.is_scanning = False
                     self.scan_center_time = None
                 print(f"[CONTROL] Auto-tracking: {'ENABLED' if self.auto_tracking_enabled else 'DISABLED'}")
+                continue
 
-            elif cmd == 'center':
-                self.servo.reset()
-                # Manual control overrides auto behavior
-                self.manual_control_active = True
-                self.last_manual_command_time = time.time()
-
+            # Manual moves update the setpoint; the control loop applies them on the next tick
+            if cmd == 'center':
+                self.servo.set_target(PAN_DEFAULT, TILT_DEFAULT)
             elif cmd == 'pan_left':
-                new_pan = max(PAN_MIN, self.servo.pan_angle - 5)
-                self.servo.set_pan(new_pan)
-                # Manual control overrides auto behavior
-                self.manual_control_active = True
-                self.last_manual_command_time = time.time()
-
+                self.servo.set_target(pan=self.servo.target_pan - 5)
             elif cmd == 'pan_right':
-                new_pan = min(PAN_MAX, self.servo.pan_angle + 5)
-                self.servo.set_pan(new_pan)
-                # Manual control overrides auto behavior
-                self.manual_control_active = True
-                self.last_manual_command_time = time.time()
-
+                self.servo.set_target(pan=self.servo.target_pan + 5)
             elif cmd == 'tilt_up':
-                new_tilt = min(TILT_MAX, self.servo.tilt_angle + 5)  # Fixed: up = increase angle
-                self.servo.set_tilt(new_tilt)
-                # Manual control overrides auto behavior
-                self.manual_control_active = True
-                self.last_manual_command_time = time.time()
-
+                self.servo.set_target(tilt=self.servo.target_tilt + 5)  # Fixed: up = increase angle
             elif cmd == 'tilt_down':
-                new_tilt = max(TILT_MIN, self.servo.tilt_angle - 5)  # Fixed: down = decrease angle
-                self.servo.set_tilt(new_tilt)
-                # Manual control overrides auto behavior
-                self.manual_control_active = True
-                self.last_manual_command_time = time.time()
+                self.servo.set_target(tilt=self.servo.target_tilt - 5)  # Fixed: down = decrease angle
+            else:
+                continue
+
+            # Manual control overrides auto behavior
+            self.manual_control_active = True
+            self.last_manual_command_time = time.time()
+
+    def _servo_control_loop(self):
+        """
+        Fixed-rate servo control loop (runs in its own thread).
+        Handles manual commands immediately and interpolates the servos towards
+        the latest setpoint, so motion no longer depends on inference time.
+        """
+        print(f"[SERVO] Control loop started ({SERVO_CONTROL_HZ} Hz)")
+        period = 1.0 / SERVO_CONTROL_HZ
+        next_tick = time.monotonic()
+
+        while self.running:
+            try:
+                self._process_commands()
+                self.servo.step()
+            except Exception as e:
+                print(f"[SERVO] Error in control loop: {e}")
+
+            next_tick += period
+            remaining = next_tick - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            else:
+                # Fell behind (e.g. slow I2C write) - resync instead of bursting
+                next_tick = time.monotonic()
+
+        print("[SERVO] Control loop stopped")
 
     def _run_loop(self):
         """Main processing loop (runs in background thread)."""
@@ -449,22 +730,22 @@ class SentryService:
 
         while self.running:
             loop_start = time.time()
-            
-            # Process external commands
-            self._process_commands()
 
             # Read frame
             ret, frame = self.cap.read()
             if not ret:
                 time.sleep(0.1)
                 continue
+            capture_time = time.monotonic() - CAMERA_CAPTURE_LATENCY
 
             self.frame_counter += 1
 
             # Run YOLO detection with ByteTrack (tracking built-in)
             yolo_start = time.time()
-            if self.frame_counter % DETECTION_SKIP_FRAMES == 0:
+            tracks_fresh = self.frame_counter % DETECTION_SKIP_FRAMES == 0
+            if tracks_fresh:
                 self.last_tracks = self._detect_and_track(frame)
+                self.last_tracks_time = capture_time
             tracks = self.last_tracks
             yolo_time = time.time() - yolo_start
             
@@ -491,15 +772,21 @@ class SentryService:
                     bbox = track['bbox']
                     
                     # Check if this is a new ID - take immediate snapshot
-                    is_new_id = track_id not in self.seen_track_ids
+                    is_new_id = self.track_state.touch(track_id, current_time)
                     if is_new_id:
-                        self.seen_track_ids.add(track_id)
+                        self._record_activity(bbox, self.last_tracks_time)
                         self._take_snapshot(frame, track_id, bbox, is_new=True)
                         print(f"[SNAPSHOT] New person detected (ID: {track_id})")
                     else:
                         # Check if it's time for periodic snapshot
                         self._check_periodic_snapshot(frame, track_id, bbox)
 
+                    # Score this frame for an open snapshot window (only when the bbox matches the frame)
+                    if tracks_fresh and self.frame_selector.is_open(track_id):
+                        self.frame_selector.add(track_id, frame, bbox, time.time(),
+                                                timestamp=datetime.utcnow().strftime("%Y%m%d_%H%M%S"),
+                                                angles=self.servo.angles_at(capture_time))
+
                     if not self.target.is_locked:
                         self.target.lock_target(track_id)
                         # Reset scanning state when locking onto target
@@ -516,19 +803,26 @@ class SentryService:
                             # Run face detection every N frames to reduce load
                             if self.face_frame_counter % FACE_DETECTION_SKIP_FRAMES == 0:
                                 self.last_face_center = self.detect_faces(frame, bbox)
+                                self.last_face_time = capture_time
                             
                             if self.last_face_center:
                                 cx, cy = self.last_face_center
+                                measured_at = self.last_face_time
                             else:
                                 # No face detected, fall back to body center
                                 cx, cy = self._get_bbox_center(bbox)
+                                measured_at = self.last_tracks_time
                         else:
                             cx, cy = self._get_bbox_center(bbox)
+                            measured_at = self.last_tracks_time
                         
-                        self._control_servos(cx, cy)
+                        self._control_servos(cx, cy, measured_at)
                         break
             
             face_time = time.time() - face_start
+
+            # Send the best frame of every snapshot window that has closed
+            self._flush_snapshots()
             
             # Clear cached face if target lost
             if not target_found:
@@ -571,7 +865,10 @@ class SentryService:
         print("[SENTRY] Processing loop stopped")
 
     def _detect_and_track(self, frame):
-        """Detect and track people using YOLO with ByteTrack."""
+        """Detect and track people using YOLO with ByteTrack (or the injected detector)."""
+        if self.detector is not None:
+            return self.detector(frame)
+
         # Use YOLO's track() method which includes ByteTrack
         results = self.model.track(
             frame, 
@@ -603,78 +900,78 @@ class SentryService:
         x1, y1, x2, y2 = bbox
         return int((x1 + x2) / 2), int((y1 + y2) / 2)
 
-    def _control_servos(self, target_x, target_y):
-        """Control servos to center target."""
-        error_x = target_x - self.frame_center_x
-        error_y = target_y - self.frame_center_y
-
-        if abs(error_x) < DEADBAND_X:
-            error_x = 0
-        if abs(error_y) < DEADBAND_Y:
-            error_y = 0
-
-        delta_pan = error_x * KP * PAN_INVERT
-        delta_tilt = -error_y * KP * TILT_INVERT
+    def _control_servos(self, target_x, target_y, capture_time):
+        """
+        Control servos to center target.
 
-        target_pan = self.servo.pan_angle + delta_pan
-        target_tilt = self.servo.tilt_angle + delta_tilt
+        Args:
+            target_x, target_y: Target position (pixels) in the captured frame
+            capture_time: time.monotonic() when that frame was captured
+        """
+        # New target - drop integral/velocity state from the previous one
+        if self.target.locked_id != self.controlled_id:
+            self.controller.reset()
+            self.controlled_id = self.target.locked_id
+
+        setpoint = self.controller.update(
+            target_x, target_y, capture_time,
+            # The head lags the commanded angle, so look up what was commanded slightly earlier
+            angles_at_capture=self.servo.angles_at(capture_time - SERVO_RESPONSE_LAG),
+            current_angles=(self.servo.pan_angle, self.servo.tilt_angle),
+            now=time.monotonic()
+        )
+        if setpoint is None:
+            return  # Cached detection - already acted on
 
-        self.servo.move_smooth(target_pan, target_tilt)
+        # Only update the setpoint - the servo control thread does the moving
+        self.servo.set_target(*setpoint)
 
     def _auto_scan(self):
         """
-        Automatically scan left and right when no target is locked.
-        Centers first, pauses briefly, then scans side to side.
+        Patrol when no target is locked.
+        Holds position briefly (the target may reappear), then follows the
+        activity-weighted dwell plan from PatrolPlanner.
         """
-        current_time = time.time()
-        
-        # If not currently scanning, return to center first
+        current_time = time.monotonic()
+
         if not self.is_scanning:
-            # Check if we're already centered
-            if abs(self.servo.pan_angle - PAN_DEFAULT) > 2:
-                # Move towards center
-                if self.servo.pan_angle > PAN_DEFAULT:
-                    self.servo.set_pan(max(PAN_DEFAULT, self.servo.pan_angle - SCAN_SPEED * 2))
-                else:
-                    self.servo.set_pan(min(PAN_DEFAULT, self.servo.pan_angle + SCAN_SPEED * 2))
+            if self.scan_center_time is None:
+                self.scan_center_time = current_time
                 return
-            else:
-                # We're centered, start pause timer if not already set
-                if self.scan_center_time is None:
-                    self.scan_center_time = current_time
-                    self.servo.set_pan(PAN_DEFAULT)
-                    self.servo.set_tilt(TILT_DEFAULT)
-                    return
-                
-                # Check if pause is complete
-                if current_time - self.scan_center_time < SCAN_CENTER_PAUSE:
-                    return
-                
-                # Pause complete, start scanning
-                self.is_scanning = True
-                self.scan_center_time = None
-        
-        # Calculate scan boundaries
-        scan_left = PAN_DEFAULT - SCAN_RANGE
-        scan_right = PAN_DEFAULT + SCAN_RANGE
-        
-        # Clamp to servo limits
-        scan_left = max(PAN_MIN, scan_left)
-        scan_right = min(PAN_MAX, scan_right)
-        
-        # Update pan angle based on scan direction
-        new_pan = self.servo.pan_angle + (SCAN_SPEED * self.scan_direction)
-        
-        # Check if we've reached the boundary and need to reverse
-        if self.scan_direction > 0 and new_pan >= scan_right:
-            new_pan = scan_right
-            self.scan_direction = -1  # Reverse to scan left
-        elif self.scan_direction < 0 and new_pan <= scan_left:
-            new_pan = scan_left
-            self.scan_direction = 1  # Reverse to scan right
-        
-        # Apply the new pan angle
-        self.servo.set_pan(new_pan)
+            if current_time - self.scan_center_time < SCAN_CENTER_PAUSE:
+                return
+
+            # Pause complete, start the patrol from the nearest dwell point
+            self.is_scanning = True
+            self.scan_center_time = None
+            self.patrol.reset(self.servo.pan_angle)
+
+        pan, tilt = self.patrol.next_setpoint(self.servo.pan_angle, self.servo.tilt_angle, current_time)
+        self.servo.set_target(pan, tilt)
+
+    def _record_activity(self, bbox, capture_time):
+        """Add a newly seen person's absolute position to the patrol histogram."""
+        cx, cy = self._get_bbox_center(bbox)
+        pan_offset, tilt_offset = self.camera_model.pixel_to_angle(cx, cy)
+        pan, tilt = self.servo.angles_at(capture_time - SERVO_RESPONSE_LAG)
+        self.patrol.record_detection(pan + pan_offset, tilt + tilt_offset)
+
+        # Persist periodically so the learned layout survives restarts/crashes
+        if time.time() - self.patrol_saved_at > PATROL_SAVE_INTERVAL:
+            self._save_patrol()
+
+    def _save_patrol(self):
+        if not self.patrol_file:
+            return
+        try:
+            self.patrol.save(self.patrol_file)
+            self.patrol_saved_at = time.time()
+        except Exception as e:
+            print(f"[PATROL] Failed to save histogram: {e}")
+
+    def get_patrol_stats(self) -> Dict[str, Any]:
+        """Get patrol planner statistics."""
+        return self.patrol.get_stats()
 
     def _update_fps(self):
         """Update FPS counter."""
@@ -726,6 +1023,8 @@ class SentryService:
     def _take_snapshot(self, frame, track_id, bbox, is_new=False):
         """
         Take a snapshot of the tracked person and queue for Gemini analysis.
+        Opens a best-frame window: detection frames over the next
+        SNAPSHOT_SELECT_WINDOW seconds are scored and only the best one is sent.
         Snapshot is kept in memory only, not saved to disk.
         
         Args:
@@ -743,9 +1042,9 @@ class SentryService:
             # New person - always take snapshot
             should_snapshot = True
             reason = "new_person"
-        elif track_id in self.track_snapshots:
+        elif self.track_state.last_snapshot_time(track_id) is not None:
             # Existing person - check timer
-            time_since_last = current_time - self.track_snapshots[track_id]
+            time_since_last = current_time - self.track_state.last_snapshot_time(track_id)
             if time_since_last >= SNAPSHOT_INTERVAL:
                 should_snapshot = True
                 reason = "periodic"
@@ -756,23 +1055,67 @@ class SentryService:
         
         if should_snapshot:
             # Update last snapshot time
-            self.track_snapshots[track_id] = current_time
-            
-            # Encode frame to JPEG in memory (no disk save)
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            _, img_encoded = cv2.imencode('.jpg', frame)
-            
-            # Queue for Gemini analysis
-            if ENABLE_GEMINI_ANALYSIS:
-                self.snapshot_queue.put({
-                    'image_data': img_encoded.tobytes(),  # Raw JPEG bytes
-                    'track_id': track_id,
-                    'bbox': bbox,
-                    'timestamp': timestamp,
-                    'reason': reason
-                })
-            
-            print(f"[SNAPSHOT] Queued person_{track_id}_{timestamp}_{reason} for analysis (memory only)")
+            self.track_state.mark_snapshot(track_id, current_time)
+            self.frame_selector.open(track_id, reason, current_time)
+
+    def _flush_snapshots(self, now=None):
+        """Encode and queue the winning frame of every closed snapshot window."""
+        now = now if now is not None else time.time()
+        for track_id, reason, candidate in self.frame_selector.pop_ready(now):
+            self._queue_snapshot(track_id, reason, candidate)
+
+    def _queue_snapshot(self, track_id, reason, candidate):
+        """Encode a selected candidate to JPEG in memory (no disk save) and queue it for Gemini."""
+        timestamp = candidate['timestamp']
+        encoded = self.snapshot_encoder.encode(candidate['crop'], candidate['bbox'], context=candidate['context'])
+        self.track_state.record_score(track_id, candidate['score'])
+        
+        # Queue for Gemini analysis
+        if self.analysis_enabled:
+            x1, y1, x2, y2 = map(int, candidate['bbox'])
+            person = candidate['crop'][max(0, y1):y2, max(0, x1):x2]
+            snapshot_data = {
+                'image_hash': dhash(person if person.size else candidate['crop']),  # For the result cache
+                'angles': candidate['angles'],
+                'image_data': encoded['image_data'],  # Raw JPEG bytes
+                'thumbnail_data': encoded['thumbnail_data'],  # Full-frame thumbnail (or None)
+                'track_id': track_id,
+                'bbox': candidate['frame_bbox'],
+                'timestamp': timestamp,
+                'reason': reason,
+                'queued_at': time.monotonic()
+            }
+            # Spooled first (the writer thread does the disk I/O) so a crash can't lose it
+            if self.spool:
+                snapshot_data['spool_id'] = self.spool.new_id()
+                self.spool.append_snapshot(snapshot_data)
+            if not self.snapshot_queue.put(snapshot_data):
+                self._spool_done(snapshot_data)
+                print(f"[SNAPSHOT] Dropped person_{track_id}_{timestamp}_{reason} (queue full or over budget)")
+                return
+            self.track_state.set_analysis_state(track_id, 'queued')
+        
+        print(f"[SNAPSHOT] Queued person_{track_id}_{timestamp}_{reason} for analysis "
+              f"(score {candidate['score']:.2f}, best of {candidate['frames_scored']} frames, "
+              f"{encoded['width']}x{encoded['height']}, {len(encoded['image_data']) // 1024}KB, "
+              f"{'spooled' if self.spool else 'memory only'})")
+
+    def _on_snapshot_dropped(self, snapshot_data, reason):
+        """Snapshots the queue evicts by policy are dropped for good; shutdown leftovers stay spooled."""
+        if reason != 'shutdown':
+            self._spool_done(snapshot_data)
+
+    def _spool_done(self, snapshot_data):
+        if self.spool and snapshot_data.get('spool_id'):
+            self.spool.mark_done(snapshot_data['spool_id'])
+
+    def _spool_release(self, snapshot_data):
+        if self.spool and snapshot_data.get('spool_id'):
+            self.spool.release(snapshot_data['spool_id'])
+
+    def _spool_result(self, snapshot_data, result):
+        if self.spool and snapshot_data.get('spool_id'):
+            self.spool.append_result(snapshot_data['spool_id'], result)
     
     def _check_periodic_snapshot(self, frame, track_id, bbox):
         """
@@ -783,159 +1126,296 @@ class SentryService:
             track_id: ID of the tracked person
             bbox: Bounding box [x1, y1, x2, y2]
         """
-        if track_id in self.track_snapshots:
-            current_time = time.time()
-            time_since_last = current_time - self.track_snapshots[track_id]
-            
-            if time_since_last >= SNAPSHOT_INTERVAL:
-                self._take_snapshot(frame, track_id, bbox, is_new=False)
+        last_snapshot = self.track_state.last_snapshot_time(track_id)
+        # No snapshot on record (e.g. a track back after expiry without one) - due now
+        if last_snapshot is None or time.time() - last_snapshot >= SNAPSHOT_INTERVAL:
+            self._take_snapshot(frame, track_id, bbox, is_new=False)
     
     def _gemini_analysis_worker(self):
         """
-        Background worker that processes snapshots through Gemini API,
-        uploads to Supabase, and sends Discord alerts.
-        Does NOT save files locally - everything goes directly to Supabase.
-        Runs in a separate thread to avoid blocking the main loop.
+        Set up the pipeline backends (Gemini, Supabase and Discord unless injected), then
+        start the analysis pipeline: GEMINI_WORKERS threads analyze snapshots (rate limited
+        to the Gemini quota) and PUBLISH_WORKERS threads upload them and send alerts, so
+        publishing one snapshot overlaps the analysis of the next.
+        Does NOT save files locally - everything goes directly to the event store.
         """
         print("[GEMINI] Worker thread started")
-        
-        # Import required modules
-        try:
-            sys.path.insert(0, str(Path(__file__).parent.parent / 'gemini'))
-            from gemini_description import analyze_security_image
-            print("[GEMINI] Successfully imported analyzer")
-        except Exception as e:
-            print(f"[GEMINI] Failed to import analyzer: {e}")
-            print("[GEMINI] Worker disabled - analyzer not available")
-            return
-        
-        # Import Supabase and Discord alert function
-        try:
-            from dotenv import load_dotenv
-            from supabase import create_client, Client
-            sys.path.insert(0, str(Path(__file__).parent.parent / 'web'))
-            from alerts import send_discord_alert
-            
-            load_dotenv()
-            SUPABASE_URL = os.getenv("SUPABASE_URL")
-            SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-            
-            if SUPABASE_URL and SUPABASE_KEY:
-                supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-                supabase_enabled = True
-                print("[GEMINI] Supabase integration enabled")
-            else:
-                supabase_enabled = False
-                print("[GEMINI] ERROR: Supabase not configured - worker disabled")
+
+        if self.backends is None:
+            try:
+                self.backends = create_backends()
+                print("[GEMINI] Gemini analyzer and Supabase integration enabled")
+            except Exception as e:
+                print(f"[GEMINI] Failed to initialize backends: {e}")
+                print("[GEMINI] Worker disabled")
                 return
-        except Exception as e:
-            print(f"[GEMINI] Failed to initialize Supabase: {e}")
-            return
-        
-        while self.running:
+        else:
+            print(f"[GEMINI] Using {type(self.backends.analyzer).__name__} / {type(self.backends.store).__name__}")
+
+        self.event_writer = EventWriter(self.backends.store.insert_events, max_batch=EVENT_BATCH_SIZE,
+                                        max_delay=EVENT_BATCH_DELAY, max_retries=EVENT_INSERT_RETRIES)
+        self.variant_worker = VariantWorker(self.backends.store.upload_image, workers=IMAGE_VARIANT_WORKERS)
+        if self.backends.alerts:
+            self.alert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alerts")
+
+        for i in range(GEMINI_WORKERS):
+            worker = threading.Thread(target=self._analysis_loop, name=f"gemini-analysis-{i}", daemon=True)
+            worker.start()
+            self.analysis_workers.append(worker)
+        for i in range(PUBLISH_WORKERS):
+            worker = threading.Thread(target=self._publish_loop, name=f"gemini-publish-{i}", daemon=True)
+            worker.start()
+            self.analysis_workers.append(worker)
+        if self.spool:
+            worker = threading.Thread(target=self._spool_replay_loop, name="spool-replay", daemon=True)
+            worker.start()
+            self.analysis_workers.append(worker)
+        print(f"[GEMINI] Pipeline running ({GEMINI_WORKERS} analysis / {PUBLISH_WORKERS} publish workers, "
+              f"{GEMINI_REQUESTS_PER_MINUTE} requests/min)")
+
+    def _analysis_loop(self):
+        """
+        Analysis stage: collects up to GEMINI_BATCH_SIZE snapshots (waiting at most
+        GEMINI_BATCH_WAIT), answers near-duplicates from the result cache and sends the
+        rest to Gemini in one rate-limited request. Results go to the publish stage.
+        """
+        while not self.analysis_stop.is_set():
+            batch = collect_batch(self.snapshot_queue, GEMINI_BATCH_SIZE, GEMINI_BATCH_WAIT,
+                                  stop_event=self.analysis_stop)
+            if not batch:
+                continue
+
+            pending = []
             try:
-                # Wait for a snapshot to analyze (with timeout to check self.running)
-                try:
-                    snapshot_data = self.snapshot_queue.get(timeout=1.0)
-                except:
+                for snapshot_data in batch:
+                    self.pipeline_latency['queue_wait'].record(time.monotonic() - snapshot_data['queued_at'])
+
+                    # Near-duplicate of a recent snapshot - reuse its description and severity
+                    cached = self.result_cache.lookup(snapshot_data['image_hash'], snapshot_data['angles'])
+                    if cached is not None:
+                        result = dict(cached, timestamp=datetime.utcnow().isoformat() + 'Z', cached=True)
+                        print(f"[GEMINI] Cache hit for person {snapshot_data['track_id']} - skipping analysis")
+                        self._spool_result(snapshot_data, result)
+                        self.track_state.set_analysis_state(snapshot_data['track_id'], 'analyzed')
+                        self.publish_queue.put((snapshot_data, result))
+                    else:
+                        pending.append(snapshot_data)
+                if not pending:
                     continue
-                
-                image_data = snapshot_data['image_data']
-                track_id = snapshot_data['track_id']
-                reason = snapshot_data['reason']
-                timestamp_str = snapshot_data['timestamp']
-                
-                print(f"[GEMINI] Analyzing snapshot for person {track_id}...")
-                
-                # Create temporary file for Gemini analysis (will be deleted after)
-                import tempfile
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp_file:
-                    tmp_file.write(image_data)
-                    tmp_filepath = tmp_file.name
-                
-                try:
-                    # Analyze with Gemini
-                    result = analyze_security_image(tmp_filepath)
-                    
-                    # Print summary
+
+                # Stay within the Gemini quota (one token per request, not per image)
+                if not self._acquire_gemini_request():
+                    continue
+
+                track_ids = ', '.join(str(s['track_id']) for s in pending)
+                print(f"[GEMINI] Analyzing {len(pending)} snapshot(s) for person(s) {track_ids}...")
+                analysis_start = time.monotonic()
+
+                # JPEG bytes go straight into the request (no temp file)
+                # Single-image fallbacks of a failed batch are charged through the same limiter
+                results = self.backends.analyzer.analyze([s['image_data'] for s in pending],
+                                         image_names=[f"person_{s['track_id']}_{s['timestamp']}.jpg"
+                                                      for s in pending],
+                                         before_request=self._acquire_gemini_request)
+                self.pipeline_latency['analysis'].record(time.monotonic() - analysis_start)
+
+                severity_prefix = {
+                    'info': '[INFO]',
+                    'warning': '[WARNING]',
+                    'critical': '[CRITICAL]'
+                }
+                for snapshot_data, result in zip(pending, results):
                     if result['status'] == 'success':
-                        severity_prefix = {
-                            'info': '[INFO]',
-                            'warning': '[WARNING]',
-                            'critical': '[CRITICAL]'
-                        }
                         prefix = severity_prefix.get(result.get('severity', 'info'), '[INFO]')
-                        print(f"[GEMINI] {prefix} {result['analysis']}")
-                        
-                        # Upload to Supabase
-                        try:
-                            # Upload to Supabase Storage
-                            storage_filename = f"person_{track_id}_{timestamp_str}_{reason}.jpg"
-                            supabase.storage.from_("security-frames").upload(
-                                path=storage_filename,
-                                file=image_data,
-                                file_options={"content-type": "image/jpeg"}
-                            )
-                            
-                            # Get public URL
-                            image_url = supabase.storage.from_("security-frames").get_public_url(storage_filename)
-                            
-                            # Create event in database
-                            event_data = {
-                                "event_type": "person_detected",
-                                "description": result['analysis'],
-                                "severity": result.get('severity', 'info'),
-                                "timestamp": result['timestamp'],
-                                "image_url": image_url
-                            }
-                            
-                            db_response = supabase.table("events").insert(event_data).execute()
-                            
-                            if db_response.data:
-                                event_id = db_response.data[0].get('id')
-                                print(f"[SUPABASE] Event created (ID: {event_id})")
-                            
-                            # Send Discord alert for warning/critical
-                            if result.get('severity') in ['warning', 'critical']:
-                                send_discord_alert(
-                                    event_type="person_detected",
-                                    description=result['analysis'],
-                                    severity=result['severity'],
-                                    image_url=image_url
-                                )
-                                print(f"[DISCORD] Alert sent")
-                                
-                        except Exception as e:
-                            print(f"[SUPABASE] Error uploading snapshot: {e}")
+                        print(f"[GEMINI] {prefix} person {snapshot_data['track_id']}: {result['analysis']}")
+                        self.result_cache.store(snapshot_data['image_hash'], result, snapshot_data['angles'])
+                        self._spool_result(snapshot_data, result)
+                        self.track_state.set_analysis_state(snapshot_data['track_id'], 'analyzed')
+                        self.publish_queue.put((snapshot_data, result))
                     else:
+                        self._count_pipeline('failed')
+                        self._spool_release(snapshot_data)  # Retried by the spool replay
+                        self.track_state.set_analysis_state(snapshot_data['track_id'], 'failed')
                         print(f"[GEMINI] [ERROR] Analysis failed: {result.get('error', 'Unknown error')}")
-                
-                finally:
-                    # Clean up temporary file
-                    try:
-                        os.unlink(tmp_filepath)
-                    except:
-                        pass
-                
-                # Mark task as done
-                self.snapshot_queue.task_done()
-                
+
             except Exception as e:
                 print(f"[GEMINI] Error in analysis worker: {e}")
                 import traceback
                 traceback.print_exc()
-        
-        print("[GEMINI] Worker thread stopped")
+                for snapshot_data in pending:
+                    self._spool_release(snapshot_data)
+            finally:
+                # Mark tasks as done
+                for _ in batch:
+                    self.snapshot_queue.task_done()
+
+    def _count_pipeline(self, name):
+        with self.pipeline_counts_lock:
+            self.pipeline_counts[name] += 1
+
+    def _acquire_gemini_request(self):
+        """Take a rate limiter token for one Gemini request. Returns False if stopping."""
+        waited = self.gemini_rate_limiter.acquire(stop_event=self.analysis_stop)
+        if waited is None:
+            return False
+        self.pipeline_latency['rate_limit_wait'].record(waited)
+        self._count_pipeline('requests')
+        return True
+
+    def _publish_loop(self):
+        """Publish stage: image upload, event insert and alert."""
+        while not self.analysis_stop.is_set():
+            try:
+                snapshot_data, result = self.publish_queue.get(timeout=1.0)
+            except Empty:
+                continue
+
+            try:
+                track_id = snapshot_data['track_id']
+                publish_start = time.monotonic()
+
+                # Upload to the event store (Supabase Storage in production)
+                store = self.backends.store
+                storage_filename = f"person_{track_id}_{snapshot_data['timestamp']}_{snapshot_data['reason']}.jpg"
+                image_url = store.upload_image(storage_filename, snapshot_data['image_data'])
+                self.variant_worker.submit(storage_filename, snapshot_data['image_data'])
+
+                # Full-frame context thumbnail stored next to the person crop
+                if snapshot_data.get('thumbnail_data'):
+                    store.upload_image(storage_filename.replace('.jpg', '_context.jpg'), snapshot_data['thumbnail_data'])
+                
+                # Create event in database (batched write-behind; completion is handled on ack)
+                event_data = {
+                    "event_type": "person_detected",
+                    "description": result['analysis'],
+                    "severity": result.get('severity', 'info'),
+                    "timestamp": result['timestamp'],
+                    "image_url": image_url
+                }
+                # The alert is sent once the insert is acknowledged, so a replayed snapshot
+                # whose insert failed doesn't alert twice
+                ack = self.event_writer.submit(event_data)
+                ack.add_done_callback(partial(self._on_event_stored, snapshot_data, event_data, publish_start))
+
+            except Exception as e:
+                self._count_pipeline('failed')
+                self._spool_release(snapshot_data)  # Uploaded again once the uplink is back
+                print(f"[SUPABASE] Error uploading snapshot: {e}")
+            finally:
+                self.publish_queue.task_done()
+
+    def _on_event_stored(self, snapshot_data, event_data, publish_start, future):
+        """Event insert acknowledged (runs on the event writer thread - keep it short)."""
+        track_id = snapshot_data['track_id']
+        error = future.exception()
+        if error is not None:
+            self._count_pipeline('failed')
+            self._spool_release(snapshot_data)  # Published again by the spool replay
+            print(f"[SUPABASE] Event insert failed for person_{track_id}: {error}")
+            return
+
+        now = time.monotonic()
+        self.pipeline_latency['publish'].record(now - publish_start)
+        self.pipeline_latency['end_to_end'].record(now - snapshot_data['queued_at'])
+        self._count_pipeline('published')
+        self._spool_done(snapshot_data)
+        print(f"[SUPABASE] Event created (ID: {future.result().get('id')})")
+
+        # Send alert (Discord in production) for warning/critical, off the writer thread
+        if event_data['severity'] in ['warning', 'critical'] and self.alert_executor:
+            self.alert_executor.submit(self._send_alert, event_data)
+        print(f"[GEMINI] person_{track_id} done in {now - snapshot_data['queued_at']:.1f}s "
+              f"(queued {publish_start - snapshot_data['queued_at']:.1f}s before publish)")
+
+    def _send_alert(self, event_data):
+        try:
+            self.backends.alerts.send(
+                event_type=event_data['event_type'],
+                description=event_data['description'],
+                severity=event_data['severity'],
+                image_url=event_data['image_url']
+            )
+            print(f"[DISCORD] Alert sent")
+        except Exception as e:
+            print(f"[DISCORD] Alert failed: {e}")
+
+    def _spool_replay_loop(self):
+        """
+        Re-queue spooled snapshots that aren't in the pipeline: the backlog recovered at
+        startup and snapshots whose analysis or upload failed. Already-analyzed ones go
+        straight to the publish stage, so a backlog uploads in bulk once the uplink is back.
+        """
+        while not self.analysis_stop.is_set():
+            replayed = {'analyze': 0, 'publish': 0}
+            for snapshot_data, result in self.spool.take_replay(SPOOL_REPLAY_BATCH):
+                if result is not None:
+                    self.publish_queue.put((snapshot_data, result))
+                    replayed['publish'] += 1
+                elif self.snapshot_queue.put(snapshot_data):
+                    replayed['analyze'] += 1
+                else:
+                    self.spool.release(snapshot_data['spool_id'])  # Queue full - next round
+            if replayed['analyze'] or replayed['publish']:
+                print(f"[SPOOL] Replayed {replayed['analyze']} snapshot(s) for analysis, "
+                      f"{replayed['publish']} for upload")
+            self.analysis_stop.wait(SPOOL_REPLAY_INTERVAL)
+
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """Analysis pipeline throughput and per-stage latency."""
+        with self.pipeline_counts_lock:
+            counts = dict(self.pipeline_counts)
+        return {
+            'analysis_workers': GEMINI_WORKERS,
+            'publish_workers': PUBLISH_WORKERS,
+            'requests_per_minute': GEMINI_REQUESTS_PER_MINUTE,
+            'batch_size': GEMINI_BATCH_SIZE,
+            'gemini_requests': counts['requests'],
+            'pending_publish': self.publish_queue.qsize(),
+            'published': counts['published'],
+            'failed': counts['failed'],
+            'event_writer': self.event_writer.get_stats() if self.event_writer else None,
+            'image_variants': self.variant_worker.get_stats() if self.variant_worker else None,
+            'latency': {stage: tracker.summary() for stage, tracker in self.pipeline_latency.items()}
+        }
 
     def cleanup(self):
         """Clean up resources."""
         print("[SENTRY] Cleaning up...")
+
+        # Send whatever the open snapshot windows have collected so far
+        self._flush_snapshots(now=float('inf'))
         
-        # Wait for any remaining Gemini analyses to complete
-        if ENABLE_GEMINI_ANALYSIS and not self.snapshot_queue.empty():
-            print("[GEMINI] Waiting for pending analyses...")
-            self.snapshot_queue.join()
+        # Give pending Gemini analyses (and their uploads and alerts) until the drain deadline
+        deadline = time.monotonic() + SNAPSHOT_DRAIN_DEADLINE
+        if self.analysis_workers:
+            if not self.snapshot_queue.empty() or not self.publish_queue.empty():
+                print(f"[GEMINI] Waiting up to {SNAPSHOT_DRAIN_DEADLINE:.0f}s for pending analyses...")
+            drained = (self.snapshot_queue.join(timeout=SNAPSHOT_DRAIN_DEADLINE) and
+                       join_queue(self.publish_queue, max(0.0, deadline - time.monotonic())))
+            if self.event_writer:
+                drained = self.event_writer.close(max(0.0, deadline - time.monotonic())) and drained
+            if not drained:
+                dropped = self.snapshot_queue.discard_pending('shutdown')
+                print(f"[GEMINI] Drain deadline reached - dropped {dropped} queued snapshot(s), "
+                      f"{self.publish_queue.qsize()} upload(s) pending"
+                      f"{' (kept in the spool for the next start)' if self.spool else ''}")
+            self.analysis_stop.set()
+        if self.alert_executor:
+            # Alerts of the events written while draining, within what is left of the deadline
+            # (one worker: the no-op finishes once every alert queued before it has)
+            try:
+                self.alert_executor.submit(lambda: None).result(max(0.0, deadline - time.monotonic()))
+                self.alert_executor.shutdown(wait=True)
+            except FutureTimeoutError:
+                print("[DISCORD] Drain deadline reached - dropping pending alerts")
+                self.alert_executor.shutdown(wait=False, cancel_futures=True)
+        if self.variant_worker:
+            self.variant_worker.close(wait=False)  # Clients fall back to the full image
+        if self.spool:
+            self.spool.close()
         
+        self._save_patrol()
+
         if self.cap:
             self.cap.release()
         self.servo.reset()
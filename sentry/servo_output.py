@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Servo output layer for the PCA9685 PWM driver.
+
+Sits between ServoController and the I2C bus and keeps bus traffic out of the
+hot loop:
+- Angles are quantized to PCA9685 counts (12-bit over one PWM period), so
+  sub-count changes that the hardware cannot resolve are never sent.
+- Writes whose quantized value did not change are dropped.
+- Pan and tilt live on adjacent channels, so both are written in a single
+  auto-increment register transaction.
+- Writes are rate-limited (default: the 50 Hz PWM refresh rate - faster
+  updates are invisible to the servo). The latest rate-limited value is kept
+  pending and goes out on the next call after the interval.
+
+FakePCA9685 is an in-memory bus with the same interface for tests and the
+tracking simulator.
+"""
+
+import time
+
+# PCA9685 registers
+LED0_ON_L = 0x06
+PCA9685_RESOLUTION = 4096  # 12-bit counter per PWM period
+
+
+class PCA9685Bus:
+    """Raw channel writes to a PCA9685 through an adafruit I2CDevice (auto-increment enabled)."""
+
+    def __init__(self, i2c_device):
+        self.i2c_device = i2c_device
+
+    def write_channels(self, first_channel, counts):
+        """Write OFF counts for consecutive channels starting at first_channel in one transaction."""
+        buf = bytearray([LED0_ON_L + 4 * first_channel])
+        for count in counts:
+            buf += bytes([0, 0, count & 0xFF, (count >> 8) & 0x0F])
+        with self.i2c_device as i2c:
+            i2c.write(buf)
+
+
+class FakePCA9685:
+    """In-memory PCA9685 bus that records channel values and counts transactions."""
+
+    def __init__(self, write_delay=0.0):
+        self.write_delay = write_delay  # Simulated I2C transaction time (seconds)
+        self.channels = {}
+        self.transactions = 0
+        self.log = []
+
+    def write_channels(self, first_channel, counts):
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        self.transactions += 1
+        self.log.append((first_channel, list(counts)))
+        for offset, count in enumerate(counts):
+            self.channels[first_channel + offset] = count
+
+
+class ServoOutput:
+    """
+    Coalescing, quantizing, rate-limited pan/tilt writer.
+
+    Args:
+        bus: PCA9685Bus or FakePCA9685
+        pan_channel, tilt_channel: PCA9685 channels of the pan/tilt servos
+        frequency: PWM frequency (Hz)
+        min_pulse_us, max_pulse_us: Pulse width for 0 deg and actuation_range
+        actuation_range: Servo travel (degrees)
+        max_rate_hz: Max bus transactions per second (0 = unlimited)
+    """
+
+    def __init__(self, bus, pan_channel=2, tilt_channel=3, frequency=50,
+                 min_pulse_us=750, max_pulse_us=2250, actuation_range=180,
+                 max_rate_hz=50):
+        self.bus = bus
+        self.pan_channel = pan_channel
+        self.tilt_channel = tilt_channel
+        self.actuation_range = actuation_range
+        self.min_interval = 1.0 / max_rate_hz if max_rate_hz else 0.0
+
+        counts_per_us = frequency * PCA9685_RESOLUTION / 1_000_000
+        self.min_count = min_pulse_us * counts_per_us
+        self.count_range = (max_pulse_us - min_pulse_us) * counts_per_us
+
+        self.written = {}  # {channel: count} last sent to the bus
+        self.pending = None  # Latest (pan_count, tilt_count) held back by the rate limit
+        self.last_write_time = 0.0
+
+        self.stats = {
+            'requests': 0,
+            'transactions': 0,
+            'skipped_redundant': 0,
+            'deferred': 0,
+            'bus_time': 0.0
+        }
+
+    @property
+    def degrees_per_count(self):
+        """Smallest angle step the hardware can resolve."""
+        return self.actuation_range / self.count_range
+
+    def angle_to_count(self, angle):
+        angle = min(max(angle, 0), self.actuation_range)
+        return int(round(self.min_count + angle / self.actuation_range * self.count_range))
+
+    def count_to_angle(self, count):
+        return (count - self.min_count) / self.count_range * self.actuation_range
+
+    def write(self, pan, tilt, force=False):
+        """
+        Request new pan/tilt angles.
+
+        Args:
+            pan, tilt: Angles in degrees
+            force: Bypass the rate limit (still skips redundant writes)
+
+        Returns:
+            bool: True if a bus transaction was issued
+        """
+        self.stats['requests'] += 1
+        counts = (self.angle_to_count(pan), self.angle_to_count(tilt))
+
+        if counts == (self.written.get(self.pan_channel), self.written.get(self.tilt_channel)):
+            self.pending = None
+            self.stats['skipped_redundant'] += 1
+            return False
+
+        now = time.monotonic()
+        if not force and now - self.last_write_time < self.min_interval:
+            if self.pending is None:
+                self.stats['deferred'] += 1
+            self.pending = counts
+            return False
+
+        self._send(counts, now)
+        return True
+
+    def flush(self):
+        """Send a pending rate-limited write once the interval has passed."""
+        if self.pending is None:
+            return False
+        now = time.monotonic()
+        if now - self.last_write_time < self.min_interval:
+            return False
+        self._send(self.pending, now)
+        return True
+
+    def _send(self, counts, now):
+        pan_count, tilt_count = counts
+        start = time.perf_counter()
+
+        changed = {channel: count
+                   for channel, count in ((self.pan_channel, pan_count), (self.tilt_channel, tilt_count))
+                   if self.written.get(channel) != count}
+        channels = sorted(changed)
+
+        if len(channels) == 2 and channels[1] == channels[0] + 1:
+            # Adjacent channels - one auto-increment transaction
+            self.bus.write_channels(channels[0], [changed[channels[0]], changed[channels[1]]])
+            self.stats['transactions'] += 1
+        else:
+            for channel in channels:
+                self.bus.write_channels(channel, [changed[channel]])
+                self.stats['transactions'] += 1
+
+        self.written.update(changed)
+        self.pending = None
+        self.last_write_time = now
+        self.stats['bus_time'] += time.perf_counter() - start
+
+    def get_stats(self):
+        """Get bus statistics (JSON serializable)."""
+        stats = dict(self.stats)
+        stats['bus_time_ms'] = round(stats.pop('bus_time') * 1000, 2)
+        stats['degrees_per_count'] = round(self.degrees_per_count, 3)
+        return stats
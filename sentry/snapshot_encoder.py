@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Snapshot encoding profiles for the sentry.
+
+A full 640x480 frame at OpenCV's default JPEG quality is mostly background and
+costs uplink bandwidth, storage and Gemini latency. A profile crops to the
+person (with some context padding), caps the longest side, sets the JPEG
+quality and can add a small full-frame thumbnail so the scene is still
+available for review.
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+# name -> settings. crop_padding is the fraction of the bbox width/height added on each side.
+SNAPSHOT_PROFILES = {
+    'full': {'crop': False, 'max_dimension': None, 'quality': 95, 'thumbnail_dimension': None},
+    'person': {'crop': True, 'crop_padding': 0.25, 'max_dimension': 480, 'quality': 80,
+               'thumbnail_dimension': None},
+    'person_context': {'crop': True, 'crop_padding': 0.25, 'max_dimension': 480, 'quality': 80,
+                       'thumbnail_dimension': 320, 'thumbnail_quality': 60},
+    'low_bandwidth': {'crop': True, 'crop_padding': 0.15, 'max_dimension': 320, 'quality': 65,
+                      'thumbnail_dimension': None},
+}
+
+
+def padded_region(shape, bbox, padding):
+    """(left, top, right, bottom) of bbox [x1, y1, x2, y2] plus `padding` (fraction of its size) per side."""
+    height, width = shape[:2]
+    x1, y1, x2, y2 = bbox
+    pad_x = (x2 - x1) * padding
+    pad_y = (y2 - y1) * padding
+    return (max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y)),
+            min(width, int(round(x2 + pad_x))), min(height, int(round(y2 + pad_y))))
+
+
+def crop_with_padding(frame, bbox, padding):
+    """Crop bbox plus context padding, clipped to the frame."""
+    left, top, right, bottom = padded_region(frame.shape, bbox, padding)
+    if right <= left or bottom <= top:
+        return frame
+    return frame[top:bottom, left:right]
+
+
+def limit_dimension(image, max_dimension):
+    """Downscale so the longest side is at most max_dimension (never upscales)."""
+    if not max_dimension:
+        return image
+    height, width = image.shape[:2]
+    scale = max_dimension / max(height, width)
+    if scale >= 1.0:
+        return image
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def encode_jpeg(image, quality):
+    ok, encoded = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return encoded.tobytes()
+
+
+class SnapshotEncoder:
+    """
+    Encodes snapshots with a profile and keeps byte-size statistics.
+
+    Args:
+        profile: Name in SNAPSHOT_PROFILES or a settings dict
+        window: Number of recent snapshots used for the size percentiles
+    """
+
+    def __init__(self, profile='person', window=200):
+        if isinstance(profile, str):
+            if profile not in SNAPSHOT_PROFILES:
+                raise ValueError(f"Unknown snapshot profile '{profile}' "
+                                 f"(available: {', '.join(SNAPSHOT_PROFILES)})")
+            self.profile_name = profile
+            profile = SNAPSHOT_PROFILES[profile]
+        else:
+            self.profile_name = 'custom'
+        self.profile = dict(profile)
+
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total_bytes = 0
+        self.total_thumbnail_bytes = 0
+        self.total_raw_bytes = 0
+        self.total_encode_time = 0.0
+        self.recent_sizes = deque(maxlen=window)
+
+    def encode(self, frame, bbox=None, context=None):
+        """
+        Encode a snapshot of `frame` (cropped to `bbox` if the profile crops).
+
+        Args:
+            frame: BGR image (full frame, or an already padded crop with bbox relative to it)
+            bbox: Person bounding box [x1, y1, x2, y2]
+            context: Full frame for the thumbnail when `frame` is a crop
+
+        Returns:
+            dict: image_data (JPEG bytes), thumbnail_data (JPEG bytes or None),
+                  width, height (of the encoded image)
+        """
+        start = time.perf_counter()
+        profile = self.profile
+
+        image = frame
+        if profile.get('crop') and bbox is not None:
+            image = crop_with_padding(frame, bbox, profile.get('crop_padding', 0.0))
+        image = limit_dimension(image, profile.get('max_dimension'))
+        image_data = encode_jpeg(image, profile.get('quality', 95))
+
+        thumbnail_data = None
+        if profile.get('thumbnail_dimension'):
+            thumbnail = limit_dimension(context if context is not None else frame,
+                                        profile['thumbnail_dimension'])
+            thumbnail_data = encode_jpeg(thumbnail, profile.get('thumbnail_quality', 60))
+
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.count += 1
+            self.total_bytes += len(image_data)
+            self.total_thumbnail_bytes += len(thumbnail_data) if thumbnail_data else 0
+            self.total_raw_bytes += frame.nbytes
+            self.total_encode_time += elapsed
+            self.recent_sizes.append(len(image_data) + (len(thumbnail_data) if thumbnail_data else 0))
+
+        return {
+            'image_data': image_data,
+            'thumbnail_data': thumbnail_data,
+            'width': image.shape[1],
+            'height': image.shape[0]
+        }
+
+    def get_stats(self):
+        """Byte-size statistics for the stats API."""
+        with self.lock:
+            count = self.count
+            sizes = np.array(self.recent_sizes) if self.recent_sizes else None
+            stats = {
+                'profile': self.profile_name,
+                'max_dimension': self.profile.get('max_dimension'),
+                'quality': self.profile.get('quality'),
+                'snapshots_encoded': count,
+                'total_bytes': self.total_bytes + self.total_thumbnail_bytes,
+                'thumbnail_bytes': self.total_thumbnail_bytes,
+            }
+            if count:
+                stats.update({
+                    'avg_bytes': int((self.total_bytes + self.total_thumbnail_bytes) / count),
+                    'p50_bytes': int(np.percentile(sizes, 50)),
+                    'p95_bytes': int(np.percentile(sizes, 95)),
+                    'max_bytes': int(sizes.max()),
+                    'compression_ratio': round(self.total_raw_bytes /
+                                               max(1, self.total_bytes + self.total_thumbnail_bytes), 1),
+                    'avg_encode_ms': round(self.total_encode_time / count * 1000, 2)
+                })
+            return stats
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Bounded, prioritized queue for snapshots waiting for analysis.
+
+In a crowd every new track adds a snapshot, and an unbounded Queue grows
+without limit while the analysis workers are rate limited. SnapshotQueue:
+
+- bounds the number of queued snapshots and their total bytes
+- serves new people / unknown subjects before periodic re-snapshots, and
+  within a priority the tracks that have had the fewest analyses
+- keeps at most one pending periodic snapshot per track (a newer one
+  replaces it)
+- admits snapshots against a global analyses-per-minute budget, keeping a
+  reserve so periodic re-snapshots can't use up the budget for new people
+- counts everything it drops, by reason
+
+It implements the parts of the Queue interface the pipeline uses (put/get/
+task_done/qsize/empty) plus a join() with a timeout for bounded shutdown.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter, defaultdict
+from queue import Empty
+
+from analysis_pipeline import TokenBucket
+
+# Lower = served first
+SNAPSHOT_PRIORITIES = {'new_person': 0, 'first_sighting': 0, 'periodic': 2}
+DEFAULT_PRIORITY = 1
+MAX_TRACKED_TRACKS = 1024  # Per-track served counts kept for fairness
+
+
+def snapshot_size(item):
+    """Bytes held by a queued snapshot (JPEG + optional thumbnail)."""
+    return len(item.get('image_data') or b'') + len(item.get('thumbnail_data') or b'')
+
+
+class SnapshotQueue:
+    """
+    Args:
+        max_items: Max queued snapshots
+        max_bytes: Max total bytes of queued snapshots
+        budget_per_minute: Snapshots admitted per minute (None = unlimited)
+        budget_burst: Budget bucket size
+        budget_reserve: Budget tokens only high-priority snapshots may use
+        on_drop: Optional callable(item, reason) for queued snapshots that are evicted,
+            superseded or discarded (called with the queue lock held - must not block)
+    """
+
+    def __init__(self, max_items=64, max_bytes=16 * 1024 * 1024, budget_per_minute=None,
+                 budget_burst=10, budget_reserve=2, on_drop=None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.budget = TokenBucket(budget_per_minute, burst=budget_burst) if budget_per_minute else None
+        self.budget_reserve = budget_reserve
+        self.on_drop = on_drop
+
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.all_done = threading.Condition(self.lock)
+        self.heap = []  # (priority, served_count, seq, item)
+        self.removed = set()  # seqs evicted/superseded but still in the heap
+        self.sequence = itertools.count()
+        self.pending_periodic = {}  # {track_id: seq}
+        self.served = defaultdict(int)  # {track_id: snapshots handed to the workers}
+        self.bytes = 0
+        self.items = 0
+        self.unfinished_tasks = 0
+
+        self.admitted = 0
+        self.drops = Counter()
+
+    def _priority(self, item):
+        return SNAPSHOT_PRIORITIES.get(item.get('reason'), DEFAULT_PRIORITY)
+
+    def _remove(self, seq, item, reason):
+        self.removed.add(seq)
+        self.items -= 1
+        self.bytes -= snapshot_size(item)
+        self.unfinished_tasks -= 1
+        if self.pending_periodic.get(item.get('track_id')) == seq:
+            del self.pending_periodic[item['track_id']]
+        self.drops[reason] += 1
+        if self.on_drop:
+            self.on_drop(item, reason)
+        if self.unfinished_tasks == 0:
+            self.all_done.notify_all()
+
+    def put(self, item):
+        """
+        Offer a snapshot.
+
+        Returns:
+            bool: True if it was queued, False if dropped (counted in get_stats()['dropped'])
+        """
+        priority = self._priority(item)
+        size = snapshot_size(item)
+        track_id = item.get('track_id')
+
+        with self.lock:
+            if size > self.max_bytes:
+                self.drops['too_large'] += 1
+                return False
+
+            entry = (priority, self.served[track_id], next(self.sequence), item)
+            live = [e for e in self.heap if e[2] not in self.removed]
+
+            # A newer periodic snapshot replaces the one still waiting for the same track
+            victims = []
+            if priority == SNAPSHOT_PRIORITIES['periodic'] and track_id in self.pending_periodic:
+                old_seq = self.pending_periodic[track_id]
+                victims = [(e, 'superseded') for e in live if e[2] == old_seq]
+                live = [e for e in live if e[2] != old_seq]
+
+            # Make room by evicting lower-priority / better-served entries, or reject the newcomer
+            items = self.items - len(victims)
+            queued_bytes = self.bytes - sum(snapshot_size(e[3]) for e, _ in victims)
+            live.sort(reverse=True)
+            while items >= self.max_items or queued_bytes + size > self.max_bytes:
+                if not live or live[0][:2] <= entry[:2]:
+                    self.drops['queue_full'] += 1
+                    return False
+                worst = live.pop(0)
+                victims.append((worst, 'evicted'))
+                items -= 1
+                queued_bytes -= snapshot_size(worst[3])
+
+            # Budget: periodic snapshots leave a reserve for new people
+            if self.budget is not None:
+                reserve = self.budget_reserve if priority > 0 else 0
+                if not self.budget.try_acquire(reserve=reserve):
+                    self.drops['over_budget'] += 1
+                    return False
+
+            for victim, reason in victims:
+                self._remove(victim[2], victim[3], reason)
+            heapq.heappush(self.heap, entry)
+            if priority == SNAPSHOT_PRIORITIES['periodic']:
+                self.pending_periodic[track_id] = entry[2]
+            self.items += 1
+            self.bytes += size
+            self.unfinished_tasks += 1
+            self.admitted += 1
+            self.not_empty.notify()
+            return True
+
+    def get(self, timeout=None):
+        """Highest-priority snapshot (raises queue.Empty on timeout)."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.not_empty:
+            while True:
+                while self.heap and self.heap[0][2] in self.removed:
+                    self.removed.discard(heapq.heappop(self.heap)[2])
+                if self.heap:
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise Empty
+                self.not_empty.wait(remaining)
+
+            _, _, seq, item = heapq.heappop(self.heap)
+            self.items -= 1
+            self.bytes -= snapshot_size(item)
+            track_id = item.get('track_id')
+            if self.pending_periodic.get(track_id) == seq:
+                del self.pending_periodic[track_id]
+            self.served[track_id] += 1
+            if len(self.served) > MAX_TRACKED_TRACKS:
+                # Fairness only matters between tracks still waiting - forget the rest
+                waiting = {e[3].get('track_id') for e in self.heap if e[2] not in self.removed}
+                self.served = defaultdict(int, {t: n for t, n in self.served.items() if t in waiting})
+            return item
+
+    def task_done(self):
+        with self.lock:
+            self.unfinished_tasks -= 1
+            if self.unfinished_tasks <= 0:
+                self.unfinished_tasks = 0
+                self.all_done.notify_all()
+
+    def join(self, timeout=None):
+        """
+        Wait until every queued snapshot has been processed.
+
+        Returns:
+            bool: True if drained, False if the timeout expired first
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.all_done:
+            while self.unfinished_tasks:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.all_done.wait(remaining)
+            return True
+
+    def discard_pending(self, reason='shutdown'):
+        """Drop everything still queued (counted under `reason`). Returns the number dropped."""
+        with self.lock:
+            dropped = 0
+            for _, _, seq, item in self.heap:
+                if seq not in self.removed:
+                    self._remove(seq, item, reason)
+                    dropped += 1
+            self.heap = []
+            self.removed.clear()
+            return dropped
+
+    def qsize(self):
+        return self.items
+
+    def empty(self):
+        return self.items == 0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'queued': self.items,
+                'queued_bytes': self.bytes,
+                'max_items': self.max_items,
+                'max_bytes': self.max_bytes,
+                'in_progress': self.unfinished_tasks - self.items,
+                'admitted': self.admitted,
+                'dropped': dict(self.drops),
+                'dropped_total': sum(self.drops.values())
+            }
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Durable on-disk spool for snapshots waiting for analysis / upload.
+
+Snapshots otherwise live only in memory, so a crash, restart or network outage
+loses every queued analysis. The spool is an append-only log split into
+segments (segment_000001.log, ...). Each record is checksummed:
+
+    magic (2s) | type (B) | payload length (I) | crc32 (I) | payload
+
+with three record types: SNAPSHOT (metadata + JPEG + thumbnail), RESULT
+(analysis result, so a restart does not re-run Gemini) and DONE (uploaded or
+deliberately dropped).
+
+- Writes go through a background writer thread; callers (the capture loop)
+  only enqueue, never touch the disk.
+- fsync policy: 'always' (every write batch), 'interval' or 'never'.
+- recover() replays the segments on startup, truncates a torn tail and
+  rebuilds the index of pending records.
+- Closed segments whose records are all done are deleted (oldest first, so a
+  DONE record is never removed before the record it refers to). When the spool
+  grows past its compaction threshold the oldest segment's live records are
+  copied forward and the segment deleted; past max_bytes the oldest pending
+  snapshots are dropped (counted).
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from pathlib import Path
+from queue import Queue, Empty, Full
+
+from analysis_pipeline import join_queue
+
+RECORD_MAGIC = b'SP'
+RECORD_HEADER = struct.Struct('>2sBII')
+META_LENGTH = struct.Struct('>I')
+SNAPSHOT, RESULT, DONE = 1, 2, 3
+
+SNAPSHOT_FIELDS = ('track_id', 'reason', 'timestamp', 'bbox', 'angles', 'image_hash')
+
+
+def _json_default(value):
+    if hasattr(value, 'tolist'):  # numpy scalars / arrays
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_record(record_type, meta, blobs=()):
+    meta = dict(meta, blob_lengths=[len(blob) for blob in blobs])
+    meta_bytes = json.dumps(meta, separators=(',', ':'), default=_json_default).encode()
+    payload = META_LENGTH.pack(len(meta_bytes)) + meta_bytes + b''.join(blobs)
+    return RECORD_HEADER.pack(RECORD_MAGIC, record_type, len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(path):
+    """
+    Yield (offset, record_type, meta, blobs) for every valid record in a segment.
+    Stops at the first torn or corrupt record; its offset is returned via StopIteration.value.
+    """
+    with open(path, 'rb') as f:
+        offset = 0
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if not header:
+                return offset
+            if len(header) < RECORD_HEADER.size:
+                return offset
+            magic, record_type, length, crc = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if magic != RECORD_MAGIC or len(payload) < length or zlib.crc32(payload) != crc:
+                return offset
+            (meta_length,) = META_LENGTH.unpack_from(payload)
+            meta = json.loads(payload[META_LENGTH.size:META_LENGTH.size + meta_length])
+            blobs, position = [], META_LENGTH.size + meta_length
+            for blob_length in meta.pop('blob_lengths', []):
+                blobs.append(payload[position:position + blob_length])
+                position += blob_length
+            yield offset, record_type, meta, blobs
+            offset += RECORD_HEADER.size + length
+
+
+class _Entry:
+    """Index entry for one spooled snapshot."""
+    __slots__ = ('segment', 'offset', 'result', 'inflight')
+
+    def __init__(self, segment, offset):
+        self.segment = segment
+        self.offset = offset
+        self.result = None
+        self.inflight = False
+
+
+class SnapshotSpool:
+    """
+    Args:
+        directory: Spool directory (created if missing)
+        segment_bytes: Segment size before rolling over to a new one
+        max_bytes: Hard cap on spool size on disk
+        fsync: 'always', 'interval' or 'never'
+        fsync_interval: Seconds between fsyncs with the 'interval' policy
+        write_queue_size: Pending writes before new writes are refused (never blocks the caller)
+    """
+
+    def __init__(self, directory, segment_bytes=4 * 1024 * 1024, max_bytes=256 * 1024 * 1024,
+                 fsync='interval', fsync_interval=1.0, write_queue_size=256):
+        if fsync not in ('always', 'interval', 'never'):
+            raise ValueError(f"Unknown fsync policy '{fsync}'")
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.compact_bytes = max_bytes // 2
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # {spool_id: _Entry}, oldest first
+        self.segments = OrderedDict()  # {segment number: {'size': bytes, 'ids': set of referenced ids}}
+        self.active = None
+        self.active_file = None
+        self.last_fsync = time.monotonic()
+        self.next_id = 0
+
+        self.writes = Queue(maxsize=write_queue_size)
+        self.writer = None
+        self.stats = Counter()
+
+    # ----------------------------------------
+    # Startup
+    # ----------------------------------------
+
+    def _segment_path(self, number):
+        return self.directory / f"segment_{number:06d}.log"
+
+    def recover(self):
+        """
+        Rebuild the index from the segments on disk and start the writer thread.
+
+        Returns:
+            dict: {'pending': snapshots to analyze, 'analyzed': snapshots waiting for upload}
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        numbers = sorted(int(p.stem.split('_')[1]) for p in self.directory.glob('segment_*.log'))
+
+        done = set()
+        for number in numbers:
+            path = self._segment_path(number)
+            referenced = set()
+            records = read_records(path)
+            while True:
+                try:
+                    offset, record_type, meta, _ = next(records)
+                except StopIteration as stop:
+                    valid_bytes = stop.value
+                    break
+                spool_id = meta['id']
+                referenced.add(spool_id)
+                if record_type == SNAPSHOT and spool_id not in done:
+                    self.entries[spool_id] = self.entries.get(spool_id) or _Entry(number, offset)
+                    self.entries[spool_id].segment, self.entries[spool_id].offset = number, offset
+                elif record_type == RESULT and spool_id in self.entries:
+                    self.entries[spool_id].result = meta['result']
+                elif record_type == DONE:
+                    done.add(spool_id)
+                    self.entries.pop(spool_id, None)
+
+            size = path.stat().st_size
+            if valid_bytes < size:
+                print(f"[SPOOL] Truncating torn/corrupt tail of {path.name} ({size - valid_bytes} bytes)")
+                with open(path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+                self.stats['corrupt_tails'] += 1
+            self.segments[number] = {'size': valid_bytes, 'ids': referenced}
+
+        self.next_id = 1 + max([int(i.split('-')[1]) for i in self.entries] + [0])
+        self._open_segment((numbers[-1] + 1) if numbers else 1)
+        self._delete_finished_segments()
+
+        self.writer = threading.Thread(target=self._writer_loop, name="snapshot-spool", daemon=True)
+        self.writer.start()
+
+        analyzed = sum(1 for entry in self.entries.values() if entry.result is not None)
+        self.stats['recovered'] = len(self.entries)
+        if self.entries:
+            print(f"[SPOOL] Recovered {len(self.entries)} snapshot(s) ({analyzed} already analyzed)")
+        return {'pending': len(self.entries) - analyzed, 'analyzed': analyzed}
+
+    def _open_segment(self, number):
+        if self.active_file:
+            self._sync(force=True)
+            self.active_file.close()
+        self.active = number
+        self.active_file = open(self._segment_path(number), 'ab')
+        self.segments.setdefault(number, {'size': 0, 'ids': set()})
+
+    # ----------------------------------------
+    # Producer API (non-blocking)
+    # ----------------------------------------
+
+    def new_id(self):
+        with self.lock:
+            self.next_id += 1
+            return f"{int(time.time())}-{self.next_id}"
+
+    def _enqueue(self, operation):
+        try:
+            self.writes.put_nowait(operation)
+            return True
+        except Full:
+            self.stats['write_queue_full'] += 1
+            return False
+
+    def append_snapshot(self, snapshot):
+        """Spool a snapshot (must have 'spool_id'). Returns False if the writer is backed up."""
+        with self.lock:
+            self.entries[snapshot['spool_id']] = entry = _Entry(None, None)
+            entry.inflight = True  # The caller is processing it
+        if self._enqueue((SNAPSHOT, snapshot)):
+            return True
+        with self.lock:
+            del self.entries[snapshot['spool_id']]
+        return False
+
+    def append_result(self, spool_id, result):
+        """Record an analysis result so a restart goes straight to upload."""
+        return self._enqueue((RESULT, {'id': spool_id, 'result': result}))
+
+    def mark_done(self, spool_id):
+        """Uploaded (or deliberately dropped) - the record can be compacted away."""
+        return self._enqueue((DONE, {'id': spool_id}))
+
+    def release(self, spool_id):
+        """Processing failed - make the snapshot eligible for replay again."""
+        with self.lock:
+            entry = self.entries.get(spool_id)
+            if entry is not None:
+                entry.inflight = False
+
+    def take_replay(self, limit=100):
+        """
+        Load spooled snapshots that are not being processed (recovered, or released after a failure).
+
+        Returns:
+            list of (snapshot dict, result or None); the snapshots are marked in flight
+        """
+        with self.lock:
+            chosen = [(spool_id, entry) for spool_id, entry in self.entries.items()
+                      if not entry.inflight and entry.offset is not None][:limit]
+            for _, entry in chosen:
+                entry.inflight = True
+
+        replay = []
+        for spool_id, entry in chosen:
+            snapshot = self._load_snapshot(entry)
+            if snapshot is None:
+                self.release(spool_id)
+                continue
+            replay.append((snapshot, entry.result))
+        return replay
+
+    def _load_snapshot(self, entry):
+        try:
+            with open(self._segment_path(entry.segment), 'rb') as f:
+                f.seek(entry.offset)
+                header = f.read(RECORD_HEADER.size)
+                magic, record_type, length, crc = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+            if magic != RECORD_MAGIC or zlib.crc32(payload) != crc:
+                raise ValueError("checksum mismatch")
+        except Exception as e:
+            print(f"[SPOOL] Failed to read spooled snapshot: {e}")
+            return None
+        (meta_length,) = META_LENGTH.unpack_from(payload)
+        meta = json.loads(payload[META_LENGTH.size:META_LENGTH.size + meta_length])
+        image_length, thumbnail_length = meta.pop('blob_lengths')
+        position = META_LENGTH.size + meta_length
+        snapshot = {key: meta.get(key) for key in SNAPSHOT_FIELDS}
+        snapshot['spool_id'] = meta['id']
+        snapshot['image_data'] = payload[position:position + image_length]
+        snapshot['thumbnail_data'] = payload[position + image_length:
+                                             position + image_length + thumbnail_length] or None
+        snapshot['queued_at'] = time.monotonic()
+        return snapshot
+
+    # ----------------------------------------
+    # Writer thread
+    # ----------------------------------------
+
+    def _writer_loop(self):
+        while True:
+            try:
+                operation = self.writes.get(timeout=self.fsync_interval)
+            except Empty:
+                self._sync()
+                continue
+            batch = [operation]
+            # Drain whatever else is waiting before syncing once
+            while batch[-1] is not None:
+                try:
+                    batch.append(self.writes.get_nowait())
+                except Empty:
+                    break
+            try:
+                for operation in batch:
+                    if operation is not None:
+                        self._write(*operation)
+                if batch[-1] is None:
+                    self._sync(force=True)
+                    return
+                self._sync(force=self.fsync == 'always')
+                self._maintain()
+            except Exception as e:
+                self.stats['write_errors'] += 1
+                print(f"[SPOOL] Write error: {e}")
+            finally:
+                for _ in batch:
+                    self.writes.task_done()
+
+    def _append(self, record_type, meta, blobs=()):
+        data = encode_record(record_type, meta, blobs)
+        if self.segments[self.active]['size'] + len(data) > self.segment_bytes and \
+                self.segments[self.active]['size'] > 0:
+            self._open_segment(self.active + 1)
+        offset = self.segments[self.active]['size']
+        self.active_file.write(data)
+        self.segments[self.active]['size'] += len(data)
+        self.segments[self.active]['ids'].add(meta['id'])
+        self.stats['records_written'] += 1
+        self.stats['bytes_written'] += len(data)
+        return offset
+
+    def _write(self, record_type, payload):
+        if record_type == SNAPSHOT:
+            meta = {key: payload.get(key) for key in SNAPSHOT_FIELDS}
+            meta['id'] = payload['spool_id']
+            blobs = (payload['image_data'], payload.get('thumbnail_data') or b'')
+            offset = self._append(SNAPSHOT, meta, blobs)
+            with self.lock:
+                entry = self.entries.get(meta['id'])
+                if entry is not None:
+                    entry.segment, entry.offset = self.active, offset
+        elif record_type == RESULT:
+            with self.lock:
+                entry = self.entries.get(payload['id'])
+                if entry is None:
+                    return
+                entry.result = payload['result']
+            self._append(RESULT, payload)
+        elif record_type == DONE:
+            with self.lock:
+                if self.entries.pop(payload['id'], None) is None:
+                    return
+            self._append(DONE, payload)
+            self.stats['completed'] += 1
+
+    def _sync(self, force=False):
+        if not self.active_file:
+            return
+        self.active_file.flush()
+        now = time.monotonic()
+        if self.fsync != 'never' and (force or now - self.last_fsync >= self.fsync_interval):
+            os.fsync(self.active_file.fileno())
+            self.last_fsync = now
+            self.stats['fsyncs'] += 1
+
+    # ----------------------------------------
+    # Compaction
+    # ----------------------------------------
+
+    def _total_bytes(self):
+        return sum(segment['size'] for segment in list(self.segments.values()))
+
+    def _delete_finished_segments(self):
+        """Delete closed segments from the oldest while none of their ids are pending."""
+        while len(self.segments) > 1:
+            number, segment = next(iter(self.segments.items()))
+            if number == self.active:
+                break
+            with self.lock:
+                if any(spool_id in self.entries for spool_id in segment['ids']):
+                    break
+            self._segment_path(number).unlink(missing_ok=True)
+            del self.segments[number]
+            self.stats['segments_deleted'] += 1
+
+    def _compact_oldest(self):
+        """Copy the oldest closed segment's pending records forward, then delete it."""
+        number = next(iter(self.segments))
+        if number == self.active:
+            return False
+        moved = 0
+        for offset, record_type, meta, blobs in list(read_records(self._segment_path(number))):
+            spool_id = meta['id']
+            with self.lock:
+                entry = self.entries.get(spool_id)
+                live = entry is not None and entry.segment == number and entry.offset == offset
+            if record_type == SNAPSHOT and live:
+                new_offset = self._append(SNAPSHOT, meta, blobs)
+                with self.lock:
+                    entry.segment, entry.offset = self.active, new_offset
+                    result = entry.result
+                if result is not None:
+                    self._append(RESULT, {'id': spool_id, 'result': result})
+                moved += 1
+        self._sync(force=True)
+        self._segment_path(number).unlink(missing_ok=True)
+        del self.segments[number]
+        self.stats['segments_compacted'] += 1
+        return True
+
+    def _drop_oldest(self):
+        """Over the disk cap - give up on the oldest pending snapshot."""
+        with self.lock:
+            if not self.entries:
+                return False
+            spool_id = next(iter(self.entries))
+            del self.entries[spool_id]
+        self._append(DONE, {'id': spool_id})
+        self.stats['dropped_disk_full'] += 1
+        return True
+
+    def _maintain(self):
+        self._delete_finished_segments()
+        if self._total_bytes() > self.compact_bytes and len(self.segments) > 1:
+            self._compact_oldest()
+            self._delete_finished_segments()
+        # Still over the cap: the pending records themselves don't fit
+        while self._total_bytes() > self.max_bytes and self._drop_oldest():
+            self._delete_finished_segments()
+
+    # ----------------------------------------
+    # Shutdown / stats
+    # ----------------------------------------
+
+    def flush(self, timeout=2.0):
+        """Wait until every queued write has reached the segment file. Returns False on timeout."""
+        return join_queue(self.writes, timeout)
+
+    def close(self, timeout=2.0):
+        """Flush pending writes and fsync (bounded by `timeout`)."""
+        if self.writer and self.writer.is_alive():
+            try:
+                self.writes.put(None, timeout=timeout)
+            except Full:
+                pass
+            self.writer.join(timeout=timeout)
+        elif self.active_file:
+            self._sync(force=True)
+
+    def get_stats(self):
+        with self.lock:
+            pending = len(self.entries)
+            analyzed = sum(1 for entry in self.entries.values() if entry.result is not None)
+            inflight = sum(1 for entry in self.entries.values() if entry.inflight)
+        stats = dict(self.stats)
+        stats.update({
+            'pending': pending,
+            'analyzed_pending_upload': analyzed,
+            'in_flight': inflight,
+            'segments': len(self.segments),
+            'disk_bytes': self._total_bytes(),
+            'max_bytes': self.max_bytes,
+            'write_queue': self.writes.qsize(),
+            'fsync_policy': self.fsync
+        })
+        return stats
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Bounded per-track state for the sentry.
+
+ByteTrack IDs only ever go up, so a dict/set keyed by track ID grows for as
+long as the service runs. TrackStateStore keeps per-track metadata in
+fixed-size numpy arrays (one slot per track):
+
+- first / last seen, last snapshot time, snapshot count
+- best snapshot crop score
+- analysis state (none / queued / analyzed / failed)
+
+Tracks not seen for `ttl` seconds are freed (swept at most every
+`sweep_interval` seconds). When every slot is taken the least recently seen
+track is evicted, so memory stays flat no matter how long the unit is up.
+
+Freeing a slot doesn't make the track new again: the last `capacity` freed
+IDs are remembered, so a person who stands still past the TTL and comes back
+under the same ID isn't counted (or snapshotted as a new person) twice -
+their metadata starts over in a fresh slot, except the last snapshot time and
+count, which are restored so periodic snapshots carry on. (Not simply "IDs above the highest
+seen": the capture loop touches a frame's tracks in detector order and stops
+at the locked target, so a new lower ID can show up after a higher one.)
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+ANALYSIS_STATES = ('none', 'queued', 'analyzed', 'failed')
+_STATE_CODES = {name: code for code, name in enumerate(ANALYSIS_STATES)}
+EMPTY = -1
+
+
+class TrackStateStore:
+    """
+    Args:
+        capacity: Max tracks held (fixed memory)
+        ttl: Seconds after a track was last seen before its slot is freed
+        sweep_interval: Min seconds between TTL sweeps
+    """
+
+    def __init__(self, capacity=4096, ttl=600.0, sweep_interval=1.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+
+        self.ids = np.full(capacity, EMPTY, dtype=np.int64)
+        self.first_seen = np.zeros(capacity, dtype=np.float64)
+        self.last_seen = np.zeros(capacity, dtype=np.float64)
+        self.last_snapshot = np.full(capacity, np.nan, dtype=np.float64)
+        self.snapshots = np.zeros(capacity, dtype=np.int32)
+        self.best_score = np.full(capacity, np.nan, dtype=np.float32)
+        self.analysis = np.zeros(capacity, dtype=np.int8)
+
+        self.slots = {}  # {track_id: slot}, never larger than capacity
+        self.free = list(range(capacity - 1, -1, -1))  # Stack, lowest slot on top
+        self.lock = threading.Lock()
+        self.swept_at = 0.0
+        # Recently freed track IDs -> (last snapshot time, snapshot count), oldest first, at most capacity
+        self.released = OrderedDict()
+
+        self.total_seen = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _release(self, slot):
+        track_id = int(self.ids[slot])
+        del self.slots[track_id]
+        self.ids[slot] = EMPTY
+        self.free.append(slot)
+        self.released[track_id] = (float(self.last_snapshot[slot]), int(self.snapshots[slot]))
+        if len(self.released) > self.capacity:
+            self.released.popitem(last=False)
+
+    def _sweep(self, now):
+        self.swept_at = now
+        stale = np.flatnonzero((self.ids != EMPTY) & (now - self.last_seen > self.ttl))
+        for slot in stale:
+            self._release(int(slot))
+        self.expired += len(stale)
+
+    def touch(self, track_id, now):
+        """
+        Mark a track as seen.
+
+        Returns:
+            bool: True the first time the ID is seen (not when it comes back after expiry / eviction)
+        """
+        with self.lock:
+            if now - self.swept_at >= self.sweep_interval:
+                self._sweep(now)
+
+            slot = self.slots.get(track_id)
+            if slot is not None:
+                self.last_seen[slot] = now
+                return False
+
+            if not self.free:
+                # Full: the least recently seen track makes room
+                self._release(int(np.argmin(self.last_seen)))
+                self.evicted += 1
+            slot = self.free.pop()
+            self.slots[track_id] = slot
+            self.ids[slot] = track_id
+            self.first_seen[slot] = self.last_seen[slot] = now
+            self.last_snapshot[slot] = np.nan
+            self.snapshots[slot] = 0
+            self.best_score[slot] = np.nan
+            self.analysis[slot] = 0
+            if track_id in self.released:
+                # Expired or evicted, now back
+                self.last_snapshot[slot], self.snapshots[slot] = self.released.pop(track_id)
+                return False
+            self.total_seen += 1
+            return True
+
+    def __contains__(self, track_id):
+        return track_id in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def last_snapshot_time(self, track_id):
+        """Time of the track's last snapshot, or None (unknown track / no snapshot yet)."""
+        slot = self.slots.get(track_id)
+        if slot is None or np.isnan(self.last_snapshot[slot]):
+            return None
+        return float(self.last_snapshot[slot])
+
+    def mark_snapshot(self, track_id, now):
+        with self.lock:
+            slot = self.slots.get(track_id)
+            if slot is not None:
+                self.last_snapshot[slot] = now
+                self.snapshots[slot] += 1
+
+    def record_score(self, track_id, score):
+        """Keep the best snapshot crop score seen for the track."""
+        with self.lock:
+            slot = self.slots.get(track_id)
+            if slot is not None and not score <= self.best_score[slot]:
+                self.best_score[slot] = score
+
+    def set_analysis_state(self, track_id, state):
+        """state: one of ANALYSIS_STATES. No-op if the track has already been evicted."""
+        with self.lock:
+            slot = self.slots.get(track_id)
+            if slot is not None:
+                self.analysis[slot] = _STATE_CODES[state]
+
+    def get(self, track_id):
+        """All metadata for a track as a dict (None if not in the store)."""
+        with self.lock:
+            slot = self.slots.get(track_id)
+            if slot is None:
+                return None
+            return {
+                'first_seen': float(self.first_seen[slot]),
+                'last_seen': float(self.last_seen[slot]),
+                'last_snapshot': None if np.isnan(self.last_snapshot[slot]) else float(self.last_snapshot[slot]),
+                'snapshots': int(self.snapshots[slot]),
+                'best_score': None if np.isnan(self.best_score[slot]) else round(float(self.best_score[slot]), 3),
+                'analysis_state': ANALYSIS_STATES[self.analysis[slot]]
+            }
+
+    def get_stats(self):
+        with self.lock:
+            occupied = self.ids != EMPTY
+            states = np.bincount(self.analysis[occupied], minlength=len(ANALYSIS_STATES))
+            return {
+                'capacity': self.capacity,
+                'occupied': int(occupied.sum()),
+                'occupancy': round(float(occupied.mean()), 3),
+                'with_snapshot': int((occupied & ~np.isnan(self.last_snapshot)).sum()),
+                'analysis_states': {name: int(n) for name, n in zip(ANALYSIS_STATES, states)},
+                'total_seen': self.total_seen,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'ttl_seconds': self.ttl,
+                'array_bytes': sum(a.nbytes for a in (self.ids, self.first_seen, self.last_seen, self.last_snapshot,
+                                                      self.snapshots, self.best_score, self.analysis))
+            }
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Closed-loop virtual pan/tilt rig for evaluating tracking without hardware.
+
+Renders a virtual scene with moving people as seen through a simulated pan/tilt
+camera, feeds the frames to SentryService and moves the virtual head from the
+servo commands written by ServoController (through the same ServoOutput layer
+as the real PCA9685), with configurable servo dynamics and latency.
+
+Reports time-to-acquire, time-on-target and tracking error so controller,
+scheduler and detector changes can be benchmarked in CI.
+
+Usage:
+    python sentry/tracking_sim.py --duration 10 --people 2
+    python sentry/tracking_sim.py --slew-rate 60 --inference-time 0.08 --json
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from camera_model import CameraModel
+from servo_output import FakePCA9685, PCA9685_RESOLUTION
+from sentry_service import (
+    SentryService, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_HFOV, CAMERA_VFOV, TARGET_FPS,
+    PAN_DEFAULT, TILT_DEFAULT, PAN_MIN, PAN_MAX, PAN_INVERT, TILT_INVERT,
+    PAN_CHANNEL, TILT_CHANNEL, SERVO_PWM_FREQUENCY, SERVO_MIN_PULSE_US, SERVO_MAX_PULSE_US, MAX_SERVO_SPEED
+)
+
+
+# ========================================
+# Virtual Rig (servo dynamics)
+# ========================================
+
+class SimulatedRig(FakePCA9685):
+    """
+    PCA9685 bus that drives a virtual pan/tilt head.
+
+    Args:
+        slew_rate: Max servo speed (degrees/second)
+        time_constant: First-order response time of the servo (seconds)
+        command_latency: Delay between a bus write and the servo reacting (seconds)
+        servo_gain: (pan, tilt) actual rotation per commanded degree around neutral
+    """
+
+    def __init__(self, slew_rate=MAX_SERVO_SPEED, time_constant=0.05, command_latency=0.02,
+                 servo_gain=(1.0, 1.0), pan=PAN_DEFAULT, tilt=TILT_DEFAULT):
+        super().__init__()
+        self.servo_gain = servo_gain
+        self.slew_rate = slew_rate
+        self.time_constant = time_constant
+        self.command_latency = command_latency
+
+        counts_per_us = SERVO_PWM_FREQUENCY * PCA9685_RESOLUTION / 1_000_000
+        self.min_count = SERVO_MIN_PULSE_US * counts_per_us
+        self.count_range = (SERVO_MAX_PULSE_US - SERVO_MIN_PULSE_US) * counts_per_us
+
+        self.lock = threading.Lock()
+        self.pan = float(pan)
+        self.tilt = float(tilt)
+        self.command = [self.pan, self.tilt]
+        self.pending = deque()  # (apply_at, channel, angle)
+        self.sim_time = time.monotonic()
+        self.history = deque(maxlen=5000)  # (time, pan, tilt) per 2 ms integration step
+        self.history.append((self.sim_time, self.pan, self.tilt))
+
+    def write_channels(self, first_channel, counts):
+        super().write_channels(first_channel, counts)
+        apply_at = time.monotonic() + self.command_latency
+        with self.lock:
+            for offset, count in enumerate(counts):
+                angle = (count - self.min_count) / self.count_range * 180
+                channel = first_channel + offset
+                if channel == PAN_CHANNEL:
+                    angle = PAN_DEFAULT + (angle - PAN_DEFAULT) * self.servo_gain[0]
+                elif channel == TILT_CHANNEL:
+                    angle = TILT_DEFAULT + (angle - TILT_DEFAULT) * self.servo_gain[1]
+                self.pending.append((apply_at, channel, angle))
+
+    def _advance(self, now):
+        while self.sim_time < now:
+            dt = min(0.002, now - self.sim_time)
+            self.sim_time += dt
+
+            while self.pending and self.pending[0][0] <= self.sim_time:
+                _, channel, angle = self.pending.popleft()
+                if channel == PAN_CHANNEL:
+                    self.command[0] = angle
+                elif channel == TILT_CHANNEL:
+                    self.command[1] = angle
+
+            max_move = self.slew_rate * dt
+            for axis, current in enumerate((self.pan, self.tilt)):
+                velocity = (self.command[axis] - current) / max(self.time_constant, dt)
+                move = max(-max_move, min(max_move, velocity * dt))
+                if axis == 0:
+                    self.pan += move
+                else:
+                    self.tilt += move
+            self.history.append((self.sim_time, self.pan, self.tilt))
+
+    def angles_at(self, timestamp=None):
+        """Actual head angles at a time.monotonic() timestamp (defaults to now)."""
+        now = time.monotonic()
+        with self.lock:
+            self._advance(now)
+            if timestamp is None or timestamp >= now:
+                return self.pan, self.tilt
+            for t, pan, tilt in reversed(self.history):
+                if t <= timestamp:
+                    return pan, tilt
+            return self.history[0][1], self.history[0][2]
+
+
+# ========================================
+# Virtual Scene
+# ========================================
+
+def _bounce(start, velocity, t, low, high):
+    """Position moving at `velocity` that reflects off [low, high]."""
+    span = high - low
+    if velocity == 0 or span <= 0:
+        return start
+    distance = (start - low + velocity * t) % (2 * span)
+    return low + (distance if distance <= span else 2 * span - distance)
+
+
+class VirtualPerson:
+    """
+    Person in world coordinates (servo-angle space: azimuth ~ pan, elevation ~ tilt).
+
+    Args:
+        person_id: Track ID the oracle detector reports
+        azimuth, elevation: Starting position (degrees)
+        velocity: (azimuth, elevation) speed in degrees/second, bouncing inside bounds
+        width, height: Angular size (degrees)
+        enter_time, exit_time: When the person is in the scene (seconds from start)
+    """
+
+    def __init__(self, person_id, azimuth, elevation=TILT_DEFAULT, velocity=(0.0, 0.0),
+                 width=6.0, height=18.0, bounds=(PAN_MIN, PAN_MAX), enter_time=0.0, exit_time=None):
+        self.person_id = person_id
+        self.azimuth = azimuth
+        self.elevation = elevation
+        self.velocity = velocity
+        self.width = width
+        self.height = height
+        self.bounds = bounds
+        self.enter_time = enter_time
+        self.exit_time = exit_time
+        self.color = (60 + 40 * (person_id % 4), 90, 200 - 30 * (person_id % 5))
+
+    def present(self, t):
+        return t >= self.enter_time and (self.exit_time is None or t < self.exit_time)
+
+    def position(self, t):
+        elapsed = max(0.0, t - self.enter_time)
+        azimuth = _bounce(self.azimuth, self.velocity[0], elapsed, *self.bounds)
+        elevation = self.elevation + self.velocity[1] * elapsed
+        return azimuth, elevation
+
+
+class SimulatedCamera:
+    """
+    VideoCapture stand-in that renders the scene from the rig's actual angles.
+
+    Args:
+        rig: SimulatedRig
+        people: List of VirtualPerson
+        fps: Frame rate (read() blocks to pace frames like a real camera)
+        capture_latency: Age of a frame when read() returns it (seconds)
+    """
+
+    def __init__(self, rig, people, fps=TARGET_FPS, capture_latency=0.03,
+                 width=CAMERA_WIDTH, height=CAMERA_HEIGHT, hfov=CAMERA_HFOV, vfov=CAMERA_VFOV):
+        self.rig = rig
+        self.people = people
+        self.frame_period = 1.0 / fps
+        self.capture_latency = capture_latency
+        self.width = width
+        self.height = height
+        self.hfov = hfov
+        self.vfov = vfov
+        # Ground-truth optics: pinhole projection, ideal servo response
+        self.optics = CameraModel(width, height, hfov=hfov, vfov=vfov,
+                                  pan_invert=PAN_INVERT, tilt_invert=TILT_INVERT)
+
+        self.start_time = time.monotonic()
+        self.next_frame_time = self.start_time
+        self.opened = True
+        self.frames = 0
+        self.last_ground_truth = []  # [(person_id, bbox)] for the last frame returned
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return True
+
+    def release(self):
+        self.opened = False
+
+    def project(self, azimuth, elevation, pan, tilt):
+        """World angles -> pixel position for a head pointing at (pan, tilt). None if behind the camera."""
+        if abs(azimuth - pan) > 80 or abs(elevation - tilt) > 80:
+            return None
+        return self.optics.angle_to_pixel(azimuth - pan, elevation - tilt)
+
+    def read(self):
+        if not self.opened:
+            return False, None
+
+        delay = self.next_frame_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame_time = max(self.next_frame_time + self.frame_period, time.monotonic())
+
+        capture_time = time.monotonic() - self.capture_latency
+        pan, tilt = self.rig.angles_at(capture_time)
+        frame, ground_truth = self.render(capture_time - self.start_time, pan, tilt)
+        self.last_ground_truth = ground_truth
+        self.frames += 1
+        return True, frame
+
+    def render(self, t, pan, tilt):
+        """Render the scene at scene time t. Returns (frame, [(person_id, bbox)])."""
+        frame = np.full((self.height, self.width, 3), (70, 75, 80), dtype=np.uint8)
+
+        # Wall panels fixed in world space so camera motion is visible
+        for azimuth in range(0, 181, 10):
+            point = self.project(azimuth, tilt, pan, tilt)
+            if point and 0 <= point[0] < self.width:
+                cv2.line(frame, (int(point[0]), 0), (int(point[0]), self.height), (95, 100, 105), 2)
+
+        ground_truth = []
+        for person in self.people:
+            if not person.present(t):
+                continue
+            azimuth, elevation = person.position(t)
+            corner_a = self.project(azimuth - person.width / 2, elevation - person.height / 2, pan, tilt)
+            corner_b = self.project(azimuth + person.width / 2, elevation + person.height / 2, pan, tilt)
+            if corner_a is None or corner_b is None:
+                continue
+            x1, x2 = sorted((corner_a[0], corner_b[0]))
+            y1, y2 = sorted((corner_a[1], corner_b[1]))
+            cx = (x1 + x2) / 2
+            half_w = (x2 - x1) / 2
+
+            # Skip people that are (mostly) out of view
+            visible_w = min(x2, self.width) - max(x1, 0)
+            visible_h = min(y2, self.height) - max(y1, 0)
+            if visible_w < 0.3 * (x2 - x1) or visible_h < 0.3 * (y2 - y1):
+                continue
+
+            head_r = int(half_w * 0.6)
+            cv2.rectangle(frame, (int(x1), int(y1 + 2 * head_r)), (int(x2), int(y2)), person.color, -1)
+            cv2.circle(frame, (int(cx), int(y1 + head_r)), head_r, (150, 170, 210), -1)
+
+            bbox = [max(x1, 0), max(y1, 0), min(x2, self.width), min(y2, self.height)]
+            ground_truth.append((person.person_id, bbox))
+
+        return frame, ground_truth
+
+
+class OracleDetector:
+    """
+    Ground-truth detector standing in for YOLO + ByteTrack.
+
+    Args:
+        camera: SimulatedCamera whose last frame is being detected
+        inference_time: Simulated detection cost (seconds)
+        miss_rate: Probability of dropping a detection
+        noise_px: Gaussian bbox jitter (pixels)
+    """
+
+    def __init__(self, camera, inference_time=0.045, miss_rate=0.0, noise_px=2.0, seed=0):
+        self.camera = camera
+        self.inference_time = inference_time
+        self.miss_rate = miss_rate
+        self.noise_px = noise_px
+        self.rng = random.Random(seed)
+
+    def __call__(self, frame):
+        if self.inference_time:
+            time.sleep(self.inference_time)
+
+        tracks = []
+        for person_id, bbox in self.camera.last_ground_truth:
+            if self.rng.random() < self.miss_rate:
+                continue
+            jitter = [self.rng.gauss(0, self.noise_px) for _ in range(4)]
+            tracks.append({
+                'id': person_id,
+                'bbox': np.array([b + j for b, j in zip(bbox, jitter)], dtype=np.float32)
+            })
+        return tracks
+
+
+# ========================================
+# Metrics
+# ========================================
+
+class TrackingMetrics:
+    """Accumulates tracking performance samples."""
+
+    def __init__(self, on_target_deg=3.0):
+        self.on_target_deg = on_target_deg
+        self.samples = []  # (t, error_deg or None)
+        self.time_to_acquire = None
+
+    def record(self, t, error):
+        self.samples.append((t, error))
+        if error is not None and error <= self.on_target_deg and self.time_to_acquire is None:
+            self.time_to_acquire = t
+
+    def report(self):
+        occupied = [(t, e) for t, e in self.samples if e is not None]
+        if len(self.samples) > 1:
+            dt = (self.samples[-1][0] - self.samples[0][0]) / (len(self.samples) - 1)
+        else:
+            dt = 0.0
+
+        on_target = sum(1 for _, e in occupied if e <= self.on_target_deg)
+        acquired = [e for t, e in occupied
+                    if self.time_to_acquire is not None and t >= self.time_to_acquire]
+
+        report = {
+            'time_to_acquire': round(self.time_to_acquire, 3) if self.time_to_acquire is not None else None,
+            'time_on_target': round(on_target * dt, 3),
+            'on_target_ratio': round(on_target / len(occupied), 3) if occupied else 0.0,
+            'tracking_error_mean': None,
+            'tracking_error_rms': None,
+            'tracking_error_p95': None,
+            'samples': len(self.samples)
+        }
+        if acquired:
+            errors = np.array(acquired)
+            report['tracking_error_mean'] = round(float(errors.mean()), 3)
+            report['tracking_error_rms'] = round(float(np.sqrt((errors ** 2).mean())), 3)
+            report['tracking_error_p95'] = round(float(np.percentile(errors, 95)), 3)
+        return report
+
+
+# ========================================
+# Runner
+# ========================================
+
+def default_people(count=1, seed=0):
+    """A scenario with `count` people walking at different speeds."""
+    rng = random.Random(seed)
+    people = []
+    for i in range(count):
+        people.append(VirtualPerson(
+            person_id=i + 1,
+            azimuth=rng.uniform(50, 130),
+            elevation=TILT_DEFAULT + rng.uniform(-5, 5),
+            velocity=(rng.choice([-1, 1]) * rng.uniform(3, 12), 0.0),
+            enter_time=i * 1.5
+        ))
+    return people
+
+
+def run_simulation(people=None, duration=10.0, fps=TARGET_FPS, inference_time=0.045,
+                   miss_rate=0.0, slew_rate=MAX_SERVO_SPEED, time_constant=0.05, command_latency=0.02,
+                   capture_latency=0.03, on_target_deg=3.0, sample_hz=50):
+    """
+    Run SentryService against the virtual rig in real time.
+
+    Returns:
+        dict: Tracking report plus loop/servo statistics
+    """
+    if people is None:
+        people = default_people()
+
+    rig = SimulatedRig(slew_rate=slew_rate, time_constant=time_constant, command_latency=command_latency)
+    camera = SimulatedCamera(rig, people, fps=fps, capture_latency=capture_latency)
+    detector = OracleDetector(camera, inference_time=inference_time, miss_rate=miss_rate)
+
+    sentry = SentryService(capture=camera, detector=detector, servo_bus=rig,
+                           analysis_enabled=False, patrol_file=None)
+    sentry.profiling_enabled = False
+    metrics = TrackingMetrics(on_target_deg=on_target_deg)
+
+    start = time.monotonic()
+    camera.start_time = start
+    camera.next_frame_time = start
+    sentry.start()
+
+    try:
+        while True:
+            now = time.monotonic()
+            t = now - start
+            if t >= duration:
+                break
+
+            pan, tilt = rig.angles_at(now)
+            errors = {}
+            for person in people:
+                if person.present(t):
+                    azimuth, elevation = person.position(t)
+                    errors[person.person_id] = math.hypot(azimuth - pan, elevation - tilt)
+
+            if not errors:
+                metrics.record(t, None)
+            elif sentry.target.locked_id in errors:
+                metrics.record(t, errors[sentry.target.locked_id])
+            else:
+                metrics.record(t, min(errors.values()))
+
+            time.sleep(1.0 / sample_hz)
+    finally:
+        sentry.stop()
+
+    report = metrics.report()
+    report['frames'] = camera.frames
+    report['fps'] = round(camera.frames / duration, 1)
+    report['servo_io'] = sentry.servo.get_io_stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed-loop pan/tilt tracking simulator")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to simulate (real time)")
+    parser.add_argument('--people', type=int, default=1, help="Number of virtual people")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fps', type=float, default=TARGET_FPS)
+    parser.add_argument('--inference-time', type=float, default=0.045, help="Simulated detector cost (s)")
+    parser.add_argument('--miss-rate', type=float, default=0.0)
+    parser.add_argument('--slew-rate', type=float, default=MAX_SERVO_SPEED, help="Servo speed (deg/s)")
+    parser.add_argument('--time-constant', type=float, default=0.05, help="Servo response time (s)")
+    parser.add_argument('--command-latency', type=float, default=0.02, help="Bus write -> motion delay (s)")
+    parser.add_argument('--capture-latency', type=float, default=0.03, help="Camera frame age (s)")
+    parser.add_argument('--on-target', type=float, default=3.0, help="On-target tolerance (deg)")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_simulation(
+        people=default_people(args.people, args.seed),
+        duration=args.duration,
+        fps=args.fps,
+        inference_time=args.inference_time,
+        miss_rate=args.miss_rate,
+        slew_rate=args.slew_rate,
+        time_constant=args.time_constant,
+        command_latency=args.command_latency,
+        capture_latency=args.capture_latency,
+        on_target_deg=args.on_target
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 60)
+    print("  TRACKING SIMULATION REPORT")
+    print("=" * 60)
+    for key, value in report.items():
+        print(f"  {key:22s} {value}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
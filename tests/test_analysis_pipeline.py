@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the analysis pipeline rate limiter and latency tracking.
+
+Run with: python tests/test_analysis_pipeline.py  (or pytest)
+"""
+
+import os
+import sys
+import threading
+import time
+from queue import Queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from analysis_pipeline import LatencyTracker, TokenBucket, collect_batch, join_queue
+
+
+def test_token_bucket_allows_burst_then_limits():
+    bucket = TokenBucket(rate_per_minute=600, burst=3)  # 10/s
+    start = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire() < 0.01
+    bucket.acquire()
+    assert 0.07 < time.monotonic() - start < 0.3
+
+
+def test_token_bucket_shared_between_threads():
+    bucket = TokenBucket(rate_per_minute=1200, burst=1)  # 20/s
+    acquired = []
+
+    def worker():
+        for _ in range(3):
+            bucket.acquire()
+            acquired.append(time.monotonic())
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 9 requests at 20/s with a burst of 1 -> at least 8 intervals of 50 ms
+    assert len(acquired) == 9
+    assert max(acquired) - start >= 0.35
+
+
+def test_token_bucket_timeout_and_stop():
+    bucket = TokenBucket(rate_per_minute=6, burst=1)  # One every 10 s
+    assert bucket.acquire() is not None
+    assert bucket.acquire(timeout=0.05) is None
+    stop = threading.Event()
+    stop.set()
+    assert bucket.acquire(stop_event=stop) is None
+
+
+def test_latency_tracker_summary():
+    tracker = LatencyTracker(window=10)
+    assert tracker.summary() == {'count': 0}
+    for ms in range(1, 21):
+        tracker.record(ms / 1000)
+    summary = tracker.summary()
+    assert summary['count'] == 20
+    assert summary['max_ms'] == 20.0
+    assert summary['avg_ms'] == 15.5  # Only the last 10 samples
+
+
+def test_collect_batch_stops_at_size():
+    source = Queue()
+    for i in range(6):
+        source.put(i)
+    assert collect_batch(source, max_size=4, max_wait=1.0) == [0, 1, 2, 3]
+    assert collect_batch(source, max_size=4, max_wait=0.05) == [4, 5]
+    assert collect_batch(source, max_size=4, max_wait=0.05, poll=0.01) == []
+
+
+def test_collect_batch_waits_for_stragglers_until_deadline():
+    source = Queue()
+    source.put('first')
+    threading.Timer(0.05, source.put, args=('second',)).start()
+    start = time.monotonic()
+    batch = collect_batch(source, max_size=4, max_wait=0.3)
+    assert batch == ['first', 'second']
+    assert 0.25 < time.monotonic() - start < 0.6
+
+
+def test_join_queue_gives_up_at_deadline():
+    source = Queue()
+    source.put('stuck')
+    start = time.monotonic()
+    assert not join_queue(source, 0.1)
+    assert time.monotonic() - start < 0.3
+    source.get()
+    source.task_done()
+    assert join_queue(source, 0.1)
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ Tests with images from gemini/test directory.
 import requests
 import os
 import sys
+import time
 from pathlib import Path
 
 # Configuration
@@ -35,8 +36,21 @@ def test_analyze_frame(image_path: str):
         # Check response status
         print(f"Status Code: {response.status_code}")
 
-        if response.status_code == 200:
+        result, error = None, response.text
+        if response.status_code == 202:
+            # Analysis runs as a background job - poll it
+            job_id = response.json()['job_id']
+            print(f"Job queued: {job_id}")
+            job = wait_for_job(job_id)
+            print(f"Job status: {job.get('status')}")
+            if job.get('status') == 'done':
+                result = job['result']
+            else:
+                error = job.get('error')
+        elif response.status_code == 200:
             result = response.json()
+
+        if result is not None:
             print("\n[OK] SUCCESS")
             print(f"\nEvent ID: {result.get('event_id')}")
             print(f"Timestamp: {result.get('timestamp')}")
@@ -53,7 +67,7 @@ def test_analyze_frame(image_path: str):
             print("   (Check the events table for the image_url)")
         else:
             print("\n[ERROR] ERROR")
-            print(f"Response: {response.text}")
+            print(f"Response: {error}")
 
     except requests.exceptions.ConnectionError:
         print(f"[ERROR] ERROR: Could not connect to {API_BASE_URL}")
@@ -65,6 +79,16 @@ def test_analyze_frame(image_path: str):
     except Exception as e:
         print(f"[ERROR] ERROR: {str(e)}")
 
+def wait_for_job(job_id: str, timeout: float = 60.0):
+    """Poll GET /jobs/{job_id} until the job has finished."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"{API_BASE_URL}/jobs/{job_id}").json()
+        if job.get('status') in ('done', 'failed'):
+            return job
+        time.sleep(0.5)
+    return {'status': 'timeout', 'error': f'Job not finished after {timeout:.0f}s'}
+
 def test_health():
     """Test the health endpoint to ensure server is running."""
     endpoint = f"{API_BASE_URL}/health"
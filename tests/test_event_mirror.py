@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Tests for the local event mirror (web/event_mirror.py).
+
+Run with: python tests/test_event_mirror.py  (or pytest)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web'))
+from event_mirror import EventMirror, sync_loop, encode_cursor, decode_cursor
+
+
+def event(event_id, timestamp, event_type='person_detected'):
+    return {'id': event_id, 'timestamp': timestamp, 'event_type': event_type,
+            'description': f'event {event_id}', 'severity': 'info', 'image_url': None}
+
+
+def test_list_newest_first_and_filter():
+    mirror = EventMirror(':memory:')
+    mirror.upsert([event(1, '2026-01-01T00:00:01'), event(2, '2026-01-01T00:00:03', 'vision_analysis'),
+                   event(3, '2026-01-01T00:00:02')])
+    assert [row['id'] for row in mirror.list_events(limit=10)] == [2, 3, 1]
+    assert [row['id'] for row in mirror.list_events(limit=10, event_type='person_detected')] == [3, 1]
+    assert [row['id'] for row in mirror.list_events(limit=1)] == [2]
+    assert mirror.list_events(limit=1)[0]['description'] == 'event 2'
+
+
+def test_keyset_paging_walks_all_rows_once():
+    mirror = EventMirror(':memory:')
+    # Duplicate timestamps: the ID breaks ties
+    mirror.upsert([event(i, f'2026-01-01T00:00:{i // 3:02d}') for i in range(1, 11)])
+    seen, before = [], None
+    while True:
+        page = mirror.list_events(limit=3, before=before)
+        seen.extend(row['id'] for row in page)
+        if len(page) < 3:
+            break
+        before = decode_cursor(encode_cursor(page[-1]))
+    assert seen == [row['id'] for row in mirror.list_events(limit=100)]
+    assert sorted(seen) == list(range(1, 11))
+
+
+def test_deltas_oldest_first():
+    mirror = EventMirror(':memory:')
+    mirror.upsert([event(i, f'2026-01-01T00:00:{i:02d}') for i in range(1, 6)])
+    assert [row['id'] for row in mirror.list_events(limit=10, after_id=2)] == [3, 4, 5]
+    assert [row['id'] for row in mirror.list_events(limit=2, after_id=2)] == [3, 4]
+    assert [row['id'] for row in mirror.list_events(limit=10, since='2026-01-01T00:00:03')] == [4, 5]
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor({'timestamp': '2026-01-01T00:00:01+00:00', 'id': 7})) == \
+        ('2026-01-01T00:00:01+00:00', 7)
+    try:
+        decode_cursor('not-a-cursor')
+        assert False, "Expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_upsert_and_refresh_report_changes():
+    mirror = EventMirror(':memory:')
+    assert [row['id'] for row in mirror.upsert([event(1, 't1'), event(2, 't2')])] == [1, 2]
+    assert [row['id'] for row in mirror.upsert([event(2, 't2'), event(3, 't3')])] == [3]
+    added, removed = mirror.replace_all([event(1, 't1'), event(3, 't3'), event(4, 't4')])
+    assert [row['id'] for row in added] == [4]
+    assert removed == [2]
+
+
+def test_trim_keeps_newest_and_delete_invalidates():
+    mirror = EventMirror(':memory:', max_rows=3)
+    mirror.upsert([event(i, f'2026-01-01T00:00:{i:02d}') for i in range(1, 6)])
+    assert mirror.count() == 3
+    assert [row['id'] for row in mirror.list_events(limit=10)] == [5, 4, 3]
+    version = mirror.version
+    mirror.delete(4)
+    assert [row['id'] for row in mirror.list_events(limit=10)] == [5, 3]
+    assert mirror.version > version
+
+
+def test_persisted_copy_served_after_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'mirror.db')
+        mirror = EventMirror(path)
+        assert not mirror.ready
+        mirror.upsert([event(1, '2026-01-01T00:00:01')])
+        mirror.close()
+
+        reopened = EventMirror(path)
+        assert reopened.ready and not reopened.filled
+        assert [row['id'] for row in reopened.list_events()] == [1]
+        reopened.close()
+
+
+def test_sync_fills_then_pulls_incrementally():
+    upstream = [event(1, '2026-01-01T00:00:01'), event(2, '2026-01-01T00:00:02')]
+    calls = []
+
+    async def fetch_latest(limit):
+        calls.append('full')
+        return sorted(upstream, key=lambda row: row['timestamp'], reverse=True)[:limit]
+
+    async def fetch_after(after_id, limit):
+        calls.append(('after', after_id))
+        return [row for row in upstream if row['id'] > after_id][:limit]
+
+    async def run(mirror):
+        task = asyncio.create_task(sync_loop(mirror, fetch_latest, fetch_after, interval=0.01, full_interval=60))
+        await asyncio.sleep(0.05)
+        upstream.append(event(3, '2026-01-01T00:00:00'))  # Older timestamp, higher ID (replayed snapshot)
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    mirror = EventMirror(':memory:')
+    asyncio.run(run(mirror))
+    assert calls[0] == 'full' and calls.count('full') == 1
+    assert ('after', 2) in calls
+    assert mirror.filled and mirror.ready
+    assert [row['id'] for row in mirror.list_events()] == [2, 1, 3]
+
+
+def test_sync_pulls_rows_below_an_api_inserted_id():
+    upstream = [event(1, '2026-01-01T00:00:01')]
+    pushed = []
+
+    async def fetch_latest(limit):
+        return list(upstream)
+
+    async def fetch_after(after_id, limit):
+        return [row for row in upstream if row['id'] > after_id][:limit]
+
+    def on_change(added, removed):
+        pushed.extend(row['id'] for row in added)
+
+    async def run(mirror):
+        task = asyncio.create_task(sync_loop(mirror, fetch_latest, fetch_after, interval=0.01, full_interval=60,
+                                             on_change=on_change))
+        await asyncio.sleep(0.03)
+        # Sentry batch gets ID 2, an API insert gets ID 3 and is mirrored before the next sync
+        upstream.extend([event(2, '2026-01-01T00:00:02'), event(3, '2026-01-01T00:00:03')])
+        mirror.upsert([upstream[-1]])
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    mirror = EventMirror(':memory:')
+    asyncio.run(run(mirror))
+    assert [row['id'] for row in mirror.list_events()] == [3, 2, 1]
+    assert pushed == [2]  # Row 3 was pushed by the API insert itself
+
+
+def test_sync_failure_keeps_cached_events():
+    async def failing(*args):
+        raise ConnectionError('upstream down')
+
+    async def run(mirror):
+        task = asyncio.create_task(sync_loop(mirror, failing, failing, interval=0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    mirror = EventMirror(':memory:')
+    mirror.upsert([event(1, '2026-01-01T00:00:01')])
+    asyncio.run(run(mirror))
+    assert mirror.stats['sync_errors'] >= 1
+    assert [row['id'] for row in mirror.list_events()] == [1]
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
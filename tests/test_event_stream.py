@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the server push channel (web/event_stream.py).
+
+Run with: python tests/test_event_stream.py  (or pytest)
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web'))
+from event_stream import Broadcaster, stats_loop
+
+
+def parse(chunk):
+    lines = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+    return lines['event'], json.loads(lines['data'])
+
+
+def test_messages_in_order_with_coalesced_status_last():
+    async def run():
+        broadcaster = Broadcaster()
+        subscriber = broadcaster.subscribe()
+        broadcaster.publish('status', {'fps': 10}, coalesce=True)
+        broadcaster.publish('event', {'id': 1})
+        broadcaster.publish('status', {'fps': 20}, coalesce=True)
+        broadcaster.publish('delete', {'id': 1})
+        return list(subscriber.drain())
+
+    assert asyncio.run(run()) == [('event', {'id': 1}), ('delete', {'id': 1}), ('status', {'fps': 20})]
+
+
+def test_new_subscriber_gets_latest_status():
+    async def run():
+        broadcaster = Broadcaster()
+        broadcaster.publish('status', {'fps': 10}, coalesce=True)
+        broadcaster.publish('event', {'id': 1})  # Not replayed
+        return list(broadcaster.subscribe().drain())
+
+    assert asyncio.run(run()) == [('status', {'fps': 10})]
+
+
+def test_slow_subscriber_is_told_to_resync():
+    async def run():
+        broadcaster = Broadcaster(max_backlog=3)
+        subscriber = broadcaster.subscribe()
+        for i in range(10):
+            broadcaster.publish('event', {'id': i})
+        return list(subscriber.drain())
+
+    messages = asyncio.run(run())
+    assert messages[0] == ('resync', {})
+    assert len(messages) <= 4
+
+
+def test_stream_yields_sse_and_unsubscribes():
+    async def run():
+        broadcaster = Broadcaster()
+        body = broadcaster.stream(broadcaster.subscribe(), heartbeat=0.01)
+        assert (await body.__anext__()).startswith('retry:')
+        assert await body.__anext__() == ': keep-alive\n\n'
+        broadcaster.publish('event', {'id': 7})
+        chunk = await body.__anext__()
+        await body.aclose()
+        return chunk, len(broadcaster.subscribers)
+
+    chunk, remaining = asyncio.run(run())
+    assert parse(chunk) == ('event', {'id': 7})
+    assert remaining == 0
+
+
+def test_stats_loop_only_publishes_changes_while_subscribed():
+    samples = []
+
+    async def payload():
+        samples.append(1)
+        return {'running': len(samples) < 3}  # Changes once
+
+    async def run():
+        broadcaster = Broadcaster()
+        task = asyncio.create_task(stats_loop(broadcaster, payload, interval=0.01))
+        await asyncio.sleep(0.05)
+        idle_samples = len(samples)
+        subscriber = broadcaster.subscribe()
+        await asyncio.sleep(0.1)
+        task.cancel()
+        return idle_samples, broadcaster.published, list(subscriber.drain())
+
+    idle_samples, published, messages = asyncio.run(run())
+    assert idle_samples == 0
+    assert published == 2
+    assert messages == [('status', {'running': False})]
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
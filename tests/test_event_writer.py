@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for write-behind event inserts (sentry/event_writer.py and web/async_event_writer.py).
+
+Run with: python tests/test_event_writer.py  (or pytest)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web'))
+from async_event_writer import AsyncEventWriter
+from event_writer import EventWriter
+
+
+class FlakyTable:
+    """Records insert batches; the first `failures` inserts raise."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def insert(self, rows):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("upstream unavailable")
+            start = sum(len(b) for b in self.batches)
+            self.batches.append(list(rows))
+            return [dict(row, id=start + i + 1) for i, row in enumerate(rows)]
+
+    async def insert_async(self, rows):
+        return self.insert(rows)
+
+
+def test_events_are_batched():
+    table = FlakyTable()
+    writer = EventWriter(table.insert, max_batch=10, max_delay=0.2)
+    futures = [writer.submit({'n': i}) for i in range(25)]
+    assert writer.flush(timeout=5.0)
+    assert [f.result()['id'] for f in futures] == list(range(1, 26))
+    assert len(table.batches) == 3
+    assert writer.get_stats()['written'] == 25
+    writer.close()
+
+
+def test_failed_batches_are_retried():
+    table = FlakyTable(failures=2)
+    writer = EventWriter(table.insert, max_batch=10, max_delay=0.05, backoff=0.01)
+    future = writer.submit({'n': 1})
+    assert future.result(timeout=5.0)['id'] == 1
+    assert writer.get_stats()['retries'] == 2
+    writer.close()
+
+
+def test_exhausted_retries_fail_the_futures():
+    table = FlakyTable(failures=100)
+    writer = EventWriter(table.insert, max_batch=10, max_delay=0.05, max_retries=1, backoff=0.01)
+    future = writer.submit({'n': 1})
+    assert isinstance(future.exception(timeout=5.0), ConnectionError)
+    assert writer.get_stats()['failed'] == 1
+    writer.close()
+
+
+def test_bad_row_only_fails_itself():
+    table = FlakyTable()
+
+    def insert(rows):
+        if any(row['n'] == 5 for row in rows):
+            raise ValueError("invalid input syntax")
+        return table.insert(rows)
+
+    writer = EventWriter(insert, max_batch=10, max_delay=0.2, max_retries=1, backoff=0.01)
+    futures = [writer.submit({'n': i}) for i in range(8)]
+    assert writer.flush(timeout=5.0)
+    assert isinstance(futures[5].exception(), ValueError)
+    assert all(f.result()['n'] == i for i, f in enumerate(futures) if i != 5)
+    stats = writer.get_stats()
+    assert stats['failed'] == 1 and stats['written'] == 7
+    writer.close()
+
+
+def test_outage_stops_splitting():
+    table = FlakyTable(failures=100)
+    writer = EventWriter(table.insert, max_batch=16, max_delay=0.2, max_retries=1, backoff=0.01)
+    futures = [writer.submit({'n': i}) for i in range(16)]
+    assert writer.flush(timeout=5.0)
+    assert all(isinstance(f.exception(), ConnectionError) for f in futures)
+    assert 100 - table.failures == 2 + 2  # Two attempts, then one split whose halves both fail
+    writer.close()
+
+
+def test_close_flushes_pending_events():
+    table = FlakyTable()
+    writer = EventWriter(table.insert, max_batch=100, max_delay=0.3)
+    futures = [writer.submit({'n': i}) for i in range(5)]
+    assert writer.close(timeout=2.0)
+    assert all(f.done() and f.result()['id'] for f in futures)
+    assert len(table.batches) == 1
+
+
+def test_async_writer_batches_concurrent_requests():
+    table = FlakyTable(failures=1)
+
+    async def run():
+        writer = AsyncEventWriter(table.insert_async, max_batch=50, max_delay=0.05, backoff=0.01)
+        writer.start()
+        rows = await asyncio.gather(*(writer.submit({'n': i}) for i in range(20)))
+        await writer.close()
+        return rows, writer.get_stats()
+
+    rows, stats = asyncio.run(run())
+    assert [row['id'] for row in rows] == list(range(1, 21))
+    assert len(table.batches) == 1
+    assert stats['retries'] == 1 and stats['written'] == 20
+
+
+class ClientError(Exception):
+    status = 400
+
+
+def test_async_writer_sends_uniform_columns():
+    batches = []
+
+    async def insert(rows):
+        batches.append(rows)
+        if len({tuple(sorted(row)) for row in rows}) > 1:
+            raise ClientError("All object keys must match")
+        return [dict(row, id=i + 1) for i, row in enumerate(rows)]
+
+    async def run():
+        writer = AsyncEventWriter(insert, max_batch=10, max_delay=0.05, backoff=0.01)
+        writer.start()
+        rows = await asyncio.gather(writer.submit({'n': 1}), writer.submit({'n': 2, 'image_url': 'x'}))
+        await writer.close()
+        return rows
+
+    rows = asyncio.run(run())
+    assert len(batches) == 1
+    assert rows[0]['image_url'] is None and rows[1]['image_url'] == 'x'
+
+
+def test_async_writer_isolates_rejected_row_without_retrying():
+    attempts = []
+
+    async def insert(rows):
+        attempts.append(len(rows))
+        if any(row['n'] == 3 for row in rows):
+            raise ClientError("invalid input syntax")
+        return [dict(row, id=row['n']) for row in rows]
+
+    async def run():
+        writer = AsyncEventWriter(insert, max_batch=10, max_delay=0.05, backoff=0.01)
+        writer.start()
+        results = await asyncio.gather(*(writer.submit({'n': i}) for i in range(6)), return_exceptions=True)
+        await writer.close()
+        return results, writer.get_stats()
+
+    results, stats = asyncio.run(run())
+    assert isinstance(results[3], ClientError)
+    assert [row['id'] for i, row in enumerate(results) if i != 3] == [0, 1, 2, 4, 5]
+    assert stats['retries'] == 0 and stats['failed'] == 1
+    assert attempts[0] == 6
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the /analyze-frame job queue (web/frame_jobs.py).
+
+Run with: python tests/test_frame_jobs.py  (or pytest)
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web'))
+from frame_jobs import FrameJobQueue, map_bounded
+
+
+def test_jobs_run_concurrently_and_report_results():
+    finished = []
+
+    async def process(payload):
+        await asyncio.sleep(0.05)
+        if payload == 'bad':
+            raise ValueError('analysis failed')
+        return {'echo': payload}
+
+    async def run():
+        jobs = FrameJobQueue(process, workers=4, on_finish=finished.append)
+        jobs.start()
+        submitted = [jobs.submit(payload) for payload in ('a', 'b', 'c', 'bad')]
+        assert all(job['status'] == 'queued' for job in submitted)
+        start = asyncio.get_running_loop().time()
+        results = [await jobs.wait(job['id'], timeout=1) for job in submitted]
+        elapsed = asyncio.get_running_loop().time() - start
+        await jobs.close()
+        return results, elapsed, jobs.get_stats()
+
+    results, elapsed, stats = asyncio.run(run())
+    assert [job['status'] for job in results] == ['done', 'done', 'done', 'failed']
+    assert results[0]['result'] == {'echo': 'a'}
+    assert 'analysis failed' in results[3]['error']
+    assert elapsed < 0.15  # Four 50 ms jobs on four workers
+    assert len(finished) == 4
+    assert stats['done'] == 3 and stats['failed'] == 1
+
+
+def test_full_queue_rejects():
+    async def process(payload):
+        await asyncio.sleep(1)
+
+    async def run():
+        jobs = FrameJobQueue(process, workers=1, max_queued=2)
+        jobs.start()
+        jobs.submit(1)
+        jobs.submit(2)
+        try:
+            jobs.submit(3)
+            rejected = False
+        except asyncio.QueueFull:
+            rejected = True
+        for task in jobs.tasks:
+            task.cancel()
+        return rejected, jobs.get_stats()
+
+    rejected, stats = asyncio.run(run())
+    assert rejected
+    assert stats['rejected'] == 1
+
+
+def test_finished_jobs_expire_beyond_limit():
+    async def process(payload):
+        return payload
+
+    async def run():
+        jobs = FrameJobQueue(process, workers=2, max_finished=3)
+        jobs.start()
+        ids = []
+        for i in range(6):
+            job = jobs.submit(i)
+            ids.append(job['id'])
+            await jobs.wait(job['id'], timeout=1)
+        await jobs.close()
+        return jobs, ids
+
+    jobs, ids = asyncio.run(run())
+    assert jobs.get(ids[0]) is None
+    assert jobs.get(ids[-1])['result'] == 5
+    assert len(jobs.jobs) <= 4  # max_finished plus the newest one
+
+
+def test_map_bounded_limits_parallelism_and_yields_as_completed():
+    active, peak = [0], [0]
+
+    async def process(delay):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(delay)
+        active[0] -= 1
+        if delay == 0.02:
+            raise ValueError('bad frame')
+        return delay
+
+    async def run():
+        return [item async for item in map_bounded(process, [0.08, 0.01, 0.02, 0.01, 0.01], concurrency=2)]
+
+    results = asyncio.run(run())
+    assert peak[0] == 2
+    assert sorted(index for index, _, _ in results) == [0, 1, 2, 3, 4]
+    assert results[0][0] == 1  # Short frames finish before the slow first one
+    assert results[-1][0] == 0
+    failed = [item for item in results if item[2]]
+    assert failed == [(2, None, 'bad frame')]
+
+
+def test_map_bounded_cancels_remaining_work_when_closed():
+    started = []
+
+    async def process(payload):
+        started.append(payload)
+        await asyncio.sleep(0.05)
+        return payload
+
+    async def run():
+        results = map_bounded(process, list(range(10)), concurrency=2)
+        first = await results.__anext__()
+        await results.aclose()
+        await asyncio.sleep(0.2)
+        return first
+
+    assert asyncio.run(run())[2] is None
+    assert len(started) <= 4
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for best-frame snapshot selection (sharpness, size, face, truncation scoring).
+
+Run with: python tests/test_frame_selector.py  (or pytest)
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from frame_selector import BestFrameSelector, score_frame, truncated_edges
+
+BBOX = [250, 100, 390, 400]
+
+
+def make_frame(blur=0, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = np.full((480, 640, 3), 90, dtype=np.uint8)
+    # Textured "person" region
+    x1, y1, x2, y2 = BBOX
+    frame[y1:y2, x1:x2] = rng.integers(0, 255, (y2 - y1, x2 - x1, 3), dtype=np.uint8)
+    if blur:
+        frame = cv2.GaussianBlur(frame, (blur, blur), 0)
+    return frame
+
+
+def test_sharp_frame_scores_higher_than_blurred():
+    sharp, _ = score_frame(make_frame(), BBOX)
+    blurred, _ = score_frame(make_frame(blur=15), BBOX)
+    assert sharp > blurred
+
+
+def test_truncated_and_small_boxes_penalized():
+    frame = make_frame()
+    assert truncated_edges([0, 100, 100, 480], 640, 480) == 2
+    full, _ = score_frame(frame, BBOX)
+    cut, _ = score_frame(frame, [0, 100, 140, 480])
+    small, _ = score_frame(frame, [300, 200, 330, 260])
+    assert full > cut
+    assert full > small
+
+
+def test_selector_sends_best_frame_once_window_closes():
+    selector = BestFrameSelector(window=1.0, top_k=2)
+    selector.open(7, 'new_person', now=0.0)
+    selector.add(7, make_frame(blur=21), BBOX, now=0.0, timestamp='blurry')
+    selector.add(7, make_frame(), BBOX, now=0.3, timestamp='sharp')
+    selector.add(7, make_frame(blur=9), BBOX, now=0.6, timestamp='soft')
+
+    assert selector.pop_ready(now=0.7) == []
+    ready = selector.pop_ready(now=1.1)
+    assert len(ready) == 1
+    track_id, reason, winner = ready[0]
+    assert (track_id, reason, winner['timestamp']) == (7, 'new_person', 'sharp')
+    assert winner['frames_scored'] == 3
+    assert len(selector.windows) == 0
+    stats = selector.get_stats()
+    assert stats['selections'] == 1 and stats['avg_winner_score'] > stats['avg_first_frame_score']
+
+
+def test_crop_is_copied_and_relative():
+    selector = BestFrameSelector(window=1.0, crop_padding=0.25)
+    frame = make_frame()
+    selector.open(1, 'periodic', now=0.0)
+    selector.add(1, frame, BBOX, now=0.0)
+    frame[:] = 0  # Frame gets drawn on after selection
+    _, _, winner = selector.pop_ready(now=2.0)[0]
+    assert winner['crop'].any()
+    x1, y1, x2, y2 = winner['bbox']
+    assert (x2 - x1, y2 - y1) == (BBOX[2] - BBOX[0], BBOX[3] - BBOX[1])
+    assert winner['frame_bbox'] == BBOX
+
+
+def test_lost_track_closes_window_early():
+    selector = BestFrameSelector(window=5.0)
+    selector.open(3, 'new_person', now=0.0)
+    selector.add(3, make_frame(), BBOX, now=0.0)
+    assert selector.pop_ready(now=0.5, lost_timeout=1.0) == []
+    assert len(selector.pop_ready(now=1.5, lost_timeout=1.0)) == 1
+
+
+def test_face_detector_skipped_when_frame_cannot_win():
+    calls = []
+
+    def face_detector(frame, bbox):
+        calls.append(bbox)
+        return True
+
+    selector = BestFrameSelector(window=1.0, top_k=1, face_detector=face_detector)
+    selector.open(1, 'new_person', now=0.0)
+    selector.add(1, make_frame(), BBOX, now=0.0)
+    # Tiny, blurred, truncated box - can't beat the kept candidate even with a face
+    selector.add(1, make_frame(blur=31), [0, 0, 20, 20], now=0.1)
+    assert len(calls) == 1
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-image batched Gemini requests, against a stubbed model
+(no API calls are made; the google-generativeai package must be installed).
+
+Run with: python -m pytest tests/test_gemini_batch.py
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("PIL")
+pytest.importorskip("dotenv")
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'gemini'))
+from gemini_description import analyze_security_images_data, parse_batch_response
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Records requests and answers batched/single prompts from canned text."""
+
+    def __init__(self, batch_text=None, fail_batch=False):
+        self.batch_text = batch_text
+        self.fail_batch = fail_batch
+        self.requests = []
+
+    def generate_content(self, contents):
+        self.requests.append(contents)
+        image_count = sum(1 for part in contents if isinstance(part, dict))
+        if image_count > 1:
+            if self.fail_batch:
+                raise RuntimeError("quota exceeded")
+            return StubResponse(self.batch_text)
+        return StubResponse("DESCRIPTION: Single image\nSEVERITY: warning")
+
+
+IMAGES = [b'jpeg-1', b'jpeg-2', b'jpeg-3']
+BATCH_TEXT = """IMAGE 1
+DESCRIPTION: A person walking past the door.
+SEVERITY: info
+
+**IMAGE 2:**
+DESCRIPTION: Someone trying the door handle.
+SEVERITY: Warning
+
+IMAGE 3
+DESCRIPTION: A person climbing the fence.
+SEVERITY: critical"""
+
+
+def test_parse_batch_response():
+    parsed = parse_batch_response(BATCH_TEXT, 3)
+    assert parsed == [("A person walking past the door.", "info"),
+                      ("Someone trying the door handle.", "warning"),
+                      ("A person climbing the fence.", "critical")]
+    assert parse_batch_response(BATCH_TEXT, 4) is None
+
+
+def test_one_request_for_the_batch():
+    model = StubModel(batch_text=BATCH_TEXT)
+    results = analyze_security_images_data(IMAGES, image_names=['a', 'b', 'c'], gemini_model=model)
+    assert len(model.requests) == 1
+    assert [r['image'] for r in results] == ['a', 'b', 'c']
+    assert [r['severity'] for r in results] == ['info', 'warning', 'critical']
+    assert all(r['status'] == 'success' and r['batch_size'] == 3 for r in results)
+
+
+def test_falls_back_to_single_requests_when_parsing_fails():
+    model = StubModel(batch_text="IMAGE 1\nDESCRIPTION: Only one answer\nSEVERITY: info")
+    results = analyze_security_images_data(IMAGES, gemini_model=model)
+    assert len(model.requests) == 1 + len(IMAGES)
+    assert [r['analysis'] for r in results] == ["Single image"] * 3
+    assert 'batch_size' not in results[0]
+
+
+def test_falls_back_when_batched_request_errors():
+    model = StubModel(fail_batch=True)
+    results = analyze_security_images_data(IMAGES, gemini_model=model)
+    assert len(results) == 3 and all(r['status'] == 'success' for r in results)
+
+
+def test_fallback_requests_go_through_before_request():
+    model = StubModel(fail_batch=True)
+    allowed = [True, False, True]
+    calls = []
+
+    def before_request():
+        calls.append(len(model.requests))
+        return allowed[len(calls) - 1]
+
+    results = analyze_security_images_data(IMAGES, gemini_model=model, before_request=before_request)
+    assert calls == [1, 2, 2]  # Once per fallback request, after the failed batch
+    assert len(model.requests) == 1 + 2
+    assert [r['status'] for r in results] == ['success', 'error', 'success']
+
+
+def test_single_image_uses_single_prompt():
+    model = StubModel()
+    results = analyze_security_images_data([b'jpeg'], gemini_model=model)
+    assert len(model.requests) == 1 and results[0]['severity'] == 'warning'
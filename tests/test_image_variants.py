@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for snapshot image variants (sentry/image_variants.py).
+
+Run with: python tests/test_image_variants.py  (or pytest)
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from image_variants import IMAGE_VARIANTS, VariantWorker, make_variants, variant_path, variant_urls
+
+
+def jpeg(width, height):
+    image = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode('.jpg', image)[1].tobytes()
+
+
+def test_variant_urls_follow_image_url():
+    url = 'https://project.supabase.co/storage/v1/object/public/security-frames/frame_1.jpg'
+    urls = variant_urls(url)
+    assert urls['full'] == url
+    assert urls['thumbnail'] == ('https://project.supabase.co/storage/v1/object/public/security-frames/'
+                                 'variants/thumbnail/frame_1.jpg')
+    assert urls['medium'].endswith('/security-frames/variants/medium/frame_1.jpg')
+    assert variant_urls(None) is None
+
+
+def test_make_variants_caps_longest_side():
+    variants = make_variants(jpeg(1280, 720))
+    assert set(variants) == set(IMAGE_VARIANTS)
+    for name, data in variants.items():
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert max(image.shape[:2]) == IMAGE_VARIANTS[name][0]
+    assert len(variants['thumbnail']) < len(variants['medium'])
+
+
+def test_small_images_are_not_upscaled_and_garbage_is_skipped():
+    image = cv2.imdecode(np.frombuffer(make_variants(jpeg(100, 80))['medium'], dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape[:2] == (80, 100)
+    assert make_variants(b'not an image') == {}
+
+
+def test_worker_uploads_variants_and_bounds_backlog():
+    uploaded = {}
+
+    def upload(path, data, content_type):
+        uploaded[path] = (data, content_type)
+
+    worker = VariantWorker(upload, workers=2)
+    assert worker.submit('frame_1.jpg', jpeg(640, 480))
+    worker.close()
+    assert set(uploaded) == {variant_path('frame_1.jpg', name) for name in IMAGE_VARIANTS}
+    assert all(content_type == 'image/jpeg' for _, content_type in uploaded.values())
+    assert worker.get_stats()['images'] == 1
+
+    worker = VariantWorker(upload, workers=1, max_pending=0)
+    assert not worker.submit('frame_2.jpg', jpeg(64, 64))
+    assert worker.get_stats()['dropped'] == 1
+    worker.close()
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for the activity-weighted patrol planner (no hardware needed).
+
+Run with: python tests/test_patrol_planner.py  (or pytest)
+"""
+
+import json
+import math
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from patrol_planner import PatrolPlanner
+
+PAN_RANGE = (0, 180)
+TILT_RANGE = (60, 120)
+HOUR = 3600
+
+
+def make_planner(**kwargs):
+    return PatrolPlanner(PAN_RANGE, TILT_RANGE, hfov=60.0, vfov=45.0, **kwargs)
+
+
+def test_histogram_decays_by_half_life():
+    planner = make_planner(half_life=HOUR)
+    planner.last_decay = 0.0
+    planner.record_detection(40, 90, now=0.0)
+    planner.record_detection(40, 90, now=HOUR)
+    # First detection halved, second fresh
+    assert abs(planner.histogram.sum() - 1.5) < 1e-4
+
+
+def test_dwell_proportional_to_sqrt_probability():
+    planner = make_planner(min_dwell=0.0, max_dwell=100.0, prior=0.0)
+    planner.last_decay = 0.0
+    for _ in range(9):
+        planner.record_detection(30, 90, now=0.0)
+    planner.record_detection(150, 90, now=0.0)
+    plan = planner.replan(now=0.0)
+
+    first, last = plan[0], plan[-1]
+    assert first['probability'] > last['probability']
+    expected_ratio = math.sqrt(first['probability'] / last['probability'])
+    assert abs(first['dwell'] / last['dwell'] - expected_ratio) < 0.05
+
+
+def test_dwell_bounds_respected():
+    planner = make_planner(min_dwell=0.5, max_dwell=2.0)
+    planner.last_decay = 0.0
+    for _ in range(100):
+        planner.record_detection(30, 90, now=0.0)
+    for point in planner.replan(now=0.0):
+        assert 0.5 <= point['dwell'] <= 2.0
+
+
+def test_activity_weighting_reduces_expected_time_to_detect():
+    planner = make_planner()
+    uniform = planner.replan()
+    uniform_ettd = planner.expected_time_to_detect(uniform)
+
+    planner.last_decay = 0.0
+    for _ in range(50):
+        planner.record_detection(30, 95, now=0.0)
+    weighted = planner.replan(now=0.0)
+
+    # Uniform plan evaluated against the real (skewed) activity
+    probabilities = {p['pan']: p['probability'] for p in weighted}
+    uniform_vs_activity = [dict(p, probability=probabilities[p['pan']]) for p in uniform]
+    assert planner.expected_time_to_detect(weighted) < planner.expected_time_to_detect(uniform_vs_activity)
+    assert uniform_ettd > 0
+    # Busy column aims at the activity tilt
+    assert abs(weighted[0]['tilt'] - 97.5) < 1e-6
+
+
+def test_save_load_round_trip():
+    planner = make_planner()
+    planner.record_detection(100, 80)
+    planner.record_detection(100, 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'patrol.json')
+        planner.save(path)
+
+        restored = make_planner()
+        assert restored.load(path)
+        assert restored.total_recorded == 2
+        assert abs(restored.histogram.sum() - planner.histogram.sum()) < 1e-2
+
+        # Different grid -> rejected
+        other = PatrolPlanner(PAN_RANGE, TILT_RANGE, cell_size=10.0)
+        assert not other.load(path)
+
+        with open(path, 'w') as f:
+            json.dump({'histogram': 'garbage'}, f)
+        assert not make_planner().load(path)
+
+
+def test_next_setpoint_dwells_then_advances():
+    planner = make_planner(min_dwell=1.0, max_dwell=1.0)
+    planner.reset(current_pan=0)
+    first = planner.plan[0]
+
+    # Travelling - no dwell timer yet
+    assert planner.next_setpoint(90, 90, now=0.0) == (first['pan'], first['tilt'])
+    # Arrived, dwell not over
+    assert planner.next_setpoint(first['pan'], first['tilt'], now=1.0) == (first['pan'], first['tilt'])
+    assert planner.next_setpoint(first['pan'], first['tilt'], now=1.5) == (first['pan'], first['tilt'])
+    # Dwell over -> next point
+    pan, _ = planner.next_setpoint(first['pan'], first['tilt'], now=2.1)
+    assert pan == planner.plan[1]['pan']
+
+
+def test_sweep_reverses_at_ends():
+    planner = make_planner(min_dwell=0.0, max_dwell=0.0)
+    planner.reset(current_pan=180)
+    assert planner.index == len(planner.plan) - 1
+    visited = []
+    for _ in range(len(planner.plan) + 1):
+        planner._advance()
+        visited.append(planner.index)
+    assert visited[0] == 0 or visited[0] == len(planner.plan) - 2
+    assert min(visited) == 0
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Simulated closed-loop test for the latency-compensated PID tracking controller.
+Compares it against the old proportional-only _control_servos behaviour
+(no hardware needed).
+
+Run with: python tests/test_pid_controller.py  (or pytest)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from camera_model import CameraModel
+from pid_controller import AngleHistory, PIDController, PanTiltController
+from sentry_service import MAX_SERVO_STEP, SERVO_CONTROL_HZ
+
+# Simulation settings (mirror sentry_service.py defaults)
+CONTROL_DT = 1.0 / SERVO_CONTROL_HZ  # Servo control thread tick (MAX_SERVO_STEP degrees at most)
+FRAME_DT = 1.0 / 30         # Camera frame period
+DETECTION_SKIP_FRAMES = 3   # YOLO runs every 3rd frame
+INFERENCE_LATENCY = 0.06    # Capture -> detection available (seconds)
+CAMERA = CameraModel(640, 480, hfov=60.0, vfov=45.0)
+KP_LEGACY = 0.035
+PID_KP = 0.6                # PanTiltController default gain
+PAN_INVERT = -1
+SIM_DURATION = 4.0
+SETTLE_TOLERANCE = 1.0      # Degrees
+
+
+def simulate(use_pid, target_start=115.0, target_velocity=0.0, servo_start=90.0):
+    """
+    Run a single-axis (pan) closed loop.
+
+    Returns:
+        list of (time, target_angle, servo_angle)
+    """
+    servo = servo_start
+    setpoint = servo_start
+    history = AngleHistory(maxlen=500)
+    controller = PanTiltController(CAMERA, kp=PID_KP, max_speed=MAX_SERVO_STEP / CONTROL_DT)
+
+    pending = []            # (available_at, capture_time, target_x)
+    latest = None           # Most recent detection (reused on skipped frames)
+    next_frame = 0.0
+    frame_index = 0
+    trace = []
+
+    t = 0.0
+    while t < SIM_DURATION:
+        target = target_start + target_velocity * t
+
+        # Control thread tick (records the angle the head holds from t onwards)
+        servo += max(-MAX_SERVO_STEP, min(MAX_SERVO_STEP, setpoint - servo))
+        history.record(t, servo, 90.0)
+        trace.append((t, target, servo))
+
+        # Camera frame: YOLO every N frames, result available after inference latency
+        if t >= next_frame:
+            frame_index += 1
+            if frame_index % DETECTION_SKIP_FRAMES == 0:
+                target_x, _ = CAMERA.angle_to_pixel(target - servo, 0)
+                pending.append((t + INFERENCE_LATENCY, t, target_x))
+            while pending and pending[0][0] <= t:
+                latest = pending.pop(0)
+
+            # Vision loop runs every frame on the cached detection
+            if latest is not None:
+                _, capture_time, target_x = latest
+                if use_pid:
+                    at_capture = history.angle_at(capture_time)
+                    result = controller.update(target_x, CAMERA.cy, capture_time,
+                                               (at_capture[0], 90.0), (servo, 90.0), t)
+                    if result is not None:
+                        setpoint = result[0]
+                else:
+                    error_x = target_x - CAMERA.cx
+                    setpoint = servo + error_x * KP_LEGACY * PAN_INVERT
+            next_frame += FRAME_DT
+
+        t += CONTROL_DT
+
+    return trace
+
+
+def settling_time(trace, tolerance=SETTLE_TOLERANCE):
+    """Time after which |error| stays within tolerance (None if it never settles)."""
+    settled_at = None
+    for t, target, servo in trace:
+        if abs(target - servo) <= tolerance:
+            if settled_at is None:
+                settled_at = t
+        else:
+            settled_at = None
+    return settled_at
+
+
+def overshoot(trace):
+    """Largest excursion past the target, in degrees (step response)."""
+    start_sign = 1 if trace[0][1] > trace[0][2] else -1
+    return max(0.0, max((servo - target) * start_sign for _, target, servo in trace))
+
+
+def test_pid_step_response_beats_proportional():
+    pid = simulate(use_pid=True)
+    legacy = simulate(use_pid=False)
+
+    pid_settle = settling_time(pid)
+    legacy_settle = settling_time(legacy)
+
+    assert pid_settle is not None and pid_settle < 1.0
+    assert overshoot(pid) < 2.0
+    assert legacy_settle is None or pid_settle < legacy_settle
+    assert overshoot(pid) < overshoot(legacy)
+
+
+def test_pid_tracks_moving_target():
+    pid = simulate(use_pid=True, target_start=80.0, target_velocity=15.0)
+    # After acquisition the steady-state lag should stay small thanks to feed-forward
+    tail = [abs(target - servo) for t, target, servo in pid if t > 2.0]
+    assert max(tail) < 2.0
+
+
+def test_integral_held_while_rate_limited():
+    pid = PIDController(kp=0.6, ki=0.3, integral_limit=5.0)
+    pid.update(20.0, 0.1, max_step=9.0)  # Wants 12 degrees, the servo covers 9 by the next sample
+    assert pid.integral == 0.0
+    pid.update(5.0, 0.1, max_step=9.0)
+    assert abs(pid.integral - 0.5) < 1e-9
+
+
+def test_stale_measurement_ignored():
+    controller = PanTiltController(CAMERA)
+    assert controller.update(420, 240, 1.0, (90, 90), (90, 90), 1.05) is not None
+    assert controller.update(420, 240, 1.0, (90, 90), (95, 90), 1.08) is None
+
+
+def test_camera_model_round_trip_and_direction():
+    model = CameraModel(640, 480, hfov=60.0, vfov=45.0, pan_gain=0.9, tilt_gain=1.1)
+    x, y = model.angle_to_pixel(12.0, -7.0)
+    pan, tilt = model.pixel_to_angle(x, y)
+    assert abs(pan - 12.0) < 1e-6 and abs(tilt + 7.0) < 1e-6
+
+    # Target right of center -> pan decreases (PAN_INVERT = -1)
+    assert model.pixel_to_angle(600, 240)[0] < 0
+    # Frame edge is half the FOV away (ideal servo response)
+    assert abs(CAMERA.pixel_to_angle(640, 240)[0] + 30.0) < 1e-6
+
+
+def main():
+    print("=" * 60)
+    print("PID Controller Closed-Loop Simulation")
+    print("=" * 60)
+    for name, use_pid in (("Legacy P", False), ("PID + latency comp", True)):
+        trace = simulate(use_pid)
+        settle = settling_time(trace)
+        settle_str = f"{settle:.2f}s" if settle is not None else "never"
+        print(f"{name:20s} settling: {settle_str:>7s} | overshoot: {overshoot(trace):5.2f}deg")
+
+    for test in (test_pid_step_response_beats_proportional,
+                 test_pid_tracks_moving_target,
+                 test_integral_held_while_rate_limited,
+                 test_stale_measurement_ignored,
+                 test_camera_model_round_trip_and_direction):
+        try:
+            test()
+            print(f"[OK] {test.__name__}")
+        except AssertionError:
+            print(f"[FAIL] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
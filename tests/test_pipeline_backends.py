@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for the local pipeline backends and the pipeline load generator.
+
+Run with: python tests/test_pipeline_backends.py  (or pytest)
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from pipeline_backends import LocalEventStore, MockAnalyzer, WebhookAlertSink
+from pipeline_loadtest import WebhookReceiver, run_loadtest
+
+
+def test_mock_analyzer_results_match_gemini_shape():
+    analyzer = MockAnalyzer(latency=0.0, latency_sigma=0.0, per_image_latency=0.0, error_rate=0.0, seed=1)
+    results = analyzer.analyze([b'a', b'b', b'c'], image_names=['a.jpg', 'b.jpg', 'c.jpg'])
+    assert len(results) == 3
+    for result in results:
+        assert result['status'] == 'success'
+        assert result['severity'] in ('info', 'warning', 'critical')
+        assert result['analysis'] and result['timestamp'].endswith('Z')
+        assert result['batch_size'] == 3
+
+
+def test_mock_analyzer_error_rate():
+    analyzer = MockAnalyzer(latency=0.0, latency_sigma=0.0, per_image_latency=0.0, error_rate=0.3, seed=2)
+    failed = sum(analyzer.analyze([b'x'])[0]['status'] == 'error' for _ in range(500))
+    assert 100 < failed < 200
+    assert analyzer.get_stats()['errors'] == failed
+
+
+def test_local_event_store():
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalEventStore(directory)
+        url = store.upload_image('person_1.jpg', b'jpeg')
+        assert url.startswith('file://') and url.endswith('person_1.jpg')
+        event_id = store.insert_event({'event_type': 'person_detected', 'description': 'd',
+                                       'severity': 'info', 'timestamp': 't', 'image_url': url})
+        assert event_id == 1
+        assert store.count_events() == 1
+        store.close()
+
+
+def test_local_event_store_failures():
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalEventStore(directory, failure_rate=1.0)
+        try:
+            store.insert_event({'event_type': 'person_detected'})
+            assert False, "Expected a simulated outage"
+        except ConnectionError:
+            pass
+        assert store.get_stats()['failures'] == 1
+        store.close()
+
+
+def test_webhook_sink_posts_json():
+    receiver = WebhookReceiver()
+    sink = WebhookAlertSink(receiver.url)
+    sink.send('person_detected', 'desc', 'warning', 'file:///x.jpg')
+    receiver.close()
+    assert receiver.received == 1
+    assert sink.get_stats() == {'sent': 1, 'errors': 0}
+
+
+def test_loadtest_accounts_for_every_snapshot():
+    analyzer = MockAnalyzer(latency=0.005, latency_sigma=0.0, per_image_latency=0.0, error_rate=0.0, seed=3)
+    report = run_loadtest(count=200, rate=0, duplicate_rate=0.0, analyzer=analyzer, drain_timeout=20.0,
+                          overrides={'GEMINI_REQUESTS_PER_MINUTE': 60000, 'SNAPSHOT_BUDGET_PER_MINUTE': None})
+    assert report['drained']
+    dropped_on_arrival = report['dropped'].get('queue_full', 0) + report['dropped'].get('too_large', 0)
+    assert report['admitted'] + dropped_on_arrival == 200
+    evicted = report['dropped'].get('evicted', 0) + report['dropped'].get('superseded', 0)
+    assert report['published'] + report['failed'] == report['admitted'] - evicted
+    assert report['store']['events'] == report['published']
+    assert report['alerts']['sent'] == report['alerts']['received']
+
+
+def test_stuck_alert_does_not_hold_cleanup_past_the_drain_deadline():
+    import threading
+    import time
+    import sentry_service
+    from pipeline_backends import PipelineBackends
+    from pipeline_loadtest import StubCapture
+    from servo_output import FakePCA9685
+
+    release = threading.Event()
+
+    class StuckAlerts:
+        def send(self, **kwargs):
+            release.wait(30)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalEventStore(tmp)
+        sentry = sentry_service.SentryService(
+            capture=StubCapture(), detector=lambda frame: [], servo_bus=FakePCA9685(), analysis_enabled=True,
+            patrol_file=None, spool_dir=None, backends=PipelineBackends(MockAnalyzer(), store, StuckAlerts()))
+        deadline = time.monotonic() + 5.0
+        while sentry.alert_executor is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        event = {'event_type': 'person_detected', 'description': 'd', 'severity': 'warning', 'image_url': None}
+        sentry.alert_executor.submit(sentry._send_alert, event)
+        sentry.alert_executor.submit(sentry._send_alert, event)
+
+        drain_deadline = sentry_service.SNAPSHOT_DRAIN_DEADLINE
+        sentry_service.SNAPSHOT_DRAIN_DEADLINE = 0.3
+        try:
+            start = time.monotonic()
+            sentry.cleanup()
+            assert time.monotonic() - start < 2.0
+        finally:
+            sentry_service.SNAPSHOT_DRAIN_DEADLINE = drain_deadline
+            release.set()
+            store.close()
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned response cache behind the ETag support (web/response_cache.py).
+
+Run with: python tests/test_response_cache.py  (or pytest)
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web'))
+from response_cache import ResponseCache, make_etag, etag_matches
+
+
+def test_etag_matching():
+    etag = make_etag('events', 3, variant='limit=10')
+    assert etag.startswith('W/"events-')
+    assert etag != make_etag('events', 4, variant='limit=10')
+    assert etag != make_etag('events', 3, variant='limit=20')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'W/"other", {etag.removeprefix("W/")}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(etag, None)
+
+
+def test_body_reused_until_max_age_and_version_tracks_content():
+    calls = []
+    values = iter([{'fps': 30}, {'fps': 30}, {'fps': 25}])
+
+    async def compute():
+        calls.append(1)
+        return next(values)
+
+    async def run():
+        cache = ResponseCache()
+        first = await cache.get('status', compute, max_age=60)
+        cached = await cache.get('status', compute, max_age=60)
+        assert len(calls) == 1 and cached == first
+        assert cache.fresh_etag('status', 60) == first[1]
+        same = await cache.get('status', compute, max_age=0)  # Recomputed, unchanged body
+        changed = await cache.get('status', compute, max_age=0)
+        return first, same, changed
+
+    first, same, changed = asyncio.run(run())
+    assert same[1] == first[1]
+    assert changed[1] != first[1] and changed[0] == {'fps': 25}
+
+
+def test_bump_invalidates():
+    async def compute():
+        return {'running': True}
+
+    async def run():
+        cache = ResponseCache()
+        _, etag = await cache.get('status', compute, max_age=60)
+        cache.bump('status')
+        assert cache.fresh_etag('status', 60) is None
+        _, new_etag = await cache.get('status', compute, max_age=60)
+        return etag, new_etag
+
+    etag, new_etag = asyncio.run(run())
+    assert etag != new_etag
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
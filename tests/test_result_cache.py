@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the perceptual-hash Gemini result cache.
+
+Run with: python tests/test_result_cache.py  (or pytest)
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from result_cache import ResultCache, dhash, hamming
+
+RESULT = {'status': 'success', 'analysis': 'A person at the door', 'severity': 'info'}
+
+
+def make_image(seed=0):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 255, (120, 60, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(image, (9, 9), 0)
+
+
+def test_near_duplicates_have_close_hashes():
+    image = make_image()
+    noisy = np.clip(image.astype(int) + np.random.default_rng(1).integers(-4, 5, image.shape), 0, 255)
+    noisy = noisy.astype(np.uint8)
+    assert hamming(dhash(image), dhash(noisy)) <= 6
+    assert hamming(dhash(image), dhash(make_image(seed=5))) > 12
+
+
+def test_hit_requires_similar_image_and_pose():
+    cache = ResultCache(max_distance=6, max_angle=5.0)
+    image_hash = dhash(make_image())
+    cache.store(image_hash, RESULT, angles=(90.0, 90.0), now=0.0)
+
+    assert cache.lookup(image_hash ^ 0b111, angles=(92.0, 89.0), now=1.0) == RESULT
+    assert cache.lookup(image_hash, angles=(120.0, 90.0), now=1.0) is None
+    assert cache.lookup(dhash(make_image(seed=5)), angles=(90.0, 90.0), now=1.0) is None
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+    assert stats['hit_rate'] == round(1 / 3, 3)
+
+
+def test_ttl_expiry():
+    cache = ResultCache(ttl=10.0)
+    cache.store(123, RESULT, now=0.0)
+    assert cache.lookup(123, now=5.0) == RESULT
+    assert cache.lookup(123, now=11.0) is None
+    assert cache.get_stats()['expirations'] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ResultCache(max_entries=2, max_distance=0)
+    cache.store(1, {'analysis': 'one'}, now=0.0)
+    cache.store(2, {'analysis': 'two'}, now=0.0)
+    assert cache.lookup(1, now=1.0)['analysis'] == 'one'  # 1 is now most recently used
+    cache.store(3, {'analysis': 'three'}, now=2.0)
+    assert cache.lookup(2, now=3.0) is None
+    assert cache.lookup(1, now=3.0) is not None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
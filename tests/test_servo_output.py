@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the coalescing servo output layer against the in-memory FakePCA9685
+(no hardware needed).
+
+Run with: python tests/test_servo_output.py  (or pytest)
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from servo_output import FakePCA9685, ServoOutput
+
+
+def test_pan_and_tilt_batched_into_one_transaction():
+    bus = FakePCA9685()
+    output = ServoOutput(bus, max_rate_hz=0)
+
+    assert output.write(90, 90)
+    assert bus.transactions == 1
+    assert bus.log[0][0] == 2 and len(bus.log[0][1]) == 2
+
+
+def test_redundant_and_subcount_writes_dropped():
+    bus = FakePCA9685()
+    output = ServoOutput(bus, max_rate_hz=0)
+    pan = output.count_to_angle(output.angle_to_count(90))  # Exactly on a count
+    output.write(pan, 90)
+
+    # Same angle, and a change smaller than the hardware resolution
+    assert not output.write(pan, 90)
+    assert not output.write(pan + output.degrees_per_count * 0.3, 90)
+    assert bus.transactions == 1
+    assert output.stats['skipped_redundant'] == 2
+
+
+def test_single_axis_change_writes_one_channel():
+    bus = FakePCA9685()
+    output = ServoOutput(bus, max_rate_hz=0)
+    output.write(90, 90)
+    output.write(100, 90)
+
+    assert bus.transactions == 2
+    assert bus.log[-1] == (2, [output.angle_to_count(100)])
+
+
+def test_rate_limit_defers_and_flushes_latest():
+    bus = FakePCA9685()
+    output = ServoOutput(bus, max_rate_hz=20)
+    output.write(90, 90)
+
+    # Burst of small scan steps within one rate-limit interval
+    for i in range(1, 6):
+        output.write(90 + i * 0.8, 90)
+    assert bus.transactions == 1
+
+    time.sleep(output.min_interval)
+    assert output.flush()
+    assert bus.transactions == 2
+    assert bus.channels[2] == output.angle_to_count(94.0)
+
+
+def test_scan_sweep_traffic_reduced():
+    """100 Hz control ticks over a 0.8 deg/frame scan: far fewer transactions than requests."""
+    bus = FakePCA9685()
+    output = ServoOutput(bus)
+    pan = 90.0
+    for tick in range(100):
+        if tick % 3 == 0:
+            pan += 0.8
+        output.write(pan, 90)
+        time.sleep(0.01)
+
+    assert output.stats['requests'] == 100
+    assert bus.transactions <= 50
+
+
+def main():
+    print("=" * 60)
+    print("Servo Output Layer Test (FakePCA9685)")
+    print("=" * 60)
+    tests = [
+        test_pan_and_tilt_batched_into_one_transaction,
+        test_redundant_and_subcount_writes_dropped,
+        test_single_axis_change_writes_one_channel,
+        test_rate_limit_defers_and_flushes_latest,
+        test_scan_sweep_traffic_reduced,
+    ]
+    for test in tests:
+        try:
+            test()
+            print(f"[OK] {test.__name__}")
+        except AssertionError:
+            print(f"[FAIL] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
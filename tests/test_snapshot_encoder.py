@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for snapshot encoding profiles (crop, size cap, quality, thumbnail, stats).
+
+Run with: python tests/test_snapshot_encoder.py  (or pytest)
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from snapshot_encoder import SnapshotEncoder, crop_with_padding, limit_dimension
+
+
+def make_frame(width=640, height=480, seed=0):
+    """Textured frame (noise compresses poorly, like a real scene)."""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(frame, (5, 5), 0)
+
+
+def test_crop_with_padding_clips_to_frame():
+    frame = make_frame()
+    crop = crop_with_padding(frame, [100, 100, 200, 300], 0.25)
+    assert crop.shape[:2] == (300, 150)
+    edge = crop_with_padding(frame, [600, 400, 640, 480], 0.5)
+    assert edge.shape[:2] == (120, 60)
+
+
+def test_limit_dimension_never_upscales():
+    frame = make_frame()
+    assert limit_dimension(frame, 320).shape[:2] == (240, 320)
+    assert limit_dimension(frame, 1000) is frame
+
+
+def test_person_profile_smaller_than_full_frame():
+    frame = make_frame()
+    bbox = [250, 100, 350, 400]
+    full = SnapshotEncoder('full').encode(frame, bbox)
+    person = SnapshotEncoder('person').encode(frame, bbox)
+
+    assert (full['width'], full['height']) == (640, 480)
+    assert person['height'] <= 480 and person['width'] < 640
+    assert len(person['image_data']) < len(full['image_data']) / 2
+    decoded = cv2.imdecode(np.frombuffer(person['image_data'], np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape[:2] == (person['height'], person['width'])
+
+
+def test_thumbnail_and_stats():
+    encoder = SnapshotEncoder('person_context')
+    frame = make_frame()
+    for _ in range(3):
+        result = encoder.encode(frame, [250, 100, 350, 400])
+    thumbnail = cv2.imdecode(np.frombuffer(result['thumbnail_data'], np.uint8), cv2.IMREAD_COLOR)
+    assert max(thumbnail.shape[:2]) == 320
+
+    stats = encoder.get_stats()
+    assert stats['snapshots_encoded'] == 3
+    assert stats['thumbnail_bytes'] > 0
+    assert stats['total_bytes'] == 3 * (len(result['image_data']) + len(result['thumbnail_data']))
+    assert stats['compression_ratio'] > 1
+
+
+def test_unknown_profile_rejected():
+    try:
+        SnapshotEncoder('nope')
+    except ValueError:
+        return
+    assert False, "expected ValueError"
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
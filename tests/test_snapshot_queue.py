@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded, prioritized snapshot queue.
+
+Run with: python tests/test_snapshot_queue.py  (or pytest)
+"""
+
+import os
+import sys
+import threading
+import time
+from queue import Empty
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from snapshot_queue import SnapshotQueue
+
+
+def snapshot(track_id, reason='new_person', size=1000):
+    return {'track_id': track_id, 'reason': reason, 'image_data': b'x' * size, 'thumbnail_data': None}
+
+
+def test_new_people_served_before_periodic():
+    queue = SnapshotQueue()
+    queue.put(snapshot(1, 'periodic'))
+    queue.put(snapshot(2, 'new_person'))
+    queue.put(snapshot(3, 'periodic'))
+    queue.put(snapshot(4, 'first_sighting'))
+    order = [queue.get(timeout=0.1)['track_id'] for _ in range(4)]
+    assert order == [2, 4, 1, 3]
+
+
+def test_fairness_prefers_least_served_track():
+    queue = SnapshotQueue()
+    queue.put(snapshot(1, 'new_person'))
+    queue.get(timeout=0.1)  # Track 1 has had one analysis
+    queue.put(snapshot(1, 'periodic'))
+    queue.put(snapshot(2, 'periodic'))
+    assert queue.get(timeout=0.1)['track_id'] == 2
+
+
+def test_newer_periodic_supersedes_pending_one():
+    queue = SnapshotQueue()
+    first = snapshot(1, 'periodic')
+    second = snapshot(1, 'periodic')
+    queue.put(first)
+    queue.put(second)
+    assert queue.qsize() == 1
+    assert queue.get(timeout=0.1) is second
+    assert queue.get_stats()['dropped'] == {'superseded': 1}
+
+
+def test_bounded_by_items_and_bytes_with_priority_eviction():
+    queue = SnapshotQueue(max_items=2, max_bytes=10_000)
+    assert queue.put(snapshot(1, 'periodic'))
+    assert queue.put(snapshot(2, 'periodic'))
+    # Full: a new person evicts a periodic snapshot, another periodic one is rejected
+    assert queue.put(snapshot(3, 'new_person'))
+    assert not queue.put(snapshot(4, 'periodic'))
+    assert queue.qsize() == 2
+
+    assert not queue.put(snapshot(5, 'new_person', size=20_000))
+    assert queue.put(snapshot(6, 'new_person', size=9_000))  # Evicts the periodic one to fit the bytes
+    stats = queue.get_stats()
+    assert stats['queued'] == 2 and stats['queued_bytes'] == 10_000
+    assert stats['dropped'] == {'evicted': 2, 'queue_full': 1, 'too_large': 1}
+    assert not queue.put(snapshot(7, 'new_person'))  # Only equal-or-better entries left
+
+
+def test_budget_reserve_kept_for_new_people():
+    queue = SnapshotQueue(budget_per_minute=1, budget_burst=3, budget_reserve=1)
+    assert queue.put(snapshot(1, 'periodic'))
+    assert queue.put(snapshot(2, 'periodic'))
+    assert not queue.put(snapshot(3, 'periodic'))  # Last token is reserved
+    assert queue.put(snapshot(4, 'new_person'))
+    assert not queue.put(snapshot(5, 'new_person'))
+    assert queue.get_stats()['dropped'] == {'over_budget': 2}
+
+
+def test_get_timeout_and_join_deadline():
+    queue = SnapshotQueue()
+    start = time.monotonic()
+    try:
+        queue.get(timeout=0.05)
+        assert False, "expected Empty"
+    except Empty:
+        pass
+    assert time.monotonic() - start >= 0.05
+
+    queue.put(snapshot(1))
+    queue.put(snapshot(2))
+    assert not queue.join(timeout=0.05)
+    assert queue.discard_pending('shutdown') == 2
+    assert queue.join(timeout=0.05)
+    assert queue.get_stats()['dropped'] == {'shutdown': 2}
+
+
+def test_join_returns_when_workers_finish():
+    queue = SnapshotQueue()
+    queue.put(snapshot(1))
+
+    def worker():
+        queue.get(timeout=1.0)
+        time.sleep(0.05)
+        queue.task_done()
+
+    threading.Thread(target=worker).start()
+    assert queue.join(timeout=1.0)
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
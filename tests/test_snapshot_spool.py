@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable snapshot spool (recovery, torn tails, compaction, disk cap).
+
+Run with: python tests/test_snapshot_spool.py  (or pytest)
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from snapshot_queue import SnapshotQueue
+from snapshot_spool import SnapshotSpool
+
+
+def snapshot(spool, track_id, size=1000):
+    return {'spool_id': spool.new_id(), 'track_id': track_id, 'reason': 'new_person', 'timestamp': '20260101_000000',
+            'bbox': [1, 2, 3, 4], 'angles': (90.0, 80.0), 'image_hash': 2 ** 63 + track_id,
+            'image_data': bytes([track_id % 256]) * size, 'thumbnail_data': b'thumb'}
+
+
+def reopen(directory, **kwargs):
+    spool = SnapshotSpool(directory, fsync='never', **kwargs)
+    return spool, spool.recover()
+
+
+def test_pending_and_analyzed_snapshots_survive_restart():
+    with tempfile.TemporaryDirectory() as directory:
+        spool, _ = reopen(directory)
+        first, second, third = (snapshot(spool, i) for i in (1, 2, 3))
+        for item in (first, second, third):
+            spool.append_snapshot(item)
+        spool.append_result(second['spool_id'], {'status': 'success', 'analysis': 'person', 'severity': 'info'})
+        spool.mark_done(third['spool_id'])
+        spool.close()
+
+        spool, recovered = reopen(directory)
+        assert recovered == {'pending': 1, 'analyzed': 1}
+        replay = {s['track_id']: (s, result) for s, result in spool.take_replay()}
+        assert set(replay) == {1, 2}
+        assert replay[1][0]['image_data'] == first['image_data']
+        assert replay[1][0]['thumbnail_data'] == b'thumb'
+        assert replay[1][0]['image_hash'] == first['image_hash']
+        assert replay[1][1] is None
+        assert replay[2][1]['analysis'] == 'person'
+        spool.close()
+
+
+def test_replay_skips_in_flight_until_released():
+    with tempfile.TemporaryDirectory() as directory:
+        spool, _ = reopen(directory)
+        item = snapshot(spool, 1)
+        spool.append_snapshot(item)
+        spool.flush()
+        assert spool.take_replay() == []  # Still being processed by the pipeline
+        spool.release(item['spool_id'])
+        assert [s['track_id'] for s, _ in spool.take_replay()] == [1]
+        assert spool.take_replay() == []
+        spool.close()
+
+
+def test_torn_tail_is_truncated():
+    with tempfile.TemporaryDirectory() as directory:
+        spool, _ = reopen(directory)
+        spool.append_snapshot(snapshot(spool, 1))
+        spool.append_snapshot(snapshot(spool, 2))
+        spool.close()
+
+        segment = sorted(os.listdir(directory))[-1]
+        path = os.path.join(directory, segment)
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 10)  # Crash mid-write
+
+        spool, recovered = reopen(directory)
+        assert recovered == {'pending': 1, 'analyzed': 0}
+        assert spool.get_stats()['corrupt_tails'] == 1
+        spool.close()
+
+
+def test_corrupt_record_fails_checksum():
+    with tempfile.TemporaryDirectory() as directory:
+        spool, _ = reopen(directory)
+        spool.append_snapshot(snapshot(spool, 1))
+        spool.close()
+
+        path = os.path.join(directory, sorted(os.listdir(directory))[-1])
+        data = bytearray(open(path, 'rb').read())
+        data[-3] ^= 0xFF  # Flip bits in the image payload
+        open(path, 'wb').write(bytes(data))
+
+        _, recovered = reopen(directory)
+        assert recovered == {'pending': 0, 'analyzed': 0}
+
+
+def test_finished_segments_are_deleted():
+    with tempfile.TemporaryDirectory() as directory:
+        spool, _ = reopen(directory, segment_bytes=4000)
+        items = [snapshot(spool, i) for i in range(10)]
+        for item in items:
+            spool.append_snapshot(item)
+        spool.flush()
+        assert spool.get_stats()['segments'] > 3
+
+        for item in items:
+            spool.mark_done(item['spool_id'])
+        spool.append_snapshot(snapshot(spool, 99))  # Rolls the active segment forward
+        spool.flush()
+        stats = spool.get_stats()
+        assert stats['pending'] == 1
+        assert stats['segments'] <= 2
+        spool.close()
+
+
+def test_compaction_keeps_pending_records():
+    with tempfile.TemporaryDirectory() as directory:
+        spool, _ = reopen(directory, segment_bytes=4000, max_bytes=20000)
+        keep = snapshot(spool, 1)
+        spool.append_snapshot(keep)
+        spool.release(keep['spool_id'])
+        for i in range(2, 14):
+            item = snapshot(spool, i)
+            spool.append_snapshot(item)
+            spool.mark_done(item['spool_id'])
+            spool.flush()
+        stats = spool.get_stats()
+        assert stats.get('segments_compacted', 0) >= 1
+        assert stats['disk_bytes'] <= 20000
+        spool.close()
+
+        spool, recovered = reopen(directory)
+        assert recovered == {'pending': 1, 'analyzed': 0}
+        assert spool.take_replay()[0][0]['image_data'] == keep['image_data']
+        spool.close()
+
+
+def test_disk_cap_drops_oldest_pending():
+    with tempfile.TemporaryDirectory() as directory:
+        spool, _ = reopen(directory, segment_bytes=4000, max_bytes=12000)
+        for i in range(20):
+            spool.append_snapshot(snapshot(spool, i))
+            spool.flush()
+        stats = spool.get_stats()
+        assert stats['dropped_disk_full'] > 0
+        assert stats['disk_bytes'] <= 12000 + 4000  # Cap + the active segment's slack
+        spool.close()
+
+        spool, _ = reopen(directory)
+        ids = [s['track_id'] for s, _ in spool.take_replay(limit=100)]
+        assert 19 in ids and 0 not in ids  # Newest kept, oldest dropped
+        spool.close()
+
+
+def test_queue_reports_evictions():
+    dropped = []
+    queue = SnapshotQueue(max_items=1, on_drop=lambda item, reason: dropped.append((item['track_id'], reason)))
+    queue.put({'track_id': 1, 'reason': 'periodic', 'image_data': b'x'})
+    queue.put({'track_id': 2, 'reason': 'new_person', 'image_data': b'x'})
+    assert dropped == [(1, 'evicted')]
+    queue.discard_pending('shutdown')
+    assert dropped[-1] == (2, 'shutdown')
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tests for the async Supabase data layer (web/supabase_client.py), against an
+in-process httpx mock transport.
+
+Run with: python tests/test_supabase_client.py  (or pytest)
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'web'))
+from supabase_client import AsyncSupabase, SupabaseError
+
+
+def make_client(handler):
+    return AsyncSupabase("https://project.supabase.co/", "key", transport=httpx.MockTransport(handler))
+
+
+def test_list_events_query():
+    seen = {}
+
+    def handler(request):
+        seen['request'] = request
+        return httpx.Response(200, json=[{'id': 1}])
+
+    async def run():
+        client = make_client(handler)
+        rows = await client.list_events(limit=5, event_type='person_detected')
+        await client.close()
+        return rows
+
+    assert asyncio.run(run()) == [{'id': 1}]
+    request = seen['request']
+    assert request.url.path == '/rest/v1/events'
+    assert request.url.params['order'] == 'timestamp.desc,id.desc'
+    assert request.url.params['limit'] == '5'
+    assert request.url.params['event_type'] == 'eq.person_detected'
+    assert request.headers['apikey'] == 'key'
+    assert request.headers['authorization'] == 'Bearer key'
+
+
+def test_list_events_after_query():
+    seen = {}
+
+    def handler(request):
+        seen['params'] = request.url.params
+        return httpx.Response(200, json=[])
+
+    async def run():
+        client = make_client(handler)
+        await client.list_events_after(42, limit=100)
+        await client.close()
+
+    asyncio.run(run())
+    assert seen['params']['id'] == 'gt.42'
+    assert seen['params']['order'] == 'id.asc'
+    assert seen['params']['limit'] == '100'
+
+
+def test_list_events_keyset_and_since_filters():
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.params)
+        return httpx.Response(200, json=[])
+
+    async def run():
+        client = make_client(handler)
+        await client.list_events(limit=20, before=('2026-01-01T00:00:01+00:00', 9))
+        await client.list_events(limit=20, since='2026-01-01T00:00:01')
+        await client.close()
+
+    asyncio.run(run())
+    assert seen[0]['or'] == ('(timestamp.lt."2026-01-01T00:00:01+00:00",'
+                             'and(timestamp.eq."2026-01-01T00:00:01+00:00",id.lt.9))')
+    assert seen[0]['order'] == 'timestamp.desc,id.desc'
+    assert seen[1]['timestamp'] == 'gt.2026-01-01T00:00:01'
+    assert seen[1]['order'] == 'timestamp.asc,id.asc'
+
+
+def test_insert_returns_rows_in_one_request():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        rows = json.loads(request.content)
+        return httpx.Response(201, json=[dict(row, id=i + 1) for i, row in enumerate(rows)])
+
+    async def run():
+        client = make_client(handler)
+        rows = await client.insert_events([{'event_type': 'a'}, {'event_type': 'b'}])
+        await client.close()
+        return rows
+
+    assert [row['id'] for row in asyncio.run(run())] == [1, 2]
+    assert len(requests) == 1
+    assert requests[0].headers['prefer'] == 'return=representation'
+
+
+def test_upload_returns_public_url():
+    def handler(request):
+        assert request.url.path == '/storage/v1/object/security-frames/frame.jpg'
+        assert request.headers['x-upsert'] == 'true'
+        return httpx.Response(200, json={'Key': 'security-frames/frame.jpg'})
+
+    async def run():
+        client = make_client(handler)
+        url = await client.upload_image('frame.jpg', b'jpeg')
+        await client.close()
+        return url
+
+    assert asyncio.run(run()) == 'https://project.supabase.co/storage/v1/object/public/security-frames/frame.jpg'
+
+
+def test_delete_image_request():
+    seen = {}
+
+    def handler(request):
+        seen['request'] = request
+        return httpx.Response(200, json={'message': 'Successfully deleted'})
+
+    async def run():
+        client = make_client(handler)
+        await client.delete_image('frame.jpg')
+        await client.close()
+
+    asyncio.run(run())
+    assert seen['request'].method == 'DELETE'
+    assert seen['request'].url.path == '/storage/v1/object/security-frames/frame.jpg'
+
+
+def test_errors_raise_supabase_error():
+    def handler(request):
+        return httpx.Response(503, text='unavailable')
+
+    async def run():
+        client = make_client(handler)
+        try:
+            await client.delete_event(3)
+        finally:
+            await client.close()
+
+    try:
+        asyncio.run(run())
+        assert False, "Expected SupabaseError"
+    except SupabaseError as e:
+        assert '503' in str(e) and e.status == 503
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded, TTL-evicting track state store.
+
+Run with: python tests/test_track_store.py  (or pytest)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from track_store import TrackStateStore
+
+
+def test_touch_reports_new_tracks_once():
+    store = TrackStateStore(capacity=8)
+    assert store.touch(1, 0.0)
+    assert not store.touch(1, 1.0)
+    assert store.touch(2, 1.0)
+    assert len(store) == 2 and 1 in store
+    assert store.get(1)['first_seen'] == 0.0 and store.get(1)['last_seen'] == 1.0
+    assert store.get_stats()['total_seen'] == 2
+
+
+def test_snapshot_score_and_analysis_state():
+    store = TrackStateStore(capacity=8)
+    store.touch(7, 0.0)
+    assert store.last_snapshot_time(7) is None
+    store.mark_snapshot(7, 5.0)
+    store.record_score(7, 0.4)
+    store.record_score(7, 0.2)
+    store.set_analysis_state(7, 'queued')
+    state = store.get(7)
+    assert store.last_snapshot_time(7) == 5.0
+    assert state['snapshots'] == 1
+    assert state['best_score'] == 0.4
+    assert state['analysis_state'] == 'queued'
+    assert store.get_stats()['analysis_states']['queued'] == 1
+
+
+def test_unknown_tracks_are_ignored():
+    store = TrackStateStore(capacity=8)
+    store.mark_snapshot(3, 1.0)
+    store.set_analysis_state(3, 'analyzed')
+    assert store.get(3) is None
+    assert store.last_snapshot_time(3) is None
+
+
+def test_ttl_expiry():
+    store = TrackStateStore(capacity=8, ttl=10.0, sweep_interval=0.0)
+    store.touch(1, 0.0)
+    store.touch(2, 8.0)
+    store.touch(3, 12.0)  # Sweep drops track 1
+    assert 1 not in store and 2 in store
+    assert store.get_stats()['expired'] == 1
+    assert not store.touch(1, 13.0)  # Back after expiry: tracked again, but not a new person
+    assert 1 in store and store.get(1)['first_seen'] == 13.0
+    assert store.get_stats()['total_seen'] == 3
+
+
+def test_returning_track_keeps_its_snapshot_time():
+    store = TrackStateStore(capacity=8, ttl=10.0, sweep_interval=0.0)
+    store.touch(5, 0.0)
+    store.mark_snapshot(5, 1.0)
+    store.touch(6, 100.0)  # Sweep drops track 5
+    assert 5 not in store
+    assert not store.touch(5, 100.0)
+    assert store.last_snapshot_time(5) == 1.0 and store.get(5)['snapshots'] == 1
+
+
+def test_periodic_snapshot_fires_for_track_back_after_expiry():
+    import time
+    import numpy as np
+    import sentry_service
+    from pipeline_loadtest import StubCapture
+    from servo_output import FakePCA9685
+
+    sentry = sentry_service.SentryService(capture=StubCapture(), detector=lambda frame: [],
+                                          servo_bus=FakePCA9685(), analysis_enabled=False,
+                                          patrol_file=None, spool_dir=None)
+    sentry.track_state = TrackStateStore(capacity=8, ttl=10.0, sweep_interval=0.0)
+    now = time.time()
+    sentry.track_state.touch(5, now - 1000)  # Snapshot window never recorded for this slot
+    sentry.track_state.touch(6, now)  # Sweep drops track 5
+    assert not sentry.track_state.touch(5, now)
+
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    sentry._check_periodic_snapshot(frame, 5, [100, 100, 200, 300])
+    assert sentry.frame_selector.is_open(5)
+    assert sentry.track_state.last_snapshot_time(5) is not None
+
+
+def test_new_lower_id_after_higher_one_is_new():
+    store = TrackStateStore(capacity=8)
+    assert store.touch(9, 0.0)
+    assert store.touch(8, 1.0)  # Touched later in the frame order, still a new person
+    assert store.get_stats()['total_seen'] == 2
+
+
+def test_capacity_evicts_least_recently_seen():
+    store = TrackStateStore(capacity=3, ttl=1e9)
+    for track_id in range(3):
+        store.touch(track_id, float(track_id))
+    store.touch(0, 10.0)
+    store.touch(99, 11.0)
+    assert 1 not in store
+    assert {0, 2, 99} == set(store.slots)
+    assert store.get_stats()['evicted'] == 1
+    assert not store.touch(1, 12.0)  # Evicted, not new
+
+
+def test_memory_stays_flat():
+    store = TrackStateStore(capacity=64, ttl=30.0)
+    array_bytes = store.get_stats()['array_bytes']
+    for track_id in range(100000):
+        store.touch(track_id, track_id * 0.1)  # Ever-increasing ByteTrack IDs
+    stats = store.get_stats()
+    assert len(store.slots) <= 64
+    assert stats['array_bytes'] == array_bytes
+    assert stats['total_seen'] == 100000
+    assert stats['occupied'] == len(store)
+    assert len(store.released) <= 64
+
+
+def main():
+    tests = [name for name in globals() if name.startswith('test_')]
+    for name in tests:
+        try:
+            globals()[name]()
+            print(f"[OK] {name}")
+        except AssertionError:
+            print(f"[FAIL] {name}")
+
+
+if __name__ == "__main__":
+    main()
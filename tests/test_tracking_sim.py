@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+End-to-end tracking benchmark on the virtual pan/tilt rig (no camera, servos or GPU).
+Runs SentryService in real time against sentry/tracking_sim.py.
+
+Run with: python tests/test_tracking_sim.py  (or pytest)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from tracking_sim import VirtualPerson, run_simulation
+
+
+def test_acquires_and_holds_walking_person():
+    people = [VirtualPerson(1, azimuth=115.0, velocity=(8.0, 0.0))]
+    report = run_simulation(people=people, duration=4.0)
+
+    assert report['time_to_acquire'] is not None and report['time_to_acquire'] < 1.5
+    assert report['on_target_ratio'] > 0.5
+    assert report['tracking_error_p95'] < 6.0
+
+
+def test_no_people_never_acquires():
+    report = run_simulation(people=[], duration=1.5)
+    assert report['time_to_acquire'] is None
+    assert report['time_on_target'] == 0
+
+
+def main():
+    print("=" * 60)
+    print("Tracking Simulation Benchmark")
+    print("=" * 60)
+    for test in (test_acquires_and_holds_walking_person, test_no_people_never_acquires):
+        try:
+            test()
+            print(f"[OK] {test.__name__}")
+        except AssertionError:
+            print(f"[FAIL] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
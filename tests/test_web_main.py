@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Import check for the web API (web/main.py): every module it pulls in must
+resolve from a fresh interpreter started at the repo root.
+
+Run with: python tests/test_web_main.py  (or pytest)
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("PIL")
+pytest.importorskip("multipart")
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def test_web_main_imports(tmp_path):
+    env = dict(os.environ, SUPABASE_URL="https://project.supabase.co", SUPABASE_KEY="key",
+               GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "key"),
+               EVENT_MIRROR_PATH=str(tmp_path / "mirror.db"))
+    result = subprocess.run([sys.executable, "-c", "import web.main"], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+
+def main():
+    import tempfile
+    from pathlib import Path
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            test_web_main_imports(Path(tmp))
+        print("[OK] test_web_main_imports")
+    except AssertionError as e:
+        print(f"[FAIL] test_web_main_imports: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import os
 import requests
 from datetime import datetime
 
+DISCORD_TIMEOUT = 5.0  # Seconds - a stuck webhook must not hold up the caller (sentry shutdown drain)
+
 def send_discord_alert(event_type: str, description: str, severity: str, image_url: str = None):
     """Send an alert message to Discord using an embed."""
     webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
@@ -41,7 +43,7 @@ def send_discord_alert(event_type: str, description: str, severity: str, image_u
     payload = {"embeds": [embed]}
 
     try:
-        response = requests.post(webhook_url, json=payload)
+        response = requests.post(webhook_url, json=payload, timeout=DISCORD_TIMEOUT)
         response.raise_for_status()
         print(f"[OK] Sent Discord alert: {severity.upper()} - {description[:60]}")
     except Exception as e:
@@ -0,0 +1,163 @@
+"""
+Write-behind event inserts for the web API.
+
+Concurrent POST /events and /analyze-frame requests each used to do their own
+insert. AsyncEventWriter buffers events and writes them as one multi-row
+insert when max_batch events are waiting or max_delay has passed since the
+first one. submit() returns an asyncio future (the acknowledgement) that
+resolves to the stored row once its batch is written; failed batches are
+retried with exponential backoff. close() flushes on shutdown.
+
+PostgREST rejects a bulk insert whose objects don't all have the same keys,
+so every row of a batch is given the union of the batch's columns (missing
+ones as null). Client errors (4xx) are not retried, and a batch that still
+fails is split in halves so a row the store rejects only fails its own
+request.
+"""
+
+import asyncio
+import random
+
+
+def is_retryable(error):
+    """False for client errors (HTTP 4xx other than timeout / rate limit) - retrying can't help."""
+    status = getattr(error, "status", None)
+    return status is None or not 400 <= status < 500 or status in (408, 429)
+
+
+class AsyncEventWriter:
+    """
+    Args:
+        insert_rows: Coroutine function(list of event dicts) -> list of stored rows (same order)
+        max_batch: Events per insert request
+        max_delay: Max seconds an event waits for its batch to fill
+        max_retries: Retries of a failed batch before its futures fail
+        backoff: First retry delay (seconds), doubled per retry
+        max_backoff: Retry delay cap (seconds)
+    """
+
+    def __init__(self, insert_rows, max_batch=50, max_delay=0.05, max_retries=3, backoff=0.2, max_backoff=5.0):
+        self.insert_rows = insert_rows
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.queue = None
+        self.task = None
+        self.stats = {'submitted': 0, 'written': 0, 'batches': 0, 'retries': 0, 'failed': 0, 'splits': 0}
+
+    def start(self):
+        """Start the writer task (call from the running event loop, e.g. on startup)."""
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    def submit(self, event):
+        """
+        Buffer an event for insertion.
+
+        Returns:
+            asyncio.Future: Resolves to the stored row (or raises the insert error)
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.stats['submitted'] += 1
+        self.queue.put_nowait((event, future))
+        return future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _write(self, batch):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            error = await self._insert(batch)
+            if error is None:
+                return
+            if attempt == self.max_retries or not is_retryable(error):
+                break
+            self.stats['retries'] += 1
+            await asyncio.sleep(min(self.max_backoff, delay) * random.uniform(0.5, 1.0))
+            delay *= 2
+
+        print(f"[EVENTS] Insert of {len(batch)} event(s) failed after {attempt + 1} attempts: {error}")
+        await self._isolate(batch, error)
+
+    async def _isolate(self, batch, error):
+        """
+        Bisect a batch that still fails, so a row the store rejects only fails
+        itself. Stops splitting when both halves fail (the store is down).
+        """
+        if len(batch) == 1:
+            self._fail(batch, error)
+            return
+        middle = len(batch) // 2
+        halves = [batch[:middle], batch[middle:]]
+        self.stats['splits'] += 1
+        errors = [await self._insert(half) for half in halves]
+        if all(errors):
+            for half, half_error in zip(halves, errors):
+                self._fail(half, half_error)
+            return
+        for half, half_error in zip(halves, errors):
+            if half_error is not None:
+                await self._isolate(half, half_error)
+
+    async def _insert(self, batch):
+        """One insert request. Resolves the futures on success, returns the error otherwise."""
+        columns = {}
+        for event, _ in batch:
+            columns.update(dict.fromkeys(event))
+        try:
+            stored = await self.insert_rows([{column: event.get(column) for column in columns}
+                                             for event, _ in batch]) or []
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return e
+        self.stats['batches'] += 1
+        self.stats['written'] += len(batch)
+        for i, (event, future) in enumerate(batch):
+            if not future.done():  # The request may have been cancelled
+                future.set_result(stored[i] if i < len(stored) else dict(event))
+        return None
+
+    def _fail(self, batch, error):
+        self.stats['failed'] += len(batch)
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def close(self, timeout=10.0):
+        """Flush buffered events, then stop the writer task."""
+        if self.task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[EVENTS] {self.queue.qsize()} event(s) not written before shutdown")
+        self.task.cancel()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['pending'] = self.queue.qsize() if self.queue else 0
+        stats['avg_batch_size'] = round(stats['written'] / stats['batches'], 1) if stats['batches'] else 0.0
+        return stats
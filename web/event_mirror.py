@@ -0,0 +1,237 @@
+"""
+Local SQLite mirror of recent events for the web API.
+
+Every open dashboard polls /events every few seconds, and each poll used to be
+a Supabase round trip. EventMirror keeps the newest `max_rows` events in an
+indexed SQLite table so /events and /anomalies are answered locally (and keep
+working while Supabase is unreachable):
+
+- filled from Supabase on startup (sync_loop)
+- rows inserted through this API are written to it alongside the insert
+- rows inserted elsewhere (the sentry pipeline) are pulled incrementally by ID
+- deletes through this API invalidate the row; a periodic full refresh
+  reconciles deletes made elsewhere
+"""
+
+import asyncio
+import base64
+import sqlite3
+import threading
+import time
+
+EVENT_COLUMNS = ("id", "timestamp", "event_type", "description", "severity", "image_url")
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor for the position just after `row` (newest-first order)."""
+    return base64.urlsafe_b64encode(f"{row['timestamp']}|{row['id']}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        (timestamp, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, event_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().rsplit("|", 1)
+        return timestamp, int(event_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+class EventMirror:
+    """
+    Args:
+        path: SQLite database file (":memory:" for a throwaway mirror)
+        max_rows: Newest events kept
+    """
+
+    def __init__(self, path, max_rows=5000):
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT,
+                event_type TEXT,
+                description TEXT,
+                severity TEXT,
+                image_url TEXT
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp DESC, id DESC)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS events_type_timestamp "
+                        "ON events (event_type, timestamp DESC, id DESC)")
+        self.db.commit()
+        self.ready = self.count() > 0  # Serve the previous run's copy until the first sync lands
+        self.filled = False  # True once refreshed from Supabase in this run
+        self.version = 0  # Bumped on every write (ETags of the mirrored responses)
+        self.synced_at = None
+        self.stats = {'reads': 0, 'upserts': 0, 'deletes': 0, 'syncs': 0, 'sync_errors': 0}
+
+    def upsert(self, rows):
+        """
+        Insert or replace events (rows without an ID are ignored).
+
+        Returns:
+            list: The rows that were not in the mirror yet
+        """
+        rows = [row for row in rows if row.get("id") is not None]
+        if not rows:
+            return []
+        with self.lock, self.db:
+            known = self._known_ids([row["id"] for row in rows])
+            self.db.executemany(f"INSERT OR REPLACE INTO events ({', '.join(EVENT_COLUMNS)}) "
+                                f"VALUES ({', '.join('?' for _ in EVENT_COLUMNS)})",
+                                [tuple(row.get(column) for column in EVENT_COLUMNS) for row in rows])
+            self._trim()
+        self.version += 1
+        self.stats['upserts'] += len(rows)
+        return [row for row in rows if row["id"] not in known]
+
+    def replace_all(self, rows):
+        """
+        Full refresh: the mirror becomes exactly `rows`.
+
+        Returns:
+            (added rows, IDs of removed rows)
+        """
+        ids = {row["id"] for row in rows if row.get("id") is not None}
+        with self.lock:
+            previous = {row[0] for row in self.db.execute("SELECT id FROM events")}
+            with self.db:
+                self.db.execute("DELETE FROM events")
+        self.version += 1
+        self.upsert(rows)
+        return [row for row in rows if row.get("id") not in previous and row.get("id") is not None], \
+            sorted(previous - ids)
+
+    def _known_ids(self, ids):
+        known = set()
+        for start in range(0, len(ids), 500):  # SQLite bound-parameter limit
+            chunk = ids[start:start + 500]
+            known.update(row[0] for row in self.db.execute(
+                f"SELECT id FROM events WHERE id IN ({', '.join('?' for _ in chunk)})", chunk))
+        return known
+
+    def delete(self, event_id):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM events WHERE id = ?", (event_id,))
+        self.version += 1
+        self.stats['deletes'] += 1
+
+    def _trim(self):
+        self.db.execute("""
+            DELETE FROM events WHERE id NOT IN (
+                SELECT id FROM events ORDER BY timestamp DESC, id DESC LIMIT ?
+            )
+        """, (self.max_rows,))
+
+    def list_events(self, limit=10, event_type=None, before=None, since=None, after_id=None):
+        """
+        Same shape and ordering as AsyncSupabase.list_events.
+
+        Args:
+            limit: Max rows
+            event_type: Only this event type
+            before: (timestamp, id) keyset position - rows strictly older, newest first
+            since: Only rows with a later timestamp (oldest first)
+            after_id: Only rows with a higher ID (oldest first)
+        """
+        conditions, params = [], []
+        if event_type:
+            conditions.append("event_type = ?")
+            params.append(event_type)
+        if before:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        if since:
+            conditions.append("timestamp > ?")
+            params.append(since)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        query = f"SELECT {', '.join(EVENT_COLUMNS)} FROM events"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if after_id is not None:
+            query += " ORDER BY id ASC LIMIT ?"
+        elif since:
+            query += " ORDER BY timestamp ASC, id ASC LIMIT ?"
+        else:
+            query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+        self.stats['reads'] += 1
+        return [dict(row) for row in rows]
+
+    def is_truncated(self):
+        """True if older history exists upstream than the mirror holds."""
+        return self.count() >= self.max_rows
+
+    def max_id(self):
+        with self.lock:
+            return self.db.execute("SELECT MAX(id) FROM events").fetchone()[0]
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def get_stats(self):
+        return dict(self.stats, rows=self.count(), max_rows=self.max_rows, ready=self.ready, filled=self.filled,
+                    seconds_since_sync=round(time.time() - self.synced_at, 1) if self.synced_at else None)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+async def sync_loop(mirror, fetch_latest, fetch_after, interval=5.0, full_interval=300.0, on_change=None):
+    """
+    Keep the mirror in sync with Supabase until cancelled.
+
+    Args:
+        mirror: EventMirror
+        fetch_latest: Coroutine function(limit) -> newest events (full refresh)
+        fetch_after: Coroutine function(after_id, limit) -> events with a higher ID, ascending
+        interval: Seconds between incremental syncs
+        full_interval: Seconds between full refreshes (picks up deletes made elsewhere)
+        on_change: Optional callable(added rows, removed IDs) when a sync changed the mirror
+    """
+    full_at = None
+    # Highest ID seen in Supabase results. Not mirror.max_id(): rows inserted through the
+    # API are mirrored at once and can have a higher ID than a sentry row not pulled yet.
+    watermark = 0
+    while True:
+        try:
+            if full_at is None or time.monotonic() - full_at >= full_interval:
+                rows = await fetch_latest(mirror.max_rows)
+                added, removed = mirror.replace_all(rows)
+                watermark = max((row["id"] for row in rows if row.get("id") is not None), default=0)
+                full_at = time.monotonic()
+                if not mirror.filled:
+                    print(f"[MIRROR] Event mirror filled ({mirror.count()} events)")
+                    added, removed = [], []  # First fill after startup is not news
+                mirror.filled = mirror.ready = True
+            else:
+                rows = await fetch_after(watermark, mirror.max_rows)
+                watermark = max([watermark] + [row["id"] for row in rows if row.get("id") is not None])
+                added, removed = mirror.upsert(rows), []
+            if on_change and (added or removed):
+                on_change(added, removed)
+            mirror.synced_at = time.time()
+            mirror.stats['syncs'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            mirror.stats['sync_errors'] += 1
+            print(f"[MIRROR] Sync failed (serving cached events): {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,127 @@
+"""
+Server push (Server-Sent Events) for the web API.
+
+Dashboards used to poll /system/status every 2 s and /events every 5 s. Instead
+they can hold one GET /stream connection and receive:
+
+- event: a new event row (inserted through the API or pulled from Supabase)
+- delete: {"id": ...} when an event is removed
+- status: the /system/status payload, coalesced - each subscriber only ever
+  holds the latest one, and stats_loop publishes at a bounded rate and only
+  when the payload changed
+- job: an /analyze-frame job finished (the GET /jobs/{id} body)
+- resync: the subscriber fell behind and dropped messages; refetch /events
+
+Every subscriber has a bounded backlog, so a stalled client costs a fixed
+amount of memory and never slows the others down.
+"""
+
+import asyncio
+import json
+from collections import deque
+
+HEARTBEAT_INTERVAL = 15.0  # Seconds between keep-alive comments (proxies close idle connections)
+
+
+class Subscriber:
+    def __init__(self, max_backlog):
+        self.messages = deque()
+        self.max_backlog = max_backlog
+        self.latest = {}  # Coalesced kinds: kind -> newest data
+        self.overflowed = False
+        self.wake = asyncio.Event()
+
+    def put(self, kind, data, coalesce):
+        if coalesce:
+            self.latest[kind] = data
+        elif len(self.messages) >= self.max_backlog:
+            self.messages.clear()
+            self.overflowed = True
+        else:
+            self.messages.append((kind, data))
+        self.wake.set()
+
+    def drain(self):
+        """Pending messages in order, then the latest value of each coalesced kind."""
+        self.wake.clear()  # Anything put while draining sets it again
+        if self.overflowed:
+            self.overflowed = False
+            yield "resync", {}
+        while self.messages:
+            yield self.messages.popleft()
+        latest, self.latest = self.latest, {}
+        yield from latest.items()
+
+
+class Broadcaster:
+    """
+    Fan-out of push messages to SSE subscribers (event loop only).
+
+    Args:
+        max_backlog: Undelivered messages per subscriber before it is told to resync
+    """
+
+    def __init__(self, max_backlog=200):
+        self.max_backlog = max_backlog
+        self.subscribers = set()
+        self.last = {}  # kind -> last coalesced payload (sent to new subscribers)
+        self.published = 0
+
+    def publish(self, kind, data, coalesce=False):
+        self.published += 1
+        if coalesce:
+            self.last[kind] = data
+        for subscriber in self.subscribers:
+            subscriber.put(kind, data, coalesce)
+
+    def subscribe(self):
+        subscriber = Subscriber(self.max_backlog)
+        for kind, data in self.last.items():
+            subscriber.put(kind, data, coalesce=True)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def stream(self, subscriber, heartbeat=HEARTBEAT_INTERVAL):
+        """SSE body for one subscriber (unsubscribes when the client goes away)."""
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wake.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                for kind, data in subscriber.drain():
+                    yield f"event: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def get_stats(self):
+        return {'subscribers': len(self.subscribers), 'published': self.published}
+
+
+async def stats_loop(broadcaster, get_payload, kind="status", interval=1.0):
+    """
+    Publish get_payload() (a coroutine function) at most once per `interval`,
+    only while someone is subscribed and only when it changed. Runs until cancelled.
+    """
+    last = None
+    while True:
+        if not broadcaster.subscribers:
+            last = None  # Fresh payload for the next subscriber
+            broadcaster.last.pop(kind, None)
+        else:
+            try:
+                payload = await get_payload()
+                encoded = json.dumps(payload, sort_keys=True, default=str)
+                if encoded != last:
+                    last = encoded
+                    broadcaster.publish(kind, payload, coalesce=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[STREAM] Failed to collect {kind}: {e}")
+        await asyncio.sleep(interval)
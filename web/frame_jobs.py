@@ -0,0 +1,174 @@
+"""
+Background jobs for POST /analyze-frame.
+
+The endpoint used to run the Gemini analysis, the Storage upload, the insert
+and the Discord alert in sequence while the caller waited 5-10 s. It now
+stores the image as a job, answers 202 with the job ID and a pool of worker
+tasks processes the jobs; the result is polled from GET /jobs/{id} (or pushed
+to /stream subscribers through on_finish).
+
+The queue is bounded (submit() raises QueueFull when it is) and finished jobs
+are kept for `result_ttl` seconds, at most `max_finished` of them.
+
+map_bounded() runs a batch (POST /analyze-frames) with bounded parallelism and
+yields each result as soon as it is ready.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, Counter
+
+
+class FrameJobQueue:
+    """
+    Args:
+        process: Coroutine function(payload) -> result dict (raises on failure)
+        workers: Jobs processed concurrently
+        max_queued: Jobs waiting for a worker before submit() raises asyncio.QueueFull
+        max_finished: Finished jobs kept for GET /jobs/{id}
+        result_ttl: Seconds a finished job is kept
+        on_finish: Optional callable(job dict) when a job finishes (push notifications)
+    """
+
+    def __init__(self, process, workers=4, max_queued=100, max_finished=1000, result_ttl=3600.0,
+                 on_finish=None):
+        self.process = process
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.result_ttl = result_ttl
+        self.on_finish = on_finish
+        self.jobs = OrderedDict()  # job ID -> job dict (insertion order = age)
+        self.payloads = {}  # job ID -> payload, dropped once processed
+        self.finished = {}  # job ID -> asyncio.Event set when the job finishes
+        self.stats = Counter()
+        self.queue = None
+        self.tasks = []
+
+    def start(self):
+        """Start the worker tasks (call from the running event loop)."""
+        self.queue = asyncio.Queue(maxsize=self.max_queued)
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, payload, kind="analyze_frame"):
+        """
+        Queue a job.
+
+        Returns:
+            dict: The job (id, status, ...)
+
+        Raises:
+            asyncio.QueueFull: If max_queued jobs are already waiting
+        """
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "kind": kind, "status": "queued", "created_at": time.time(),
+               "started_at": None, "finished_at": None, "result": None, "error": None}
+        try:
+            self.queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            raise
+        self.jobs[job_id] = job
+        self.payloads[job_id] = payload
+        self.finished[job_id] = asyncio.Event()
+        self.stats['submitted'] += 1
+        self._expire()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def wait(self, job_id, timeout=None):
+        """Wait (up to timeout seconds) until a job has finished. Returns the job."""
+        finished = self.finished.get(job_id)
+        if finished is not None:
+            try:
+                await asyncio.wait_for(finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.jobs.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job_id):
+        job = self.jobs.get(job_id)
+        payload = self.payloads.pop(job_id, None)
+        if job is None or payload is None:
+            return
+        job.update(status="running", started_at=time.time())
+        try:
+            job["result"] = await self.process(payload)
+            job["status"] = "done"
+            self.stats['done'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job["error"] = str(getattr(e, "detail", e))
+            job["status"] = "failed"
+            self.stats['failed'] += 1
+            print(f"[JOBS] Job {job_id} failed: {job['error']}")
+        job["finished_at"] = time.time()
+        self.finished[job_id].set()
+        if self.on_finish:
+            self.on_finish(job)
+
+    def _expire(self):
+        """Drop the oldest finished jobs beyond max_finished or older than result_ttl."""
+        now = time.time()
+        finished = [job_id for job_id, job in self.jobs.items() if job["finished_at"] is not None]
+        excess = len(finished) - self.max_finished
+        for job_id in finished:
+            if excess > 0 or now - self.jobs[job_id]["finished_at"] > self.result_ttl:
+                del self.jobs[job_id]
+                self.finished.pop(job_id, None)
+                excess -= 1
+
+    async def close(self, timeout=10.0):
+        """Let queued jobs finish (up to timeout), then stop the workers."""
+        if self.queue is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[JOBS] {self.queue.qsize()} job(s) not processed before shutdown")
+        for task in self.tasks:
+            task.cancel()
+
+    def get_stats(self):
+        states = Counter(job["status"] for job in self.jobs.values())
+        return dict(self.stats, queued=states.get("queued", 0), running=states.get("running", 0),
+                    workers=self.workers)
+
+
+async def map_bounded(process, payloads, concurrency=4):
+    """
+    Run process(payload) for every payload, at most `concurrency` at a time.
+
+    Yields:
+        (index, result, error) in completion order - error is None on success
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index, payload):
+        async with semaphore:
+            try:
+                return index, await process(payload), None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return index, None, str(getattr(e, "detail", e))
+
+    tasks = [asyncio.create_task(run(index, payload)) for index, payload in enumerate(payloads)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:  # Client went away - stop the rest
+            task.cancel()
@@ -1,14 +1,15 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Response, Header
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import StreamingResponse
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
+import json
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
-import tempfile
 import sys
 import cv2
 import numpy as np
@@ -19,10 +20,18 @@ sys.path.append(os.path.dirname(__file__))  # ensures local imports work
 
 # Import alert function
 from alerts import send_discord_alert
-
-# Add gemini and sentry modules to path
+from supabase_client import AsyncSupabase, SupabaseError
+from async_event_writer import AsyncEventWriter
+from event_mirror import EventMirror, sync_loop, encode_cursor, decode_cursor
+from event_stream import Broadcaster, stats_loop
+from frame_jobs import FrameJobQueue, map_bounded
+from response_cache import ResponseCache, make_etag, etag_matches
+
+# Add gemini and sentry modules to path (sentry modules import each other top-level)
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from gemini.gemini_description import analyze_security_image
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'sentry'))
+from gemini.gemini_description import analyze_security_image_data
+from image_variants import VariantWorker, variant_urls
 
 # Import sentry service
 try:
@@ -35,14 +44,72 @@ except Exception as e:
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
+# Initialize Supabase client (async, pooled connections)
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase = AsyncSupabase(SUPABASE_URL, SUPABASE_KEY)
+
+# Local SQLite mirror of recent events - /events and /anomalies are served from it
+EVENT_MIRROR_PATH = os.getenv("EVENT_MIRROR_PATH", os.path.join(os.path.dirname(__file__), "event_mirror.db"))
+EVENT_MIRROR_ROWS = 5000
+EVENT_MIRROR_SYNC_INTERVAL = 5.0  # Seconds between incremental syncs (events inserted by the sentry)
+EVENT_MIRROR_FULL_SYNC_INTERVAL = 300.0  # Seconds between full refreshes (deletes made elsewhere)
+EVENTS_MAX_LIMIT = 200  # Server-side cap on rows per /events request
+
+STATUS_PUSH_INTERVAL = 1.0  # Min seconds between /stream status messages
+STATUS_CACHE_TTL = 1.0  # Seconds /system/status and /snapshots/stats bodies are reused
+ANALYZE_WORKERS = 4  # /analyze-frame jobs processed concurrently
+ANALYZE_MAX_QUEUED = 100  # Waiting jobs before /analyze-frame answers 503
+ANALYZE_WAIT_TIMEOUT = 30.0  # Max seconds /analyze-frame?wait=true holds the request
+BULK_MAX_FRAMES = 100  # Frames per /analyze-frames request
+BULK_CONCURRENCY = 4  # Frames of one /analyze-frames request processed at a time
+IMAGE_VARIANT_WORKERS = 2  # Threads generating thumbnail / medium variants of uploaded frames
+
+event_mirror = EventMirror(EVENT_MIRROR_PATH, max_rows=EVENT_MIRROR_ROWS)
+broadcaster = Broadcaster()
+response_cache = ResponseCache()
+background_tasks: List[asyncio.Task] = []
+
+
+def with_variants(row):
+    """Event row plus the thumbnail / medium / full URLs of its image."""
+    return dict(row, image_variants=variant_urls(row.get("image_url")))
+
+
+def publish_event_changes(added, removed):
+    """Push mirror changes to /stream subscribers."""
+    for row in added:
+        broadcaster.publish("event", with_variants(row))
+    for event_id in removed:
+        broadcaster.publish("delete", {"id": event_id})
+
+
+async def insert_and_mirror(rows):
+    """Insert into Supabase, then write the stored rows to the local mirror."""
+    stored = await supabase.insert_events(rows)
+    publish_event_changes(event_mirror.upsert(stored), [])
+    return stored
+
+
+# Event inserts are batched (write-behind); handlers await their row's acknowledgement
+event_writer = AsyncEventWriter(insert_and_mirror)
+
+# /analyze-frame jobs - results from GET /jobs/{id} and pushed to /stream subscribers
+# Image variants are generated on threads and uploaded through the async client on the event loop
+variant_worker: Optional[VariantWorker] = None
+main_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def upload_from_thread(path, data, content_type):
+    return asyncio.run_coroutine_threadsafe(supabase.upload_image(path, data, content_type), main_loop).result(30)
+
+
+frame_jobs = FrameJobQueue(lambda payload: process_frame(payload), workers=ANALYZE_WORKERS,
+                           max_queued=ANALYZE_MAX_QUEUED, on_finish=lambda job: broadcaster.publish("job", job))
 
 app = FastAPI()
 
@@ -53,6 +120,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Global sentry instance
@@ -63,7 +131,17 @@ sentry: Optional[SentryService] = None
 @app.on_event("startup")
 async def startup_event():
     """Initialize the sentry service on startup."""
-    global sentry
+    global sentry, variant_worker, main_loop
+    main_loop = asyncio.get_running_loop()
+    variant_worker = VariantWorker(upload_from_thread, workers=IMAGE_VARIANT_WORKERS)
+    event_writer.start()
+    frame_jobs.start()
+    background_tasks.append(asyncio.create_task(sync_loop(
+        event_mirror, supabase.list_events, supabase.list_events_after,
+        interval=EVENT_MIRROR_SYNC_INTERVAL, full_interval=EVENT_MIRROR_FULL_SYNC_INTERVAL,
+        on_change=publish_event_changes)))
+    background_tasks.append(asyncio.create_task(stats_loop(
+        broadcaster, system_status_payload, interval=STATUS_PUSH_INTERVAL)))
     if SENTRY_AVAILABLE:
         try:
             print("[STARTUP] Initializing sentry service...")
@@ -86,6 +164,14 @@ async def shutdown_event():
         print("[SHUTDOWN] Stopping sentry service...")
         sentry.stop()
         print("[SHUTDOWN] Sentry stopped")
+    for task in background_tasks:
+        task.cancel()
+    await frame_jobs.close()
+    await event_writer.close()
+    if variant_worker:
+        variant_worker.close(wait=False)
+    await supabase.close()
+    event_mirror.close()
 
 
 # Event model
@@ -96,6 +182,7 @@ class Event(BaseModel):
     description: str
     severity: str
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, str]] = None  # thumbnail / medium / full URLs
 
 
 class EventCreate(BaseModel):
@@ -112,6 +199,36 @@ class FrameAnalysisResponse(BaseModel):
     status: str
 
 
+def not_modified(etag):
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+async def conditional_get(name, compute, response, if_none_match):
+    """
+    Serve a ResponseCache resource: 304 while the client's ETag is current, without
+    recomputing the body if the cached one is still fresh.
+    """
+    etag = response_cache.fresh_etag(name, STATUS_CACHE_TTL)
+    if not etag_matches(if_none_match, etag):
+        body, etag = await response_cache.get(name, compute, STATUS_CACHE_TTL)
+    if etag_matches(if_none_match, etag):
+        response_cache.stats['not_modified'] += 1
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return body
+
+
+def invalidate_sentry_state():
+    """
+    Sentry control changed its state - next status poll must not get a 304.
+    Call from the event loop (the response cache isn't thread-safe): control
+    handlers are async and run the blocking sentry calls in the threadpool.
+    """
+    response_cache.bump("system_status")
+    response_cache.bump("snapshot_stats")
+
+
 @app.get("/health")
 def health():
     """Health check endpoint"""
@@ -119,12 +236,15 @@ def health():
 
 
 @app.get("/anomalies")
-def get_anomalies(limit: Optional[int] = 50):
+async def get_anomalies(response: Response, limit: Optional[int] = 50, cursor: Optional[str] = None,
+                        since: Optional[str] = None, after_id: Optional[int] = None,
+                        if_none_match: Optional[str] = Header(None)):
     """
     Get anomaly events (alias for /events endpoint).
     Used by the frontend AnomalyLog component.
     """
-    return get_events(limit=limit)
+    return await get_events(response, limit=limit, cursor=cursor, since=since, after_id=after_id,
+                            if_none_match=if_none_match)
 
 
 class ControlCommand(BaseModel):
@@ -132,7 +252,7 @@ class ControlCommand(BaseModel):
 
 
 @app.post("/control")
-def camera_control(command: ControlCommand):
+async def camera_control(command: ControlCommand):
     """
     Handle camera control commands from the frontend.
 
@@ -148,26 +268,50 @@ def camera_control(command: ControlCommand):
         return {"status": "error", "message": "Sentry not available"}
 
     print(f"[CONTROL] Received command: {command.command}")
-    sentry.send_command(command.command)
+    sentry.send_command(command.command)  # Only queues the command
+    invalidate_sentry_state()
 
     return {"status": "ok", "command": command.command}
 
 
+def snapshot_stats_payload():
+    if not sentry:
+        return {"status": "error", "message": "Sentry not available"}
+
+    return sentry.get_snapshot_stats()
+
+
 @app.get("/snapshots/stats")
-def get_snapshot_stats():
+async def get_snapshot_stats(response: Response, if_none_match: Optional[str] = Header(None)):
     """
-    Get statistics about snapshots and Gemini analysis.
+    Get statistics about snapshots and Gemini analysis (ETag / If-None-Match aware).
+    """
+    return await conditional_get("snapshot_stats", lambda: run_in_threadpool(snapshot_stats_payload),
+                                 response, if_none_match)
+
+
+@app.get("/patrol/stats")
+def get_patrol_stats():
+    """
+    Get the patrol planner state (dwell points, activity hotspots, expected time-to-detect).
     """
     global sentry
-    
+
     if not sentry:
         return {"status": "error", "message": "Sentry not available"}
-    
-    return sentry.get_snapshot_stats()
+
+    return sentry.get_patrol_stats()
+
+
+def create_sentry():
+    """A started SentryService (opens the camera - blocking)."""
+    service = SentryService()
+    service.start()
+    return service
 
 
 @app.post("/system/start")
-def start_sentry_system():
+async def start_sentry_system():
     """
     Start the sentry service (camera + tracking).
     This restarts just the backend sentry, not the entire system.
@@ -183,8 +327,8 @@ def start_sentry_system():
         
         # Reinitialize sentry if it was stopped (camera was released)
         # We need to create a fresh instance because the camera device was closed
-        sentry = SentryService()
-        sentry.start()
+        sentry = await run_in_threadpool(create_sentry)
+        invalidate_sentry_state()
         
         return {
             "status": "success",
@@ -196,7 +340,7 @@ def start_sentry_system():
 
 
 @app.post("/system/stop")
-def stop_sentry_system():
+async def stop_sentry_system():
     """
     Stop the sentry service (camera + tracking).
     Keeps the backend API running, just stops the camera/tracking.
@@ -207,7 +351,8 @@ def stop_sentry_system():
         if not sentry or not sentry.running:
             return {"status": "already_stopped", "message": "Sentry is not running"}
         
-        sentry.stop()
+        await run_in_threadpool(sentry.stop)  # Joins the threads and drains the pipeline
+        invalidate_sentry_state()
         
         return {
             "status": "success",
@@ -219,7 +364,7 @@ def stop_sentry_system():
 
 
 @app.post("/system/restart")
-def restart_sentry_system():
+async def restart_sentry_system():
     """
     Restart the sentry service (camera + tracking).
     """
@@ -228,11 +373,11 @@ def restart_sentry_system():
     try:
         # Stop if running
         if sentry and sentry.running:
-            sentry.stop()
+            await run_in_threadpool(sentry.stop)
         
         # Reinitialize and start
-        sentry = SentryService()
-        sentry.start()
+        sentry = await run_in_threadpool(create_sentry)
+        invalidate_sentry_state()
         
         return {
             "status": "success",
@@ -243,13 +388,7 @@ def restart_sentry_system():
         raise HTTPException(status_code=500, detail=f"Failed to restart sentry: {str(e)}")
 
 
-@app.get("/system/status")
-def get_system_status():
-    """
-    Get current status of the sentry system.
-    """
-    global sentry
-    
+def system_status_payload_sync():
     return {
         "sentry_available": SENTRY_AVAILABLE,
         "sentry_initialized": sentry is not None,
@@ -258,6 +397,22 @@ def get_system_status():
     }
 
 
+async def system_status_payload():
+    """The /system/status body, shared with the /stream status pushes."""
+    body, _ = await response_cache.get("system_status", lambda: run_in_threadpool(system_status_payload_sync),
+                                       STATUS_CACHE_TTL)
+    return body
+
+
+@app.get("/system/status")
+async def get_system_status(response: Response, if_none_match: Optional[str] = Header(None)):
+    """
+    Get current status of the sentry system (ETag / If-None-Match aware).
+    """
+    return await conditional_get("system_status", lambda: run_in_threadpool(system_status_payload_sync),
+                                 response, if_none_match)
+
+
 def generate_frames():
     """
     Generator function that yields MJPEG frames from the sentry.
@@ -330,148 +485,343 @@ def get_sentry_stats():
     return sentry.get_stats()
 
 
+@app.get("/stream")
+async def stream():
+    """
+    Server-Sent Events: new events ("event"), deletions ("delete"), the /system/status
+    payload ("status", at most once per STATUS_PUSH_INTERVAL) and "resync" when the
+    client fell behind and should refetch /events.
+    """
+    return StreamingResponse(
+        broadcaster.stream(broadcaster.subscribe()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/events", response_model=List[Event])
-def get_events(limit: Optional[int] = 10, event_type: Optional[str] = None):
+async def get_events(response: Response, limit: Optional[int] = 10, event_type: Optional[str] = None,
+                     cursor: Optional[str] = None, since: Optional[str] = None, after_id: Optional[int] = None,
+                     if_none_match: Optional[str] = Header(None)):
     """
-    Get security events from Supabase.
+    Get security events (from the local mirror once it has been filled, else Supabase).
+
+    Paging: results are newest first and capped at EVENTS_MAX_LIMIT. When a full page is
+    returned, the X-Next-Cursor header holds the cursor for the next (older) page.
+
+    Deltas: `since` (timestamp) or `after_id` return only newer rows, oldest first, so a
+    client repeats the call from the last row it received until the response is empty.
+
+    Responses served from the mirror carry an ETag (mirror version + query); a matching
+    If-None-Match gets 304 without running the query.
     """
+    limit = max(1, min(limit or 10, EVENTS_MAX_LIMIT))
     try:
-        query = supabase.table("events").select("*").order("timestamp", desc=True).limit(limit)
-        if event_type:
-            query = query.eq("event_type", event_type)
-        response = query.execute()
-        return response.data
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = dict(limit=limit, event_type=event_type, before=before, since=since, after_id=after_id)
+
+    etag = None
+    if event_mirror.ready:
+        etag = make_etag("events", event_mirror.version, variant=repr(sorted(query.items())))
+        if etag_matches(if_none_match, etag):
+            response_cache.stats['not_modified'] += 1
+            return not_modified(etag)
+
+    try:
+        rows = None
+        if event_mirror.ready:
+            rows = event_mirror.list_events(**query)
+            if before and len(rows) < limit and event_mirror.is_truncated():
+                rows = etag = None  # Paged past the mirrored history
+        if rows is None:
+            rows = await supabase.list_events(**query)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching events: {str(e)}")
 
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
+    if len(rows) == limit and not (since or after_id is not None):
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    return [with_variants(row) for row in rows]
+
 
 @app.post("/events", response_model=Event)
-def create_event(event: EventCreate):
+async def create_event(event: EventCreate):
     """
     Create a new security event.
     """
     try:
         event_data = event.model_dump()
         event_data["timestamp"] = datetime.now().isoformat()
+        event_data["image_url"] = None  # Same columns as /analyze-frame rows (they share insert batches)
 
-        response = supabase.table("events").insert(event_data).execute()
+        row = await event_writer.submit(event_data)
 
-        # Send Discord alert (only warnings/critical)
+        # Send Discord alert (only warnings/critical) - requests is blocking, keep it off the event loop
         if event_data["severity"] in ["warning", "critical"]:
-            send_discord_alert(
+            await run_in_threadpool(
+                send_discord_alert,
                 event_type=event_data["event_type"],
                 description=event_data["description"],
                 severity=event_data["severity"],
                 image_url=event_data.get("image_url")
             )
 
-        if response.data:
-            return response.data[0]
+        if row:
+            return with_variants(row)
         else:
             raise HTTPException(status_code=500, detail="Failed to create event")
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating event: {str(e)}")
 
 
 @app.delete("/events/{event_id}")
-def delete_event(event_id: int):
+async def delete_event(event_id: int):
     """
     Delete a security event by ID.
     """
     try:
-        response = supabase.table("events").delete().eq("id", event_id).execute()
+        deleted = await supabase.delete_event(event_id)
+        event_mirror.delete(event_id)  # Invalidate even if Supabase no longer had it
+        if deleted:
+            broadcaster.publish("delete", {"id": event_id})
 
-        if response.data:
+        if deleted:
             return {"status": "success", "message": f"Event {event_id} deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting event: {str(e)}")
 
 
-@app.post("/analyze-frame", response_model=FrameAnalysisResponse)
-async def analyze_frame(file: UploadFile = File(...)):
+# Image types Gemini accepts, by magic bytes (offset, signature)
+IMAGE_SIGNATURES = (
+    ("image/jpeg", 0, b"\xff\xd8\xff"),
+    ("image/png", 0, b"\x89PNG\r\n\x1a\n"),
+    ("image/webp", 8, b"WEBP"),
+    ("image/heic", 8, b"heic"),
+    ("image/heif", 8, b"mif1"),
+)
+
+
+def image_mime_type(content, declared=None):
     """
-    Analyze a frame with Gemini Vision, upload to Supabase Storage,
-    log results, and send alerts to Discord if severity is high.
+    MIME type of an uploaded image, from its bytes. Clients send octet-stream or
+    a wrong type often enough that the declared one is only used for images the
+    signatures don't cover, and image/jpeg when it isn't an image type at all.
     """
-    temp_path = None
+    for mime_type, offset, signature in IMAGE_SIGNATURES:
+        if content[offset:offset + len(signature)] == signature:
+            return mime_type
+    if declared and declared.startswith("image/"):
+        return declared
+    return "image/jpeg"
+
+
+async def discard_upload(path):
+    """Best-effort removal of an uploaded frame no event will reference."""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-            temp_path = temp_file.name
-            content = await file.read()
-            temp_file.write(content)
-
-        result = analyze_security_image(temp_path)
-
-        if result["status"] != "success":
-            raise HTTPException(status_code=500, detail=f"Gemini analysis failed: {result.get('error', 'Unknown error')}")
-
-        analysis_text = result["analysis"]
-        severity = result.get("severity", "info")
-
-        if not severity or severity not in ["info", "warning", "critical"]:
-            severity = "info"
-            lower = analysis_text.lower()
-            if any(k in lower for k in ["alert", "suspicious", "unusual", "concern"]):
-                severity = "warning"
-            elif any(k in lower for k in ["danger", "threat", "emergency", "critical"]):
-                severity = "critical"
-
-        timestamp = datetime.now()
-        timestamp_str = timestamp.isoformat()
-        file_extension = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
-        storage_filename = f"frame_{timestamp.strftime('%Y%m%d_%H%M%S')}_{timestamp.microsecond}{file_extension}"
-
-        supabase.storage.from_("security-frames").upload(
-            path=storage_filename,
-            file=content,
-            file_options={"content-type": file.content_type or "image/jpeg"}
+        await supabase.delete_image(path)
+    except SupabaseError as e:
+        print(f"[SUPABASE] Could not delete orphaned {path}: {e}")
+
+
+async def process_frame(payload):
+    """
+    Analyze a frame with Gemini Vision and upload it to Supabase Storage (concurrently),
+    then log the event and send a Discord alert if severity is high. If the analysis or
+    the insert fails the upload is deleted again; image variants are only made for
+    stored events.
+
+    Args:
+        payload: {"content", "content_type", "filename", "received_at"} and optionally
+            "storage_prefix" (keeps frames with the same timestamp apart in the bucket)
+
+    Returns:
+        dict: FrameAnalysisResponse fields plus image_url
+    """
+    content = payload["content"]
+    content_type = image_mime_type(content, payload["content_type"])
+    filename = payload["filename"]
+
+    timestamp = payload["received_at"]
+    timestamp_str = timestamp.isoformat()
+    file_extension = os.path.splitext(filename)[1] if filename else ".jpg"
+    storage_filename = (f"{payload.get('storage_prefix', '')}frame_{timestamp.strftime('%Y%m%d_%H%M%S')}_"
+                        f"{timestamp.microsecond}{file_extension}")
+
+    # The Gemini SDK call is blocking - run it in the threadpool while the upload is in flight
+    result, image_url = await asyncio.gather(
+        run_in_threadpool(analyze_security_image_data, content, mime_type=content_type,
+                          image_name=filename or "upload.jpg"),
+        supabase.upload_image(storage_filename, content, content_type)
+    )
+
+    if result["status"] != "success":
+        await discard_upload(storage_filename)
+        raise HTTPException(status_code=500, detail=f"Gemini analysis failed: {result.get('error', 'Unknown error')}")
+
+    analysis_text = result["analysis"]
+    severity = result.get("severity", "info")
+
+    if not severity or severity not in ["info", "warning", "critical"]:
+        severity = "info"
+        lower = analysis_text.lower()
+        if any(k in lower for k in ["alert", "suspicious", "unusual", "concern"]):
+            severity = "warning"
+        elif any(k in lower for k in ["danger", "threat", "emergency", "critical"]):
+            severity = "critical"
+
+    event_data = {
+        "event_type": "vision_analysis",
+        "description": analysis_text,
+        "severity": severity,
+        "timestamp": timestamp_str,
+        "image_url": image_url
+    }
+
+    try:
+        event_record = await event_writer.submit(event_data)
+    except Exception:
+        await discard_upload(storage_filename)
+        raise
+    variant_worker.submit(storage_filename, content)  # Thumbnail / medium, off the job's path
+
+    # Send Discord alert for warning/critical results
+    if severity in ["warning", "critical"]:
+        await run_in_threadpool(
+            send_discord_alert,
+            event_type=event_data["event_type"],
+            description=event_data["description"],
+            severity=event_data["severity"],
+            image_url=event_data.get("image_url")
         )
 
-        image_url = supabase.storage.from_("security-frames").get_public_url(storage_filename)
+    if not event_record:
+        raise HTTPException(status_code=500, detail="Failed to store analysis in database")
 
-        event_data = {
-            "event_type": "vision_analysis",
-            "description": analysis_text,
-            "severity": severity,
-            "timestamp": timestamp_str,
-            "image_url": image_url
-        }
+    return dict(FrameAnalysisResponse(
+        event_id=event_record.get("id", 0),
+        timestamp=timestamp_str,
+        analysis=analysis_text,
+        severity=severity,
+        status="success"
+    ).model_dump(), image_url=image_url, image_variants=variant_urls(image_url))
 
-        db_response = supabase.table("events").insert(event_data).execute()
 
-        # Send Discord alert for warning/critical results
-        if severity in ["warning", "critical"]:
-            send_discord_alert(
-                event_type=event_data["event_type"],
-                description=event_data["description"],
-                severity=event_data["severity"],
-                image_url=event_data.get("image_url")
-            )
+@app.post("/analyze-frame", status_code=202)
+async def analyze_frame(response: Response, file: UploadFile = File(...), wait: bool = False):
+    """
+    Queue a frame for analysis and return 202 with the job ID at once.
 
-        if not db_response.data or len(db_response.data) == 0:
-            raise HTTPException(status_code=500, detail="Failed to store analysis in database")
+    The result is available from GET /jobs/{job_id} and is pushed to /stream subscribers
+    as a "job" message. With ?wait=true the request waits for the job (up to
+    ANALYZE_WAIT_TIMEOUT) and returns the FrameAnalysisResponse like before.
+    """
+    content = await file.read()
+    try:
+        job = frame_jobs.submit({
+            "content": content,
+            "content_type": file.content_type,
+            "filename": file.filename,
+            "received_at": datetime.now()
+        })
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Analysis queue is full - retry later",
+                            headers={"Retry-After": "5"})
+
+    if wait:
+        job = await frame_jobs.wait(job["id"], timeout=ANALYZE_WAIT_TIMEOUT)
+        if job["status"] == "done":
+            response.status_code = 200
+            return FrameAnalysisResponse(**job["result"])
+        if job["status"] == "failed":
+            raise HTTPException(status_code=500, detail=f"Error analyzing frame: {job['error']}")
+
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return {"job_id": job["id"], "status": job["status"], "status_url": f"/jobs/{job['id']}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Status of an /analyze-frame job: queued, running, done (with result) or failed (with error).
+    """
+    job = frame_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
 
-        event_record = db_response.data[0]
-        event_id = event_record.get("id", 0)
 
-        return FrameAnalysisResponse(
-            event_id=event_id,
-            timestamp=timestamp_str,
-            analysis=analysis_text,
-            severity=severity,
-            status="success"
-        )
+def parse_frame_metadata(metadata, count):
+    """
+    Per-frame metadata for /analyze-frames: a JSON array with one object per file
+    ({"timestamp": ISO capture time, "source": camera name}, both optional).
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing frame: {str(e)}")
+    Raises:
+        HTTPException: 400 if it is not valid
+    """
+    if not metadata:
+        return [{} for _ in range(count)]
+    try:
+        entries = json.loads(metadata)
+        if not isinstance(entries, list) or len(entries) != count:
+            raise ValueError(f"expected a JSON array with {count} objects")
+        for entry in entries:
+            if entry.get("timestamp"):
+                entry["timestamp"] = datetime.fromisoformat(str(entry["timestamp"]).replace("Z", "+00:00"))
+        return entries
+    except (ValueError, AttributeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid metadata: {e}")
+
+
+@app.post("/analyze-frames")
+async def analyze_frames(files: List[UploadFile] = File(...), metadata: Optional[str] = Form(None)):
+    """
+    Bulk ingestion: analyze and store many frames from one multipart request.
 
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            os.unlink(temp_path)
+    Frames are processed BULK_CONCURRENCY at a time and the response streams one JSON
+    line per frame as it finishes ({"index", "filename", "status", "result" or "error"}),
+    followed by a {"summary": ...} line. `metadata` is an optional JSON array with one
+    {"timestamp", "source"} object per file - backfilled frames keep their capture time.
+    """
+    if len(files) > BULK_MAX_FRAMES:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_FRAMES} frames per request")
+    entries = parse_frame_metadata(metadata, len(files))
+
+    received_at = datetime.now()
+    payloads = []
+    for index, (file, entry) in enumerate(zip(files, entries)):
+        source = "".join(c for c in str(entry.get("source") or "bulk") if c.isalnum() or c in "-_")
+        payloads.append({
+            "content": await file.read(),
+            "content_type": file.content_type,
+            "filename": file.filename,
+            "received_at": entry.get("timestamp") or received_at,
+            "storage_prefix": f"{source}_{index}_"
+        })
+
+    async def results():
+        counts = {"done": 0, "failed": 0}
+        async for index, result, error in map_bounded(process_frame, payloads, BULK_CONCURRENCY):
+            status = "failed" if error else "done"
+            counts[status] += 1
+            line = {"index": index, "filename": payloads[index]["filename"], "status": status}
+            line.update({"error": error} if error else {"result": result})
+            yield json.dumps(line) + "\n"
+        yield json.dumps({"summary": dict(counts, frames=len(payloads))}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 
 app.mount("/", StaticFiles(directory="web/static/dist", html=True), name="frontend")
@@ -0,0 +1,91 @@
+"""
+Versioned responses for conditional GETs (ETag / If-None-Match).
+
+Every resource has a version counter that is bumped whenever it changes, and
+its ETag is derived from that version. A poll whose If-None-Match still
+matches gets a 304 without the response being recomputed or reserialized:
+
+- /events and /anomalies use EventMirror.version (bumped on every mirror write)
+- /system/status and /snapshots/stats are cached here: the body is reused for
+  `max_age` seconds (sentry stats change continuously, so they are re-read at
+  a bounded rate), the version only moves when a recomputed body differs, and
+  control endpoints bump() it at once
+"""
+
+import hashlib
+import json
+import time
+import uuid
+
+BOOT_ID = uuid.uuid4().hex[:8]  # ETags from a previous process never match
+
+
+def make_etag(resource, version, variant=""):
+    """Weak ETag for `version` of `resource` (`variant`: e.g. the query string)."""
+    suffix = f"-{hashlib.sha1(variant.encode()).hexdigest()[:10]}" if variant else ""
+    return f'W/"{resource}-{BOOT_ID}-{version}{suffix}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value matches `etag` (weak comparison)."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class CachedResource:
+    def __init__(self):
+        self.version = 0
+        self.body = None
+        self.encoded = None
+        self.computed_at = 0.0
+
+
+class ResponseCache:
+    """Computed bodies of the versioned resources (event loop only)."""
+
+    def __init__(self):
+        self.resources = {}
+        self.stats = {'hits': 0, 'recomputed': 0, 'not_modified': 0}
+
+    def _resource(self, name):
+        return self.resources.setdefault(name, CachedResource())
+
+    def bump(self, name):
+        """The resource changed: new version, cached body dropped."""
+        resource = self._resource(name)
+        resource.version += 1
+        resource.body = resource.encoded = None
+
+    def fresh_etag(self, name, max_age):
+        """ETag of the cached body if it is younger than max_age seconds, else None."""
+        resource = self._resource(name)
+        if resource.encoded is None or time.monotonic() - resource.computed_at >= max_age:
+            return None
+        return make_etag(name, resource.version)
+
+    async def get(self, name, compute, max_age):
+        """
+        Cached body, recomputed with `compute` (a coroutine function) once it is max_age old.
+
+        Returns:
+            (body, etag)
+        """
+        resource = self._resource(name)
+        if resource.encoded is not None and time.monotonic() - resource.computed_at < max_age:
+            self.stats['hits'] += 1
+        else:
+            body = await compute()
+            encoded = json.dumps(body, sort_keys=True, default=str)
+            if encoded != resource.encoded:
+                resource.version += 1
+            resource.body, resource.encoded = body, encoded
+            resource.computed_at = time.monotonic()
+            self.stats['recomputed'] += 1
+        return resource.body, make_etag(name, resource.version)
+
+    def get_stats(self):
+        return dict(self.stats, versions={name: resource.version for name, resource in self.resources.items()})
@@ -0,0 +1,126 @@
+"""
+Async Supabase data layer for the web API.
+
+Talks to PostgREST (events table) and Storage over one pooled
+httpx.AsyncClient, so request handlers await the database round trip instead
+of holding a threadpool worker for it. Connections are kept alive between
+requests and every call has connect/read timeouts.
+"""
+
+import httpx
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0)
+
+
+class SupabaseError(Exception):
+    """
+    A Supabase request failed (HTTP error status or transport error).
+
+    Attributes:
+        status: HTTP status code (None for transport errors)
+    """
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncSupabase:
+    """
+    Args:
+        url: Supabase project URL
+        key: Supabase API key
+        bucket: Storage bucket for frames
+        timeout: httpx.Timeout for every request
+        limits: httpx.Limits for the connection pool
+        transport: Optional httpx transport (tests)
+    """
+
+    def __init__(self, url, key, bucket="security-frames", timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS,
+                 transport=None):
+        self.url = url.rstrip("/")
+        self.bucket = bucket
+        self.client = httpx.AsyncClient(
+            base_url=self.url,
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            timeout=timeout,
+            limits=limits,
+            transport=transport
+        )
+
+    async def _request(self, method, path, **kwargs):
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            raise SupabaseError(f"{method} {path} failed: {e}") from e
+        if response.status_code >= 400:
+            raise SupabaseError(f"{method} {path} returned {response.status_code}: {response.text[:200]}",
+                                status=response.status_code)
+        return response
+
+    # ----------------------------------------
+    # Events table
+    # ----------------------------------------
+
+    async def list_events(self, limit=10, event_type=None, before=None, since=None, after_id=None):
+        """
+        Newest events first, or oldest first for the `since` / `after_id` delta queries.
+
+        Args:
+            limit: Max rows
+            event_type: Only this event type
+            before: (timestamp, id) keyset position - rows strictly older
+            since: Only rows with a later timestamp
+            after_id: Only rows with a higher ID
+        """
+        params = {"select": "*", "order": "timestamp.desc,id.desc", "limit": str(limit)}
+        if event_type:
+            params["event_type"] = f"eq.{event_type}"
+        if before:
+            timestamp, event_id = before
+            params["or"] = f'(timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt.{int(event_id)}))'
+        if since:
+            params["timestamp"] = f"gt.{since}"
+            params["order"] = "timestamp.asc,id.asc"
+        if after_id is not None:
+            params["id"] = f"gt.{int(after_id)}"
+            params["order"] = "id.asc"
+        response = await self._request("GET", "/rest/v1/events", params=params)
+        return response.json()
+
+    async def list_events_after(self, after_id, limit=1000):
+        """Events with an ID above `after_id`, oldest first (incremental sync)."""
+        return await self.list_events(limit=limit, after_id=after_id)
+
+    async def insert_events(self, rows):
+        """Insert one or more events in a single request. Returns the stored rows (with IDs)."""
+        response = await self._request("POST", "/rest/v1/events", json=rows,
+                                       headers={"Prefer": "return=representation"})
+        return response.json()
+
+    async def delete_event(self, event_id):
+        """Returns the deleted rows (empty if the event did not exist)."""
+        response = await self._request("DELETE", "/rest/v1/events", params={"id": f"eq.{event_id}"},
+                                       headers={"Prefer": "return=representation"})
+        return response.json()
+
+    # ----------------------------------------
+    # Storage
+    # ----------------------------------------
+
+    def public_url(self, path):
+        return f"{self.url}/storage/v1/object/public/{self.bucket}/{path}"
+
+    async def upload_image(self, path, data, content_type="image/jpeg"):
+        """Upload (or overwrite) a file in the bucket. Returns its public URL."""
+        await self._request("POST", f"/storage/v1/object/{self.bucket}/{path}", content=data,
+                            headers={"Content-Type": content_type, "x-upsert": "true"})
+        return self.public_url(path)
+
+    async def delete_image(self, path):
+        """Remove a file from the bucket."""
+        await self._request("DELETE", f"/storage/v1/object/{self.bucket}/{path}")
+
+    async def close(self):
+        await self.client.aclose()